@@ -1,7 +1,7 @@
 // Background service worker for Vibe Mind Chrome Extension
 
 // Import config
-importScripts('config.js');
+importScripts('config.js', 'shared.js');
 const API_BASE_URL = CONFIG.API_BASE_URL;
 const API_ROOT_URL = CONFIG.API_ROOT_URL;
 const FRONTEND_URL = CONFIG.FRONTEND_URL;
@@ -172,7 +172,7 @@ class VibeMindBackground {
             this.showNotification('Enhancing text...', 'info');
 
             // Call API
-            const response = await fetch(`${API_BASE_URL}/analyze`, {
+            const response = await fetchWithRetryAfter(`${API_BASE_URL}/analyze?fields=${RESULT_FIELDS}`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -208,6 +208,20 @@ class VibeMindBackground {
         }
     }
 
+    async fetchDownscaledImage(imageUrl) {
+        try {
+            const response = await fetch(imageUrl);
+            if (!response.ok) {
+                return null;
+            }
+            const params = await this.getMetadata('preprocessing').catch(() => DEFAULT_PREPROCESSING);
+            return await downscaleForUpload(await response.blob(), params);
+        } catch (error) {
+            console.warn('Could not downscale image locally:', error);
+            return null;
+        }
+    }
+
     async analyzeImage(info, tab) {
         const imageUrl = info.srcUrl;
 
@@ -233,8 +247,21 @@ class VibeMindBackground {
             // Show loading notification
             this.showNotification('Analyzing image...', 'info');
 
-            // Call API
-            const response = await fetch(`${API_BASE_URL}/analyze`, {
+            // Upload a model-sized copy when the image can be fetched here; otherwise let the server fetch the URL
+            const upload = await this.fetchDownscaledImage(imageUrl);
+            const response = upload ? await fetchWithRetryAfter(`${API_BASE_URL}/analyze-binary?${new URLSearchParams({
+                message: 'Analyze this image and create a detailed design prompt',
+                profile_key: 'product_designer',
+                fields: RESULT_FIELDS
+            })}`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': upload.blob.type || 'application/octet-stream',
+                    'X-API-Key': result.openai_api_key,
+                    'X-Source-Size': `${upload.width}x${upload.height}`
+                },
+                body: upload.blob,
+            }) : await fetchWithRetryAfter(`${API_BASE_URL}/analyze?fields=${RESULT_FIELDS}`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -345,6 +372,19 @@ class VibeMindBackground {
                 });
                 return true;
 
+            case 'get-profiles':
+            case 'get-platforms':
+            case 'get-preprocessing': {
+                const name = message.type.slice('get-'.length);
+                this.getMetadata(name).then(data => {
+                    sendResponse({ success: true, [name]: data });
+                }).catch(error => {
+                    console.error(`Failed to get ${name}:`, error);
+                    sendResponse({ success: false, error: error.message });
+                });
+                return true;
+            }
+
             case 'show-notification':
                 this.showNotification(message.text, message.type);
                 break;
@@ -354,6 +394,44 @@ class VibeMindBackground {
         }
     }
 
+    // Server metadata (profiles, platforms, preprocessing) cached in storage; once older than the
+    // server's max-age they are revalidated with If-None-Match, which costs the server a 304 and no body
+    async getMetadata(name) {
+        const storageKey = `metadata_${name}`;
+        const cached = (await chrome.storage.local.get([storageKey]))[storageKey];
+        if (cached && Date.now() < cached.expiresAt) {
+            return cached.data;
+        }
+
+        try {
+            const response = await fetch(`${API_BASE_URL}/${name}`, {
+                headers: cached?.etag ? { 'If-None-Match': cached.etag } : {},
+            });
+            const maxAge = parseInt((response.headers.get('Cache-Control') || '').match(/max-age=(\d+)/)?.[1] || '0', 10);
+            const expiresAt = Date.now() + maxAge * 1000;
+
+            if (response.status === 304 && cached) {
+                await chrome.storage.local.set({ [storageKey]: { ...cached, expiresAt } });
+                return cached.data;
+            }
+            if (!response.ok) {
+                throw new Error(`Failed to load ${name} (${response.status})`);
+            }
+
+            const data = (await response.json())[name];
+            await chrome.storage.local.set({
+                [storageKey]: { data, etag: response.headers.get('ETag'), expiresAt }
+            });
+            return data;
+        } catch (error) {
+            // Offline or server error: a stale copy beats nothing
+            if (cached) {
+                return cached.data;
+            }
+            throw error;
+        }
+    }
+
     onTabUpdated(tabId, changeInfo, tab) {
         // Inject content script when tab is loaded
         if (changeInfo.status === 'complete' && tab.url) {
@@ -369,7 +447,7 @@ class VibeMindBackground {
             if (isSupportedSite) {
                 chrome.scripting.executeScript({
                     target: { tabId: tabId },
-                    files: ['content.js']
+                    files: ['shared.js', 'content.js']
                 }).catch(error => {
                     // Ignore errors (script may already be injected)
                     console.log('Content script injection skipped:', error.message);
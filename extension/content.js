@@ -542,6 +542,15 @@ class VibeMindContentScript {
         this.uploadedFile = null;
     }
 
+    async getPreprocessingParams() {
+        try {
+            const response = await chrome.runtime.sendMessage({ type: 'get-preprocessing' });
+            return response?.success ? response.preprocessing : DEFAULT_PREPROCESSING;
+        } catch (error) {
+            return DEFAULT_PREPROCESSING;
+        }
+    }
+
     async enhancePrompt() {
         const selectedRole = this.dialog.querySelector('input[name="role"]:checked').value;
         const inputText = this.getInputText(this.activeInput);
@@ -582,20 +591,34 @@ class VibeMindContentScript {
             let response;
 
             if (this.uploadedFile) {
-                // Image analysis
-                const formData = new FormData();
-                formData.append('file', this.uploadedFile);
-                formData.append('message', inputText || 'Analyze this image and create a detailed design prompt');
-                formData.append('profile_key', selectedRole);
-                formData.append('api_key', apiKey);
-
-                response = await fetch(`${API_BASE_URL}/analyze-upload`, {
+                // Image analysis: send the raw file bytes (no base64 or multipart encoding)
+                const params = new URLSearchParams({
+                    message: inputText || 'Analyze this image and create a detailed design prompt',
+                    profile_key: selectedRole,
+                    fields: RESULT_FIELDS
+                });
+
+                let upload = { blob: this.uploadedFile };
+                try {
+                    upload = await downscaleForUpload(this.uploadedFile, await this.getPreprocessingParams());
+                } catch (error) {
+                    console.warn('Client-side downscale failed, uploading the original:', error);
+                }
+
+                response = await fetchWithRetryAfter(`${API_BASE_URL}/analyze-binary?${params}`, {
                     method: 'POST',
-                    body: formData,
+                    headers: {
+                        'Content-Type': upload.blob.type || 'application/octet-stream',
+                        'X-API-Key': apiKey,
+                        'X-Deadline-Ms': String(ANALYSIS_DEADLINE_MS),
+                        ...(upload.width ? { 'X-Source-Size': `${upload.width}x${upload.height}` } : {})
+                    },
+                    body: upload.blob,
+                    signal: AbortSignal.timeout(ANALYSIS_DEADLINE_MS),
                 });
             } else {
                 // Text-only enhancement
-                response = await fetch(`${API_BASE_URL}/analyze`, {
+                response = await fetchWithRetryAfter(`${API_BASE_URL}/analyze?fields=${RESULT_FIELDS}`, {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
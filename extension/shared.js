@@ -0,0 +1,56 @@
+// Shared request helpers for Vibe Mind Chrome Extension
+// Loaded before content.js (manifest content_scripts), by background.js (importScripts)
+// and by sidepanel.html, so all three talk to the API the same way
+
+// Time budget for one analysis; the request is aborted (and the server cancels its work) after this
+const ANALYSIS_DEADLINE_MS = 45000;
+
+// Longest Retry-After the extension waits out before retrying a busy server
+const MAX_RETRY_AFTER_SECONDS = 30;
+
+// Used when the server's /api/preprocessing parameters cannot be fetched
+const DEFAULT_PREPROCESSING = { max_dimension: 512, format: 'image/jpeg', quality: 0.85 };
+
+// Response fields the extension reads; the server omits everything else
+const RESULT_FIELDS = 'summarized_report,structured_result.analysis_result';
+
+// Retry 429 (server saturated) and 503 (circuit open) after the server's Retry-After, instead of failing at once
+async function fetchWithRetryAfter(url, options, maxRetries = 2) {
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(url, options);
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+        if (![429, 503].includes(response.status) || attempt >= maxRetries
+            || !(retryAfter > 0) || retryAfter > MAX_RETRY_AFTER_SECONDS) {
+            return response;
+        }
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+    }
+}
+
+// Downscale and encode an image the way the server preprocesses it (see /api/preprocessing),
+// so only model-sized bytes are uploaded and the server has nothing left to resize
+async function downscaleForUpload(blob, params) {
+    const bitmap = await createImageBitmap(blob);
+    const { width, height } = bitmap;
+    const longest = Math.max(width, height);
+    if (longest <= params.max_dimension) {
+        bitmap.close();
+        return { blob, width, height };
+    }
+
+    // Same truncation as the server's target size
+    const scale = params.max_dimension / longest;
+    const targetWidth = width > height ? params.max_dimension : Math.floor(width * scale);
+    const targetHeight = width > height ? Math.floor(height * scale) : params.max_dimension;
+    const canvas = new OffscreenCanvas(Math.max(1, targetWidth), Math.max(1, targetHeight));
+    const context = canvas.getContext('2d');
+    context.imageSmoothingQuality = 'high';
+    // JPEG has no alpha; composite onto white as the server does
+    context.fillStyle = '#ffffff';
+    context.fillRect(0, 0, canvas.width, canvas.height);
+    context.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+    bitmap.close();
+
+    const resized = await canvas.convertToBlob({ type: params.format, quality: params.quality });
+    return { blob: resized, width, height };
+}
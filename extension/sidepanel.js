@@ -376,7 +376,7 @@ class SidePanelManager {
             this.showProgress(0.4);
 
             // Call API
-            const response = await fetch(`${API_BASE_URL}/analyze`, {
+            const response = await fetchWithRetryAfter(`${API_BASE_URL}/analyze?fields=${RESULT_FIELDS}`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -421,6 +421,15 @@ class SidePanelManager {
         }
     }
 
+    async getPreprocessingParams() {
+        try {
+            const response = await chrome.runtime.sendMessage({ type: 'get-preprocessing' });
+            return response?.success ? response.preprocessing : DEFAULT_PREPROCESSING;
+        } catch (error) {
+            return DEFAULT_PREPROCESSING;
+        }
+    }
+
     async analyzeImage() {
         try {
             // Create file input
@@ -442,17 +451,31 @@ class SidePanelManager {
 
                     this.showProgress(0.4);
 
-                    // Create form data
-                    const formData = new FormData();
-                    formData.append('file', file);
-                    formData.append('message', 'Analyze this image and create a detailed design prompt');
-                    formData.append('profile_key', 'product_designer');
-                    formData.append('api_key', apiKey);
+                    // Send the raw file bytes; options go in the query string
+                    const params = new URLSearchParams({
+                        message: 'Analyze this image and create a detailed design prompt',
+                        profile_key: 'product_designer',
+                        fields: RESULT_FIELDS
+                    });
+
+                    let upload = { blob: file };
+                    try {
+                        upload = await downscaleForUpload(file, await this.getPreprocessingParams());
+                    } catch (error) {
+                        console.warn('Client-side downscale failed, uploading the original:', error);
+                    }
 
                     // Call API
-                    const response = await fetch(`${API_BASE_URL}/analyze-upload`, {
+                    const response = await fetchWithRetryAfter(`${API_BASE_URL}/analyze-binary?${params}`, {
                         method: 'POST',
-                        body: formData,
+                        headers: {
+                            'Content-Type': upload.blob.type || 'application/octet-stream',
+                            'X-API-Key': apiKey,
+                            'X-Deadline-Ms': String(ANALYSIS_DEADLINE_MS),
+                            ...(upload.width ? { 'X-Source-Size': `${upload.width}x${upload.height}` } : {})
+                        },
+                        body: upload.blob,
+                        signal: AbortSignal.timeout(ANALYSIS_DEADLINE_MS),
                     });
 
                     this.showProgress(0.8);
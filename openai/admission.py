@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Admission control for analysis requests
+
+At most max_in_flight analyses run at once; up to max_queue more wait (FIFO)
+for a slot, each for at most max_wait seconds. Anything beyond that is shed
+with Overloaded, which the API server turns into 429 with a Retry-After
+estimated from the observed service time, so a spike makes some requests
+fail fast instead of every request slow.
+
+The controller lives on the server's event loop (acquire is a coroutine and
+release must be called from the loop); slots are held until the analysis
+work itself finishes, not just until the response is sent.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+# Weight of the newest sample in the service time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the server is saturated"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server is busy ({reason.replace('_', ' ')}); retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded in-flight limit with a bounded FIFO wait queue"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 16,
+        max_wait: float = 10.0,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.metrics = registry
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_seconds: Optional[float] = None
+
+        self.metrics.register_gauge("admission_in_flight", lambda: self._in_flight)
+        self.metrics.register_gauge("admission_queue_depth", lambda: len(self._waiters))
+        self.metrics.register_gauge("admission_saturation", self.saturation)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """MAX_IN_FLIGHT / MAX_QUEUE / QUEUE_TIMEOUT_SECONDS"""
+        return cls(
+            max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "8")),
+            max_queue=int(os.getenv("MAX_QUEUE", "16")),
+            max_wait=float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10")),
+        )
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def saturation(self) -> float:
+        """(in flight + queued) / max_in_flight; above 1 means requests are waiting"""
+        return round((self._in_flight + len(self._waiters)) / self.max_in_flight, 3)
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot: the queue ahead of it drained at the observed rate"""
+        service = self._service_seconds if self._service_seconds is not None else self.max_wait
+        return max(1, math.ceil(service * (len(self._waiters) + 1) / self.max_in_flight))
+
+    def _shed(self, reason: str):
+        self.metrics.inc("admission_shed")
+        self.metrics.inc(f"admission_shed_{reason}")
+        raise Overloaded(reason, self.retry_after())
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """Take a slot, waiting in the queue for at most min(max_wait, timeout) seconds"""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self.metrics.inc("admission_admitted")
+            self.metrics.observe("admission_wait_ms", 0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        wait = self.max_wait if timeout is None else max(0.0, min(self.max_wait, timeout))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot was handed over just as the wait ended
+                if isinstance(e, asyncio.CancelledError):
+                    self.release()
+                    raise
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.metrics.observe("admission_wait_ms", (time.perf_counter() - started) * 1000)
+                self._shed("queue_timeout")
+        self.metrics.inc("admission_admitted")
+        self.metrics.observe("admission_wait_ms", (time.perf_counter() - started) * 1000)
+
+    def release(self, service_seconds: Optional[float] = None):
+        """Free a slot (handing it to the oldest waiter) and record how long it was held"""
+        if service_seconds is not None:
+            previous = self._service_seconds
+            self._service_seconds = service_seconds if previous is None else (
+                SERVICE_TIME_ALPHA * service_seconds + (1 - SERVICE_TIME_ALPHA) * previous
+            )
+            self.metrics.observe("admission_service_ms", service_seconds * 1000)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes straight to the waiter; in_flight is unchanged
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def snapshot(self) -> dict:
+        """State for /api/health"""
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "saturation": self.saturation(),
+            "retry_after": self.retry_after(),
+        }
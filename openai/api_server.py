@@ -5,17 +5,33 @@ Provides REST API endpoints compatible with the Chrome extension.
 """
 
 import os
-import base64
-import tempfile
-import shutil
+import math
+import hashlib
+import hmac
+import asyncio
+import time
+import binascii
 from datetime import datetime
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from typing import Callable, Dict, Optional, List, Tuple, Union
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from compression import CompressionMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 # Import the OpenAI backend
-from vibe_mind import VibeMindOpenAI
+from vibe_mind import (
+    VibeMindOpenAI, DesignHandoff, FlowHandoff, ImageRejected, MAX_FLOW_SCREENS, config_version, encode_json,
+    decode_base64_image
+)
+from handoff_writer import HandoffWriter
+from handoff_store import HandoffStore
+from metrics import metrics
+from usage_accounting import hash_api_key
+from circuit_breaker import CircuitOpenError, get_vision_breaker
+from deadlines import Deadline, DeadlineExceeded, RequestCancelled
+from admission import AdmissionController, Overloaded
+from http_transport import get_shared_transport
 
 # Pydantic models for request/response
 class ApiKeyRequest(BaseModel):
@@ -29,6 +45,16 @@ class AnalysisRequest(BaseModel):
     profile_key: Optional[str] = None
     platform_target: Optional[str] = "v0"
     api_key: str
+    # handoff_id of an earlier analysis of this screen, for delta re-analysis
+    previous_analysis_id: Optional[str] = None
+
+class FlowAnalysisRequest(BaseModel):
+    # Screens in flow order: image URLs, data URLs or raw base64
+    images: List[str]
+    message: Optional[str] = None
+    profile_key: Optional[str] = None
+    platform_target: Optional[str] = "v0"
+    api_key: str
 
 class ProfileRequest(BaseModel):
     name: str
@@ -68,9 +94,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli/gzip for JSON responses above COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
 # Global analyzer instance
 analyzer = None
 
+# Indexed handoff store and its background writer (batched, off the request path)
+handoff_store = HandoffStore.from_env()
+handoff_writer = HandoffWriter(sink=handoff_store)
+
+# Bounded concurrency for analyses (MAX_IN_FLIGHT running, MAX_QUEUE waiting)
+admission = AdmissionController.from_env()
+
+# How often a running analysis checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.25
+
+# Profile/platform metadata, serialized once per config version: name -> (version, body, ETag)
+_metadata_responses: Dict[str, Tuple[tuple, bytes, str]] = {}
+METADATA_CACHE_CONTROL = "public, max-age=300"
+
+# Upper bound on a single uploaded image, checked before the body is read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+
+# Sent as X-Admin-Token to read /api/usage across API keys; unset disables cross-key reports
+USAGE_ADMIN_TOKEN = os.getenv("USAGE_ADMIN_TOKEN")
+
+@app.on_event("startup")
+async def prewarm_openai_connections():
+    """Open pooled OpenAI connections in the background so the first analysis skips TCP/TLS setup"""
+    if os.getenv("OPENAI_PREWARM", "1").lower() in ("0", "false", "no"):
+        return
+    import threading
+    threading.Thread(target=get_shared_transport().prewarm, daemon=True).start()
+
 def get_analyzer(api_key: Optional[str] = None) -> VibeMindOpenAI:
     """Get or create the analyzer instance with optional API key."""
     global analyzer
@@ -79,6 +136,230 @@ def get_analyzer(api_key: Optional[str] = None) -> VibeMindOpenAI:
         analyzer = VibeMindOpenAI(api_key=api_key)
     return analyzer
 
+def _structured_result(handoff: DesignHandoff) -> dict:
+    """Extension-facing summary of a handoff"""
+    return {
+        "analysis_result": handoff.prompt_for_platform,
+        "confidence_score": handoff.confidence_score,
+        "designer_profile": handoff.designer_profile,
+        "platform_target": handoff.platform_target,
+        "dominant_colors": [{"hex": color.hex, "name": color.name} for color in handoff.dominant_colors],
+        "components": [{"type": comp.type, "description": comp.description} for comp in handoff.components],
+        "uncertain_flags": handoff.uncertain_flags,
+        "delta": handoff.metadata.get("delta"),
+        "usage": handoff.metadata.get("usage"),
+        "stale": handoff.metadata.get("stale", False)
+    }
+
+def _summarize(text: str) -> str:
+    return text[:500] + "..." if len(text) > 500 else text
+
+def _submit_handoff(handoff: DesignHandoff) -> Optional[str]:
+    """Queue a handoff for background persistence, returning where it will be readable"""
+    try:
+        return handoff_writer.submit(handoff)
+    except Exception as e:
+        print(f"Warning: Could not queue handoff: {e}")
+        return None
+
+def _parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Split a fields= selector ("summarized_report,structured_result.confidence_score")."""
+    if not value:
+        return None
+    return [field.strip() for field in value.split(",") if field.strip()] or None
+
+def _sparse(payload: dict, fields: Optional[List[str]]) -> dict:
+    """Keep only the selected fields; dotted paths select keys of nested objects and "status" is always kept."""
+    if not fields:
+        return payload
+    selected = {"status": payload.get("status")}
+    for path in fields:
+        *parents, name = path.split(".")
+        source = payload
+        for key in parents:
+            source = source.get(key) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or name not in source:
+            continue  # unknown fields are ignored
+        target = selected
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[name] = source[name]
+    return selected
+
+def _analysis_response(handoff: DesignHandoff, output_file: Optional[str], fields: Optional[List[str]] = None) -> Response:
+    """Encode the analysis response straight to JSON bytes (no second dict conversion)."""
+    payload = {
+        "status": "success",
+        "structured_result": _structured_result(handoff),
+        "summarized_report": _summarize(handoff.prompt_for_platform),
+        "files": {
+            "handoff_id": handoff.handoff_id,
+            "handoff_file": output_file
+        }
+    }
+    return Response(content=encode_json(_sparse(payload, fields)), media_type="application/json")
+
+def _flow_response(flow: FlowHandoff, fields: Optional[List[str]] = None) -> Response:
+    """One structured result per screen plus the flow-level tokens and prompt."""
+    screens = []
+    for handoff in flow.screens:
+        output_file = _submit_handoff(handoff)
+        screens.append({
+            "structured_result": _structured_result(handoff),
+            "files": {"handoff_id": handoff.handoff_id, "handoff_file": output_file}
+        })
+    
+    payload = {
+        "status": "success",
+        "flow": {
+            "flow_id": flow.flow_id,
+            "flow_summary": flow.flow_summary,
+            "flow_tokens": flow.flow_tokens,
+            "analysis_result": flow.prompt_for_platform,
+            "confidence_score": flow.confidence_score,
+            "designer_profile": flow.designer_profile,
+            "platform_target": flow.platform_target,
+            "uncertain_flags": flow.uncertain_flags,
+            "usage": flow.usage
+        },
+        "screens": screens,
+        "summarized_report": _summarize(flow.prompt_for_platform)
+    }
+    return Response(content=encode_json(_sparse(payload, fields)), media_type="application/json")
+
+def _circuit_open(error: CircuitOpenError) -> HTTPException:
+    """503 with Retry-After while the OpenAI circuit is open and nothing cached can be served."""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+def _cancelled(error: RequestCancelled) -> HTTPException:
+    """504 when the request ran out of time, 499 (client closed request) when it was abandoned."""
+    if isinstance(error, DeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(error))
+    return HTTPException(status_code=499, detail=str(error))
+
+async def _run_cancellable(http_request: Request, deadline: Deadline, func, *args, **kwargs):
+    """Run blocking analysis work in the threadpool, cancelling it if the client goes away.
+    
+    The work first takes an admission slot (429 with Retry-After when the
+    server is saturated), held until the work itself finishes. The event
+    loop stays free while the analysis runs. A client disconnect or the
+    deadline passing cancels the Deadline, so the worker stops at its next
+    stage check (an in-flight OpenAI stream is closed at its next chunk,
+    aborting the upstream request) and nothing is persisted.
+    """
+    try:
+        await admission.acquire(timeout=deadline.remaining())
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    started = time.monotonic()
+    
+    def finished(task: asyncio.Future):
+        admission.release(time.monotonic() - started)
+        # The worker may still fail after we stop waiting; retrieve its error so it is not logged as unhandled
+        task.cancelled() or task.exception()
+    
+    task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+    task.add_done_callback(finished)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=max(0.01, min(DISCONNECT_POLL_SECONDS, deadline.remaining())))
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            deadline.cancel("client_disconnected")
+            raise HTTPException(status_code=499, detail="Client closed request")
+        if deadline.expired():
+            deadline.cancel("deadline_exceeded")
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+def _resolve_profile(analyzer_instance: VibeMindOpenAI, profile_key: Optional[str]) -> str:
+    """Requested profile, else product_designer, else the first available profile."""
+    profile_key = profile_key or "product_designer"
+    
+    # Check if profile exists
+    if profile_key not in analyzer_instance.profiles:
+        # Use default profile if specified one doesn't exist
+        available_profiles = list(analyzer_instance.profiles.keys())
+        if available_profiles:
+            profile_key = available_profiles[0]
+        else:
+            raise HTTPException(status_code=404, detail="No profiles available")
+    
+    return profile_key
+
+def _run_analysis(
+    analyzer_instance: VibeMindOpenAI,
+    image_input: Union[str, bytes],
+    message: Optional[str],
+    profile_key: Optional[str],
+    platform_target: Optional[str],
+    previous_analysis_id: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    source_size: Optional[Tuple[int, int]] = None,
+    fields: Optional[List[str]] = None
+) -> Response:
+    """Analyze an image (URL or raw bytes), queue the handoff for persistence and build the response."""
+    profile_key = _resolve_profile(analyzer_instance, profile_key)
+    platform_target = platform_target or "v0"
+    
+    # Perform analysis
+    try:
+        handoff = analyzer_instance.analyze_image(
+            image_input=image_input,
+            designer_profile_key=profile_key,
+            platform_target=platform_target,
+            project_context={"message": message} if message else None,
+            output_mode="json",
+            previous_analysis_id=previous_analysis_id,
+            deadline=deadline,
+            source_size=source_size
+        )
+        # Abandoned requests are not persisted
+        if deadline is not None:
+            deadline.check("finalize")
+    except ImageRejected as e:
+        # Refused from the header probe, before any pixel decode
+        raise HTTPException(status_code=415 if e.reason == "format" else 413, detail=str(e))
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RequestCancelled as e:
+        raise _cancelled(e)
+    
+    # Queue handoff for background persistence
+    return _analysis_response(handoff, _submit_handoff(handoff), fields)
+
+def _run_flow(
+    analyzer_instance: VibeMindOpenAI,
+    image_inputs: List[Union[str, bytes]],
+    message: Optional[str],
+    profile_key: Optional[str],
+    platform_target: Optional[str],
+    deadline: Optional[Deadline] = None,
+    fields: Optional[List[str]] = None
+) -> Response:
+    """Analyze a flow, queue its screen handoffs for persistence and build the response."""
+    try:
+        flow = analyzer_instance.analyze_flow(
+            image_inputs,
+            designer_profile_key=_resolve_profile(analyzer_instance, profile_key),
+            platform_target=platform_target or "v0",
+            project_context={"message": message} if message else None,
+            deadline=deadline
+        )
+        if deadline is not None:
+            deadline.check("finalize")
+    except ImageRejected as e:
+        raise HTTPException(status_code=415 if e.reason == "format" else 413, detail=str(e))
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RequestCancelled as e:
+        raise _cancelled(e)
+    
+    return _flow_response(flow, fields)
+
 def set_openai_api_key(api_key: str):
     """Set the OpenAI API key in environment variables."""
     os.environ['OPENAI_API_KEY'] = api_key
@@ -92,47 +373,94 @@ async def set_api_key(request: ApiKeyRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to set API key: {str(e)}")
 
-@app.get("/api/profiles")
-async def get_profiles():
-    """Get all available designer profiles."""
+def _parse_size(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse a "<width>x<height>" header value (None when absent or malformed)."""
     try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except (AttributeError, ValueError):
+        return None
+    return (width, height) if width > 0 and height > 0 else None
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 specifies for it)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def _metadata_response(request: Request, name: str, build: Callable[[VibeMindOpenAI], dict]) -> Response:
+    """Serve a metadata document serialized once per config version, with a strong ETag (304 on a match)."""
+    version = config_version()
+    cached = _metadata_responses.get(name)
+    if cached is None or cached[0] != version:
         analyzer_instance = get_analyzer()
-        profiles = analyzer_instance.profiles
-        
-        # Convert DesignerProfile objects to dictionaries
-        profiles_dict = {}
-        for key, profile in profiles.items():
-            profiles_dict[key] = {
-                "name": profile.name,
-                "description": profile.description,
-                "analysis_steps": profile.analysis_steps,
-                "platform_targets": profile.platform_targets,
-                "specializations": profile.specializations
-            }
-        
-        return {"status": "success", "profiles": profiles_dict}
+        analyzer_instance.refresh_configs()
+        body = encode_json({"status": "success", name: build(analyzer_instance)})
+        cached = _metadata_responses[name] = (version, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        metrics.inc("metadata_serialized")
+    _, body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": METADATA_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.inc("metadata_not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _profiles_document(analyzer_instance: VibeMindOpenAI) -> dict:
+    return {
+        key: {
+            "name": profile.name,
+            "description": profile.description,
+            "analysis_steps": profile.analysis_steps,
+            "platform_targets": profile.platform_targets,
+            "specializations": profile.specializations
+        }
+        for key, profile in analyzer_instance.profiles.items()
+    }
+
+def _platforms_document(analyzer_instance: VibeMindOpenAI) -> dict:
+    return {
+        platform: analyzer_instance.get_platform_info(platform)
+        for platform in analyzer_instance.get_available_platforms()
+    }
+
+@app.get("/api/preprocessing")
+async def get_preprocessing(request: Request):
+    """Image preprocessing parameters, so clients can downscale and encode before upload."""
+    try:
+        return _metadata_response(
+            request, "preprocessing", lambda analyzer_instance: analyzer_instance.preprocessor.client_params()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get preprocessing parameters: {str(e)}")
+
+@app.get("/api/profiles")
+async def get_profiles(request: Request):
+    """Get all available designer profiles (ETag / If-None-Match aware)."""
+    try:
+        return _metadata_response(request, "profiles", _profiles_document)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get profiles: {str(e)}")
 
 @app.get("/api/platforms")
-async def get_platforms():
-    """Get all available platform targets."""
+async def get_platforms(request: Request):
+    """Get all available platform targets (ETag / If-None-Match aware)."""
     try:
-        analyzer_instance = get_analyzer()
-        platforms = analyzer_instance.get_available_platforms()
-        
-        # Get platform info
-        platform_info = {}
-        for platform in platforms:
-            platform_info[platform] = analyzer_instance.get_platform_info(platform)
-        
-        return {"status": "success", "platforms": platform_info}
+        return _metadata_response(request, "platforms", _platforms_document)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get platforms: {str(e)}")
 
 @app.post("/api/analyze")
-async def analyze_image(request: AnalysisRequest):
-    """Analyze an image with optional profile and platform target."""
+async def analyze_image(
+    request: AnalysisRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    x_deadline_ms: Optional[str] = Header(None)
+):
+    """Analyze an image with optional profile and platform target.
+    
+    X-Deadline-Ms sets the request's time budget (capped by the server);
+    fields= (comma-separated, dotted paths allowed) trims the response.
+    """
     try:
         # Set API key if provided
         if request.api_key:
@@ -143,17 +471,13 @@ async def analyze_image(request: AnalysisRequest):
         # Handle base64 image data
         image_input = None
         if request.image_base64:
-            # Create a temporary file from base64 data
-            image_data = base64.b64decode(request.image_base64)
-            
-            # Create temp file with appropriate extension
-            file_extension = '.jpg'  # default
-            if request.image_filename:
-                file_extension = os.path.splitext(request.image_filename)[1] or '.jpg'
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-                tmp_file.write(image_data)
-                image_input = tmp_file.name
+            # Decode straight to bytes that Pillow reads in place (no temp file)
+            try:
+                image_input = decode_base64_image(request.image_base64)
+            except (binascii.Error, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid base64 image data")
+            # Release the base64 string now rather than after the analysis
+            request.image_base64 = None
         elif request.image_url:
             image_input = request.image_url
         else:
@@ -162,160 +486,155 @@ async def analyze_image(request: AnalysisRequest):
                 raise HTTPException(status_code=400, detail="No image or message provided")
             
             # For text-only analysis, we'll create a simple response
-            return {
+            return _sparse({
                 "status": "success",
                 "structured_result": {
                     "analysis_result": f"Text analysis: {request.message}",
                     "confidence_score": 0.8
                 },
                 "summarized_report": f"Enhanced prompt: {request.message}"
-            }
-        
-        try:
-            # Determine profile and platform
-            profile_key = request.profile_key or "product_designer"
-            platform_target = request.platform_target or "v0"
-            
-            # Check if profile exists
-            if profile_key not in analyzer_instance.profiles:
-                # Use default profile if specified one doesn't exist
-                available_profiles = list(analyzer_instance.profiles.keys())
-                if available_profiles:
-                    profile_key = available_profiles[0]
-                else:
-                    raise HTTPException(status_code=404, detail="No profiles available")
-            
-            # Perform analysis
-            handoff = analyzer_instance.analyze_image(
-                image_input=image_input,
-                designer_profile_key=profile_key,
-                platform_target=platform_target,
-                project_context={"message": request.message} if request.message else None,
-                output_mode="json"
-            )
-            
-            # Convert DesignHandoff to compatible format
-            structured_result = {
-                "analysis_result": handoff.prompt_for_platform,
-                "confidence_score": handoff.confidence_score,
-                "designer_profile": handoff.designer_profile,
-                "platform_target": handoff.platform_target,
-                "dominant_colors": [{"hex": color.hex, "name": color.name} for color in handoff.dominant_colors],
-                "components": [{"type": comp.type, "description": comp.description} for comp in handoff.components],
-                "uncertain_flags": handoff.uncertain_flags
-            }
-            
-            # Generate summarized report
-            summarized_report = handoff.prompt_for_platform
-            if len(summarized_report) > 500:
-                summarized_report = summarized_report[:500] + "..."
-            
-            # Save handoff if needed
-            try:
-                output_file = analyzer_instance.save_handoff(handoff)
-            except Exception as e:
-                print(f"Warning: Could not save handoff: {e}")
-                output_file = None
-            
-            return {
-                "status": "success",
-                "structured_result": structured_result,
-                "summarized_report": summarized_report,
-                "files": {
-                    "handoff_file": output_file
-                }
-            }
+            }, _parse_fields(fields))
         
-        finally:
-            # Clean up temporary file if it was created
-            if request.image_base64 and image_input and os.path.exists(image_input):
-                os.unlink(image_input)
-            
+        deadline = Deadline.from_header(x_deadline_ms)
+        return await _run_cancellable(
+            http_request, deadline, _run_analysis,
+            analyzer_instance, image_input, request.message, request.profile_key, request.platform_target,
+            request.previous_analysis_id, deadline, fields=_parse_fields(fields)
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @app.post("/api/analyze-upload")
 async def analyze_uploaded_image(
+    http_request: Request,
     file: UploadFile = File(...),
     message: str = Form(...),
     profile_key: Optional[str] = Form(None),
     platform_target: Optional[str] = Form("v0"),
-    api_key: str = Form(...)
+    api_key: str = Form(...),
+    previous_analysis_id: Optional[str] = Form(None),
+    fields: Optional[str] = None,
+    x_deadline_ms: Optional[str] = Header(None)
 ):
     """Analyze an uploaded image file."""
     try:
         # Set API key
         set_openai_api_key(api_key)
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            temp_path = tmp_file.name
+        # Read the upload into memory; Pillow decodes from the bytes directly
+        image_data = await file.read(MAX_UPLOAD_BYTES + 1)
+        if len(image_data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image too large")
         
-        try:
-            analyzer_instance = get_analyzer(api_key=api_key)
-            
-            # Determine profile and platform
-            profile_key = profile_key or "product_designer"
-            platform_target = platform_target or "v0"
-            
-            # Check if profile exists
-            if profile_key not in analyzer_instance.profiles:
-                available_profiles = list(analyzer_instance.profiles.keys())
-                if available_profiles:
-                    profile_key = available_profiles[0]
-                else:
-                    raise HTTPException(status_code=404, detail="No profiles available")
-            
-            # Perform analysis
-            handoff = analyzer_instance.analyze_image(
-                image_input=temp_path,
-                designer_profile_key=profile_key,
-                platform_target=platform_target,
-                project_context={"message": message} if message else None,
-                output_mode="json"
-            )
-            
-            # Convert DesignHandoff to compatible format
-            structured_result = {
-                "analysis_result": handoff.prompt_for_platform,
-                "confidence_score": handoff.confidence_score,
-                "designer_profile": handoff.designer_profile,
-                "platform_target": handoff.platform_target,
-                "dominant_colors": [{"hex": color.hex, "name": color.name} for color in handoff.dominant_colors],
-                "components": [{"type": comp.type, "description": comp.description} for comp in handoff.components],
-                "uncertain_flags": handoff.uncertain_flags
-            }
-            
-            # Generate summarized report
-            summarized_report = handoff.prompt_for_platform
-            if len(summarized_report) > 500:
-                summarized_report = summarized_report[:500] + "..."
-            
-            # Save handoff if needed
-            try:
-                output_file = analyzer_instance.save_handoff(handoff)
-            except Exception as e:
-                print(f"Warning: Could not save handoff: {e}")
-                output_file = None
-            
-            return {
-                "status": "success",
-                "structured_result": structured_result,
-                "summarized_report": summarized_report,
-                "files": {
-                    "handoff_file": output_file
-                }
-            }
-                
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            
+        analyzer_instance = get_analyzer(api_key=api_key)
+        deadline = Deadline.from_header(x_deadline_ms)
+        return await _run_cancellable(
+            http_request, deadline, _run_analysis,
+            analyzer_instance, image_data, message, profile_key, platform_target, previous_analysis_id, deadline,
+            fields=_parse_fields(fields)
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@app.post("/api/analyze-binary")
+async def analyze_binary_image(
+    request: Request,
+    message: Optional[str] = None,
+    profile_key: Optional[str] = None,
+    platform_target: Optional[str] = "v0",
+    previous_analysis_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+    x_deadline_ms: Optional[str] = Header(None),
+    x_source_size: Optional[str] = Header(None)
+):
+    """Analyze a raw image body (application/octet-stream or image/*).
+    
+    Options are query parameters and the OpenAI key is sent in the X-API-Key
+    header, so the image needs neither base64 nor multipart encoding.
+    Clients that downscaled the image first (see /api/preprocessing) send
+    the original size as X-Source-Size: <width>x<height>.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type != "application/octet-stream" and not content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail="Expected application/octet-stream or image/* body")
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    
+    try:
+        if x_api_key:
+            set_openai_api_key(x_api_key)
+        
+        image_data = await request.body()
+        if not image_data:
+            raise HTTPException(status_code=400, detail="Empty request body")
+        if len(image_data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image too large")
+        
+        analyzer_instance = get_analyzer(api_key=x_api_key)
+        deadline = Deadline.from_header(x_deadline_ms)
+        return await _run_cancellable(
+            request, deadline, _run_analysis,
+            analyzer_instance, image_data, message, profile_key, platform_target, previous_analysis_id, deadline,
+            _parse_size(x_source_size), fields=_parse_fields(fields)
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/api/analyze-flow")
+async def analyze_flow(
+    request: FlowAnalysisRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    x_deadline_ms: Optional[str] = Header(None)
+):
+    """Analyze the screens of a user flow together in one vision call."""
+    if not request.images:
+        raise HTTPException(status_code=400, detail="No screens provided")
+    if len(request.images) > MAX_FLOW_SCREENS:
+        raise HTTPException(status_code=400, detail=f"A flow can have at most {MAX_FLOW_SCREENS} screens")
+    
+    try:
+        if request.api_key:
+            set_openai_api_key(request.api_key)
+        
+        analyzer_instance = get_analyzer(api_key=request.api_key)
+        
+        # URLs and data URLs are loaded as-is; raw base64 is decoded to bytes
+        image_inputs = []
+        for image in request.images:
+            if image.startswith(("http://", "https://", "data:image")):
+                image_inputs.append(image)
+                continue
+            try:
+                image_inputs.append(decode_base64_image(image))
+            except (binascii.Error, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid base64 image data")
+        request.images = []
+        
+        deadline = Deadline.from_header(x_deadline_ms)
+        return await _run_cancellable(
+            http_request, deadline, _run_flow,
+            analyzer_instance, image_inputs, request.message, request.profile_key, request.platform_target, deadline,
+            fields=_parse_fields(fields)
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Flow analysis failed: {str(e)}")
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
@@ -324,13 +643,18 @@ async def health_check():
         analyzer_instance = get_analyzer()
         profile_count = len(analyzer_instance.profiles)
         platform_count = len(analyzer_instance.platform_handoffs)
+        breaker = get_vision_breaker().snapshot()
         
         return {
-            "status": "healthy", 
+            # Degraded: the OpenAI circuit is open or probing; cached results are still served
+            "status": "healthy" if breaker["state"] == "closed" else "degraded",
             "timestamp": datetime.now().isoformat(),
             "profiles_loaded": profile_count,
             "platforms_available": platform_count,
-            "openai_configured": bool(os.getenv("OPENAI_API_KEY"))
+            "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
+            "circuit_breaker": breaker,
+            "admission": admission.snapshot(),
+            "openai_transport": get_shared_transport().snapshot()
         }
     except Exception as e:
         return {
@@ -339,6 +663,112 @@ async def health_check():
             "error": str(e)
         }
 
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO-8601 timestamp or epoch seconds query parameter."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.get("/api/handoffs")
+def query_handoffs(
+    image_hash: Optional[str] = None,
+    profile: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """List stored handoffs matching the filters, newest first."""
+    try:
+        records = handoff_store.query(
+            image_hash=image_hash,
+            profile=profile,
+            platform=platform,
+            since=_parse_time(since),
+            until=_parse_time(until),
+            limit=max(1, min(limit, 500)),
+            offset=max(0, offset)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {str(e)}")
+    return {"status": "success", "count": len(records), "handoffs": records}
+
+@app.get("/api/handoffs/{handoff_id}")
+def get_handoff(handoff_id: str):
+    """Return a stored handoff record."""
+    data = handoff_store.get_raw(handoff_id)
+    if data is None:
+        handoff_writer.flush(timeout=1.0)  # it may still be queued
+        data = handoff_store.get_raw(handoff_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Handoff '{handoff_id}' not found")
+    return Response(content=data, media_type="application/json")
+
+_WINDOW_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+
+def _parse_window(value: str) -> float:
+    """Parse a rolling window such as '15m', '24h' or '7d' into seconds."""
+    value = value.strip()
+    if len(value) < 2 or value[-1] not in _WINDOW_SECONDS or not value[:-1].isdigit():
+        raise ValueError(f"Invalid window '{value}' (use e.g. 15m, 24h, 7d)")
+    return int(value[:-1]) * _WINDOW_SECONDS[value[-1]]
+
+@app.get("/api/usage")
+def get_usage(
+    windows: str = "1h,24h,7d",
+    group_by: str = "key_hash,profile,platform",
+    key_hash: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Token and cost totals per rolling window, grouped by hashed API key, profile and platform.
+    
+    Callers see only their own key's usage (X-API-Key). Reports across keys,
+    or for another key_hash, need X-Admin-Token matching USAGE_ADMIN_TOKEN.
+    Cache hits are counted with the cost of the analysis they reused as
+    saved_cost_usd.
+    """
+    admin = bool(USAGE_ADMIN_TOKEN and x_admin_token) and hmac.compare_digest(x_admin_token, USAGE_ADMIN_TOKEN)
+    if not admin:
+        if not x_api_key:
+            raise HTTPException(status_code=401, detail="Send X-API-Key to see its usage")
+        own = hash_api_key(x_api_key)
+        if key_hash and key_hash != own:
+            raise HTTPException(status_code=403, detail="Usage of other API keys needs X-Admin-Token")
+        key_hash = own
+    elif x_api_key and not key_hash:
+        key_hash = hash_api_key(x_api_key)
+    columns = tuple(column.strip() for column in group_by.split(",") if column.strip())
+    now = time.time()
+    report = {}
+    try:
+        for window in (w.strip() for w in windows.split(",") if w.strip()):
+            since = now - _parse_window(window)
+            totals = handoff_store.usage_summary(since, group_by=(), key_hash=key_hash)
+            totals = totals[0] if totals else {"handoffs": 0, "cache_hits": 0, "cost_usd": 0.0, "saved_cost_usd": 0.0}
+            totals["cache_hit_rate"] = round(totals["cache_hits"] / totals["handoffs"], 4) if totals["handoffs"] else 0.0
+            report[window] = {
+                "totals": totals,
+                "groups": handoff_store.usage_summary(since, group_by=columns, key_hash=key_hash)
+            }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "timestamp": datetime.now().isoformat(), "windows": report}
+
+@app.get("/api/metrics")
+async def get_metrics(format: str = "json"):
+    """Process metrics (handoff writer queue depth, write latency, admission queue, ...).
+    
+    format=prometheus returns the Prometheus text exposition format for scraping.
+    """
+    if format == "prometheus":
+        return Response(content=metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return {"status": "success", "timestamp": datetime.now().isoformat(), "metrics": metrics.snapshot()}
+
 @app.post("/api/shutdown")
 async def shutdown_server():
     """Gracefully shutdown the server."""
@@ -349,6 +779,7 @@ async def shutdown_server():
         # Give time for response to be sent
         import time
         time.sleep(0.5)
+        handoff_writer.flush(timeout=5)
         os.kill(os.getpid(), signal.SIGTERM)
     
     # Schedule shutdown in background
@@ -368,9 +799,16 @@ async def root():
             "health": "/api/health",
             "profiles": "/api/profiles",
             "platforms": "/api/platforms",
+            "preprocessing": "/api/preprocessing",
             "analyze": "/api/analyze",
             "analyze_upload": "/api/analyze-upload",
-            "set_api_key": "/api/set-api-key"
+            "analyze_binary": "/api/analyze-binary",
+            "analyze_flow": "/api/analyze-flow",
+            "set_api_key": "/api/set-api-key",
+            "handoffs": "/api/handoffs",
+            "handoff": "/api/handoffs/{handoff_id}",
+            "metrics": "/api/metrics",
+            "usage": "/api/usage"
         },
         "features": [
             "OpenAI Vision API integration",
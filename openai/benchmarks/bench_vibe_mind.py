@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Vibe Mind Micro-Benchmarks
+
+Offline micro-benchmark suite for the image preprocessing and handoff
+construction paths. No network access and no OpenAI calls are made: every
+input is a synthetic UI-like screenshot drawn with PIL, and the analysis
+dict fed into the handoff builders is canned.
+
+Usage:
+    python benchmarks/bench_vibe_mind.py                       # run and save results
+    python benchmarks/bench_vibe_mind.py --quick               # fewer iterations
+    python benchmarks/bench_vibe_mind.py --filter resize_image
+    python benchmarks/bench_vibe_mind.py --baseline benchmarks/results/old.json --threshold 0.15
+
+Results are written as JSON (one entry per case with min/median/mean/p95 in
+milliseconds) so runs from different commits can be compared. When a baseline
+is given, any case whose median is slower than the baseline by more than the
+threshold is reported and the script exits with status 1.
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+# PlatformHandoffGenerator builds its own analyzer; a placeholder key is enough
+# because the benchmarks never reach the network.
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-offline-placeholder")
+
+from PIL import Image, ImageDraw
+
+from vibe_mind import VibeMindOpenAI, ImagePreprocessor
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# (width, height) pairs covering phone, tablet, desktop and oversized captures
+IMAGE_SIZES: List[Tuple[int, int]] = [
+    (390, 844),     # phone portrait, already under max dimension on one side
+    (1280, 800),    # laptop 16:10
+    (1920, 1080),   # desktop 16:9
+    (2880, 1800),   # retina laptop
+    (1080, 4000),   # long scrolling capture
+    (3840, 2160),   # 4K
+]
+
+IMAGE_FORMATS = ["JPEG", "PNG", "WEBP"]
+
+# Color extraction backends available on ImagePreprocessor
+COLOR_BACKENDS: Dict[str, Callable[[ImagePreprocessor, Image.Image], Any]] = {
+    "kmeans": lambda pre, img: pre.extract_dominant_colors(img),
+}
+
+SAMPLE_ANALYSIS: Dict[str, Any] = {
+    "layout_analysis": "Dashboard with top navbar, left sidebar and a 3-column card grid",
+    "visual_design": "Inter, 14px body, 24px headings, blue primary with neutral grays",
+    "components_identified": [
+        {"type": "Navbar", "location": "top", "description": "Logo, search and avatar menu",
+         "properties": {"height": "64px"}, "confidence": 0.9},
+        {"type": "Sidebar", "location": "left", "description": "Navigation with 6 items",
+         "properties": {"width": "240px"}, "confidence": 0.85},
+        {"type": "Card", "location": "main", "description": "KPI card with value and trend",
+         "properties": {"variant": "outlined"}, "confidence": 0.8},
+        {"type": "Button", "location": "top-right", "description": "Primary CTA",
+         "properties": {"variant": "filled", "size": "md"}, "confidence": 0.9},
+    ],
+    "interaction_patterns": "Hover states on cards, dropdown on avatar",
+    "technical_specifications": "CSS grid, 24px gutters, responsive at 768px and 1024px",
+    "accessibility_notes": ["Check contrast of muted text", "Add focus rings to nav items"],
+    "implementation_prompt": "Create an analytics dashboard with a top navbar, a left sidebar "
+                             "and a responsive grid of KPI cards using shadcn/ui. " * 8,
+    "confidence_score": 0.82,
+    "uncertain_elements": ["Chart library"],
+}
+
+
+def make_ui_image(width: int, height: int, mode: str = "RGB") -> Image.Image:
+    """Draw a synthetic UI-like screenshot: navbar, sidebar, cards, buttons and text lines"""
+    background = (248, 250, 252, 255) if mode == "RGBA" else (248, 250, 252)
+    image = Image.new(mode, (width, height), background)
+    draw = ImageDraw.Draw(image)
+
+    navbar_h = max(24, height // 14)
+    sidebar_w = max(60, width // 6)
+    gutter = max(8, width // 80)
+
+    # Navbar with logo, search field and avatar
+    draw.rectangle([0, 0, width, navbar_h], fill=(15, 23, 42))
+    draw.rectangle([gutter, navbar_h // 4, gutter + navbar_h * 2, navbar_h * 3 // 4], fill=(59, 130, 246))
+    draw.rounded_rectangle([width // 3, navbar_h // 4, width * 2 // 3, navbar_h * 3 // 4],
+                           radius=navbar_h // 6, fill=(30, 41, 59))
+    draw.ellipse([width - navbar_h, navbar_h // 6, width - navbar_h // 6, navbar_h * 5 // 6], fill=(148, 163, 184))
+
+    # Sidebar with nav items
+    draw.rectangle([0, navbar_h, sidebar_w, height], fill=(241, 245, 249))
+    item_h = max(12, navbar_h // 2)
+    y = navbar_h + gutter
+    for i in range(8):
+        color = (59, 130, 246) if i == 1 else (100, 116, 139)
+        draw.rectangle([gutter, y, sidebar_w - gutter, y + item_h // 2], fill=color)
+        y += item_h + gutter
+
+    # Card grid with text lines and buttons
+    content_x = sidebar_w + gutter
+    content_w = width - content_x - gutter
+    cols = 3
+    card_w = (content_w - gutter * (cols - 1)) // cols
+    card_h = max(60, card_w * 2 // 3)
+    y = navbar_h + gutter
+    accent = [(59, 130, 246), (16, 185, 129), (244, 63, 94)]
+    while y + card_h < height:
+        for c in range(cols):
+            x = content_x + c * (card_w + gutter)
+            draw.rounded_rectangle([x, y, x + card_w, y + card_h], radius=gutter, fill=(255, 255, 255),
+                                   outline=(226, 232, 240))
+            line_y = y + gutter
+            for line in range(4):
+                line_w = card_w - 2 * gutter - (line * card_w // 8)
+                draw.rectangle([x + gutter, line_y, x + gutter + line_w, line_y + max(2, gutter // 2)],
+                               fill=(51, 65, 85))
+                line_y += gutter + max(2, gutter // 2)
+            draw.rounded_rectangle([x + gutter, y + card_h - gutter * 3, x + card_w // 2, y + card_h - gutter],
+                                   radius=gutter // 2, fill=accent[c % len(accent)])
+        y += card_h + gutter
+
+    return image
+
+
+def encode_image(image: Image.Image, format: str = "PNG") -> bytes:
+    """Encode a PIL image to bytes in the given format"""
+    buffer = io.BytesIO()
+    if format == "JPEG" and image.mode == "RGBA":
+        image = image.convert("RGB")
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def time_call(func: Callable[[], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    """Time a callable and return summary statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "iterations": iterations,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[p95_index], 4),
+        "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+    }
+
+
+def build_cases(
+    workdir: Path, quick: bool = False, name_filter: Optional[str] = None
+) -> List[Tuple[str, Callable[[], Any], int]]:
+    """Build the list of (name, callable, iterations) benchmark cases
+
+    Fixtures are only synthesized for groups with at least one case selected by
+    ``name_filter``, so a filtered run skips the image work of the other cases.
+    """
+    scale = 0.2 if quick else 1.0
+
+    def iters(n: int) -> int:
+        return max(3, int(n * scale))
+
+    def wanted(*names: str) -> bool:
+        return not name_filter or any(name_filter in name for name in names)
+
+    preprocessor = ImagePreprocessor()
+    cases: List[Tuple[str, Callable[[], Any], int]] = []
+
+    # load_image: path, bytes and data URL inputs
+    load_names = {kind: f"load_image[{kind}]" for kind in ("path", "bytes", "data_url")}
+    if wanted(*load_names.values()):
+        source = make_ui_image(1920, 1080)
+        png_bytes = encode_image(source, "PNG")
+        png_path = workdir / "source.png"
+        png_path.write_bytes(png_bytes)
+        data_url = "data:image/png;base64," + base64.b64encode(png_bytes).decode()
+
+        load_inputs = {"path": str(png_path), "bytes": png_bytes, "data_url": data_url}
+        for kind, value in load_inputs.items():
+            cases.append((
+                load_names[kind],
+                lambda value=value: preprocessor.load_image(value).load(),
+                iters(30),
+            ))
+
+    # Header probe plus reduced-resolution decode of a large JPEG, as analyze_image does
+    if wanted("load_and_resize[jpeg_4000x3000]"):
+        large_jpeg = encode_image(make_ui_image(4000, 3000), "JPEG")
+        cases.append((
+            "load_and_resize[jpeg_4000x3000]",
+            lambda: preprocessor.resize_image(preprocessor.load_image(large_jpeg)),
+            iters(10),
+        ))
+
+    # Projection-based auto-crop on a screenshot with blank margins
+    if wanted("auto_crop[1920x1080]"):
+        margined = Image.new("RGB", (1920, 1080), (255, 255, 255))
+        margined.paste(make_ui_image(1200, 800), (360, 140))
+        cases.append((
+            "auto_crop[1920x1080]",
+            lambda: preprocessor.auto_crop(margined),
+            iters(20),
+        ))
+
+    # Local layout-grid and spacing detection on a resized screenshot
+    if wanted("detect_layout[1920x1080]"):
+        from image_analysis import detect_layout
+        layout_source = preprocessor.resize_image(make_ui_image(1920, 1080))
+        cases.append((
+            "detect_layout[1920x1080]",
+            lambda: detect_layout(layout_source, 1920 / layout_source.size[0]),
+            iters(30),
+        ))
+
+    # Text-line type scale estimation on the 1280px detail image
+    if wanted("estimate_typography[1920x1080]"):
+        from image_analysis import estimate_typography
+        detail_source = make_ui_image(1920, 1080).reduce(2)
+        cases.append((
+            "estimate_typography[1920x1080]",
+            lambda: estimate_typography(detail_source, 2.0, budget_ms=1000.0),
+            iters(30),
+        ))
+
+    # resize_image across sizes and aspect ratios
+    for width, height in IMAGE_SIZES:
+        name = f"resize_image[{width}x{height}]"
+        if not wanted(name):
+            continue
+        image = make_ui_image(width, height)
+        cases.append((name, lambda image=image: preprocessor.resize_image(image), iters(20)))
+
+    color_names = {backend: f"extract_dominant_colors[{backend}]" for backend in COLOR_BACKENDS}
+    format_names = {format: f"image_to_base64[{format}]" for format in IMAGE_FORMATS}
+    handoff_names = ["_create_handoff_json", "to_dict", "to_json_bytes", "save_handoff"]
+    try:
+        from handoff.platform_handoff_generator import PlatformHandoffGenerator
+    except ImportError as e:
+        print(f"⚠️  Skipping PlatformHandoffGenerator benchmarks: {e}")
+        generator = None
+        prompt_names: Dict[str, str] = {}
+    else:
+        generator = PlatformHandoffGenerator()
+        prompt_names = {key: f"generate_platform_prompt[{key}]" for key in generator.configs}
+    if not wanted(*color_names.values(), *format_names.values(), "image_to_base64[JPEG-from-RGBA]",
+                  *handoff_names, *prompt_names.values()):
+        return cases
+
+    # extract_dominant_colors per backend, on a typical resized screenshot
+    resized = preprocessor.resize_image(make_ui_image(1920, 1080))
+    for backend, extract in COLOR_BACKENDS.items():
+        if wanted(color_names[backend]):
+            cases.append((
+                color_names[backend],
+                lambda extract=extract: extract(preprocessor, resized),
+                iters(10),
+            ))
+
+    # image_to_base64 per output format, including the RGBA -> JPEG flattening path
+    for format in IMAGE_FORMATS:
+        if wanted(format_names[format]):
+            cases.append((
+                format_names[format],
+                lambda format=format: preprocessor.image_to_base64(resized, format=format),
+                iters(30),
+            ))
+    if wanted("image_to_base64[JPEG-from-RGBA]"):
+        rgba = preprocessor.resize_image(make_ui_image(1920, 1080, mode="RGBA"))
+        cases.append((
+            "image_to_base64[JPEG-from-RGBA]",
+            lambda: preprocessor.image_to_base64(rgba, format="JPEG"),
+            iters(30),
+        ))
+
+    if not wanted(*handoff_names, *prompt_names.values()):
+        return cases
+    colors = preprocessor.extract_dominant_colors(resized)
+
+    # Handoff construction and serialization
+    if wanted(*handoff_names):
+        analyzer = VibeMindOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        profile = next(iter(analyzer.profiles.values()))
+
+        def create_handoff():
+            return analyzer._create_handoff_json(SAMPLE_ANALYSIS, colors, profile, "v0", "bench.png")
+
+        handoff = create_handoff()
+        handoff_path = workdir / "handoff.json"
+        handoff_cases = [
+            ("_create_handoff_json", create_handoff, iters(500)),
+            ("to_dict", handoff.to_dict, iters(500)),
+            ("to_json_bytes", handoff.to_json_bytes, iters(500)),
+            ("save_handoff", lambda: analyzer.save_handoff(handoff, str(handoff_path)), iters(200)),
+        ]
+        cases.extend(case for case in handoff_cases if wanted(case[0]))
+
+    # Prompt rendering in PlatformHandoffGenerator
+    if generator is not None:
+        analysis_result = dict(SAMPLE_ANALYSIS, dominant_colors=colors)
+        for platform_key, config in generator.configs.items():
+            if not wanted(prompt_names[platform_key]):
+                continue
+            scenario = next(iter(config.get("scenarios", {})), "default")
+            cases.append((
+                prompt_names[platform_key],
+                lambda platform_key=platform_key, scenario=scenario: generator.generate_platform_prompt(
+                    platform_key, scenario, analysis_result
+                ),
+                iters(500),
+            ))
+
+    return cases
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit hash, if available"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        )
+        return result.stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(quick: bool = False, name_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Run all benchmark cases and return the results document"""
+    results: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(Path(tmp), quick=quick, name_filter=name_filter)
+        for name, func, iterations in cases:
+            stats = time_call(func, iterations)
+            results[name] = stats
+            print(f"  {name:<45} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms")
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Compare medians against a baseline run and return regression messages"""
+    regressions = []
+    base_results = baseline.get("results", {})
+
+    for name, stats in current["results"].items():
+        if name not in base_results:
+            continue
+        base_median = base_results[name]["median_ms"]
+        if base_median <= 0:
+            continue
+        change = (stats["median_ms"] - base_median) / base_median
+        if change > threshold:
+            regressions.append(
+                f"{name}: {base_median:.3f} ms -> {stats['median_ms']:.3f} ms (+{change:.1%})"
+            )
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vibe Mind micro-benchmarks")
+    parser.add_argument("--output", help="Path for the results JSON (default: benchmarks/results/)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed median slowdown vs baseline before failing (default: 0.15)")
+    parser.add_argument("--quick", action="store_true", help="Run fewer iterations")
+    parser.add_argument("--filter", dest="name_filter", help="Only run cases whose name contains this")
+    args = parser.parse_args()
+
+    print("⏱️  Vibe Mind Micro-Benchmarks")
+    print("=" * 40)
+
+    document = run_benchmarks(quick=args.quick, name_filter=args.name_filter)
+
+    output_path = Path(args.output) if args.output else (
+        RESULTS_DIR / f"bench_{document['commit'] or 'nocommit'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"\n💾 Results saved to: {output_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(document, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  • {message}")
+            return 1
+        print(f"\n✅ No regressions above {args.threshold:.0%} vs {baseline.get('commit') or args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
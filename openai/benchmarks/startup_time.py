@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Vibe Mind Startup-Time Harness
+
+Measures cold import time of the backend entry modules in fresh interpreters
+and breaks it down per top-level package using `python -X importtime`.
+Budgets live in benchmarks/startup_budget.json and are enforced by the test
+suite (tests/test_startup_budget.py).
+
+Usage:
+    python benchmarks/startup_time.py                 # report vibe_mind and api_server
+    python benchmarks/startup_time.py api_server --top 25
+    python benchmarks/startup_time.py --check         # exit 1 if over budget
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+OPENAI_DIR = Path(__file__).parent.parent
+BUDGET_FILE = Path(__file__).parent / "startup_budget.json"
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = (time.perf_counter() - start) * 1000\n"
+    "print(json.dumps({{'import_ms': elapsed, 'modules': sorted(sys.modules)}}))\n"
+)
+
+
+def load_budget() -> Dict[str, Any]:
+    with open(BUDGET_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)["modules"]
+
+
+def measure_import(module: str, runs: int = 3) -> Dict[str, Any]:
+    """Import a module in fresh interpreters and return timing plus a per-package breakdown"""
+    timings = []
+    packages: Dict[str, float] = defaultdict(float)
+    loaded: List[str] = []
+
+    for run in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+            cwd=OPENAI_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(probe["import_ms"])
+        loaded = probe["modules"]
+
+        if run == 0:
+            # Self time summed per top-level package
+            for line in result.stderr.splitlines():
+                match = _IMPORTTIME_LINE.match(line)
+                if match:
+                    self_us, _, _, name = match.groups()
+                    packages[name.split(".")[0]] += int(self_us) / 1000
+
+    breakdown = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(timings), 1),
+        "runs_ms": [round(t, 1) for t in timings],
+        "breakdown_ms": [(name, round(ms, 2)) for name, ms in breakdown],
+        "loaded_modules": loaded,
+    }
+
+
+def check_budget(modules: List[str] = None, runs: int = 3) -> List[str]:
+    """Measure each budgeted module and return a list of budget violations"""
+    budget = load_budget()
+    violations = []
+
+    for module in modules or list(budget):
+        limits = budget[module]
+        measurement = measure_import(module, runs=runs)
+        loaded_top = {name.split(".")[0] for name in measurement["loaded_modules"]}
+
+        for forbidden in limits.get("forbidden_modules", []):
+            if forbidden in loaded_top:
+                violations.append(f"{module}: imports '{forbidden}' eagerly (must be lazy)")
+
+        if measurement["import_ms"] > limits["max_import_ms"]:
+            top = ", ".join(f"{name} {ms}ms" for name, ms in measurement["breakdown_ms"][:5])
+            violations.append(
+                f"{module}: import took {measurement['import_ms']}ms "
+                f"(budget {limits['max_import_ms']}ms; top: {top})"
+            )
+
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure Vibe Mind cold import time")
+    parser.add_argument("modules", nargs="*", help="Modules to measure (default: all budgeted modules)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter runs per module")
+    parser.add_argument("--top", type=int, default=15, help="Packages to show in the breakdown")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any module is over budget")
+    args = parser.parse_args()
+
+    budget = load_budget()
+    modules = args.modules or list(budget)
+
+    print("⏱️  Vibe Mind Startup Time")
+    print("=" * 40)
+    for module in modules:
+        measurement = measure_import(module, runs=args.runs)
+        limit = budget.get(module, {}).get("max_import_ms")
+        budget_text = f" (budget {limit}ms)" if limit else ""
+        print(f"\n📦 {module}: {measurement['import_ms']}ms median of {measurement['runs_ms']}{budget_text}")
+        for name, ms in measurement["breakdown_ms"][:args.top]:
+            print(f"    {name:<30} {ms:>9.2f} ms")
+
+    if args.check:
+        violations = check_budget(modules, runs=args.runs)
+        if violations:
+            print(f"\n❌ {len(violations)} startup budget violation(s):")
+            for violation in violations:
+                print(f"  • {violation}")
+            return 1
+        print("\n✅ Within startup budget")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
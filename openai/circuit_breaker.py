@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker for the OpenAI vision call
+
+Closed: calls go through; consecutive failures and consecutive slow calls
+(over latency_threshold_ms) are counted together.
+Open: after failure_threshold of them in a row, calls are refused at once
+(CircuitOpenError) for reset_timeout seconds instead of each waiting out the
+API timeout; callers can serve stale cached results meanwhile.
+Half-open: after reset_timeout a single probe call is let through; success
+closes the breaker, failure re-opens it for another reset_timeout.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# OpenAI SDK / httpx exception names for calls that never got a response
+_TRANSPORT_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException"}
+_TIMEOUT_ERRORS = {"APITimeoutError", "TimeoutException"}
+
+
+def _class_names(error: BaseException) -> set:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an API error says something about upstream health
+
+    5xx responses, connection failures and timeouts do; 4xx errors (a bad or
+    rate-limited key, a rejected request) are about the caller and must not
+    open a breaker shared by every tenant. Matched by status code and class
+    name so the OpenAI SDK is not imported here.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or bool(_class_names(error) & _TRANSPORT_ERRORS)
+
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, TimeoutError) or bool(_class_names(error) & _TIMEOUT_ERRORS)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure / slow-call breaker with a half-open probe"""
+
+    def __init__(
+        self,
+        name: str = "openai",
+        failure_threshold: int = 5,
+        latency_threshold_ms: float = 30000.0,
+        reset_timeout: float = 30.0,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_threshold_ms = latency_threshold_ms
+        self.reset_timeout = reset_timeout
+        self.metrics = registry
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+
+        self.metrics.register_gauge(f"circuit_{name}_state", lambda: _STATE_VALUES[self.state])
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        """BREAKER_FAILURES / BREAKER_LATENCY_MS / BREAKER_RESET_SECONDS"""
+        return cls(
+            failure_threshold=int(os.getenv("BREAKER_FAILURES", "5")),
+            latency_threshold_ms=float(os.getenv("BREAKER_LATENCY_MS", "30000")),
+            reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through (0 when closed)"""
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def rejecting(self) -> bool:
+        """Whether a call made now would be refused (does not claim the probe)"""
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() < self._opened_at + self.reset_timeout
+            return self._state == HALF_OPEN and self._probe_in_flight
+
+    def acquire(self):
+        """Admit a call or raise CircuitOpenError; the caller must then record its outcome"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.metrics.inc(f"circuit_{self.name}_probes")
+                return
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        self.metrics.inc(f"circuit_{self.name}_rejected")
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self, latency_ms: float):
+        """Record a completed call; calls slower than latency_threshold_ms count as failures"""
+        if latency_ms > self.latency_threshold_ms:
+            self.metrics.inc(f"circuit_{self.name}_slow_calls")
+            self.record_failure(f"slow call ({latency_ms:.0f} ms)")
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                self.metrics.inc(f"circuit_{self.name}_closed")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_ignored(self):
+        """Record a call whose error says nothing about upstream health (frees a half-open probe)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[str] = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.metrics.inc(f"circuit_{self.name}_opened")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for /api/health"""
+        with self._lock:
+            retry_after = 0.0
+            if self._state != CLOSED:
+                retry_after = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "latency_threshold_ms": self.latency_threshold_ms,
+                "retry_after": round(retry_after, 1),
+                "last_error": self._last_error,
+            }
+
+
+_vision_breaker: Optional[CircuitBreaker] = None
+_vision_breaker_lock = threading.Lock()
+
+
+def get_vision_breaker() -> CircuitBreaker:
+    """Process-wide breaker shared by every analyzer instance"""
+    global _vision_breaker
+    with _vision_breaker_lock:
+        if _vision_breaker is None:
+            _vision_breaker = CircuitBreaker.from_env()
+        return _vision_breaker
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Response compression for the API server
+
+ASGI middleware that compresses complete (single-message) responses of at
+least minimum_size bytes with the best encoding the client accepts: brotli
+when the optional `brotli` package is installed, else gzip. Streamed
+responses, already-encoded bodies and small payloads pass through
+unchanged. Every response that could be compressed for some client carries
+Vary: Accept-Encoding, compressed or not, and a strong ETag on a compressed
+response is made weak, since the encoded bytes are a different
+representation from the identity body.
+"""
+
+import gzip
+import os
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Larger bodies are compressed in the threadpool rather than on the event loop
+COMPRESS_THREADPOOL_BYTES = int(os.getenv("COMPRESS_THREADPOOL_BYTES", "65536"))
+
+# Mid-range levels: most of the size reduction at a fraction of the CPU of the maximum
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header (honouring q=0), or None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    def acceptable(encoding: str) -> bool:
+        return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and acceptable("br"):
+        return "br"
+    if acceptable("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression of complete responses above a size threshold"""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, threadpool_size: int = COMPRESS_THREADPOOL_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_size = threadpool_size
+
+    @staticmethod
+    def _eligible(status: int, headers: MutableHeaders) -> bool:
+        """Whether the response could be compressed for some client (304s stand in for their 200)"""
+        if "content-encoding" in headers:
+            return False
+        return status == 304 or headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if not self._eligible(message["status"], headers):
+                    await send(message)
+                    return
+                # Whether or not this one is compressed, the body depends on Accept-Encoding,
+                # so shared caches must not serve it to clients that negotiate differently
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    await send(message)
+                    return
+                # Held back until the body shows whether the response is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(response_start)
+                await send(message)
+                return
+
+            if len(body) >= self.threadpool_size:
+                compressed = await run_in_threadpool(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            metrics.inc(f"response_compressed_{encoding}")
+            metrics.inc("response_bytes_saved", len(body) - len(compressed))
+            await send(response_start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Per-request deadlines and cancellation
+
+A Deadline is created for each API request from the X-Deadline-Ms header,
+capped by REQUEST_DEADLINE_SECONDS (also the default), and split into
+cumulative stage checkpoints: preprocessing must start before its share of
+the budget has elapsed, the OpenAI call gets the time left to its checkpoint
+as its timeout, and so on. Time a stage does not use carries over to the
+next one.
+
+Work calls check(stage) before each stage. Cancelling the deadline (the
+client disconnected) makes the next check raise RequestCancelled, so
+abandoned requests stop using capacity; the OpenAI call itself is streamed
+and closed at the next chunk once the deadline is cancelled. Cancelled and
+timed-out work is counted per stage in /api/metrics.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+# Share of the request budget per stage, in order
+STAGE_SHARES: Tuple[Tuple[str, float], ...] = (
+    ("preprocess", 0.2),
+    ("openai", 0.7),
+    ("finalize", 0.1),
+)
+
+MAX_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+# Floor for client-supplied deadlines, so a tiny X-Deadline-Ms cannot force OpenAI timeouts
+MIN_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_MIN_SECONDS", "5"))
+
+
+class RequestCancelled(Exception):
+    """Raised at a stage boundary once the request's deadline is cancelled"""
+
+    def __init__(self, reason: str, stage: str):
+        super().__init__(f"Request {reason.replace('_', ' ')} before {stage}")
+        self.reason = reason
+        self.stage = stage
+
+
+class DeadlineExceeded(RequestCancelled):
+    """Raised at a stage boundary when the stage's checkpoint has passed"""
+
+    def __init__(self, stage: str):
+        super().__init__("deadline_exceeded", stage)
+
+
+class Deadline:
+    """Time budget for one request, with cumulative stage checkpoints and a cancel flag"""
+
+    def __init__(
+        self,
+        seconds: float = MAX_DEADLINE_SECONDS,
+        stages: Sequence[Tuple[str, float]] = STAGE_SHARES,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+        self.metrics = registry
+        self._checkpoints: Dict[str, float] = {}
+        elapsed_share = 0.0
+        for stage, share in stages:
+            elapsed_share += share
+            self._checkpoints[stage] = self.started + seconds * min(1.0, elapsed_share)
+        self._cancelled = threading.Event()
+        self._reason: Optional[str] = None
+
+    @classmethod
+    def from_header(
+        cls,
+        value: Optional[str],
+        cap: float = MAX_DEADLINE_SECONDS,
+        floor: float = MIN_DEADLINE_SECONDS,
+    ) -> "Deadline":
+        """Deadline from an X-Deadline-Ms value (milliseconds), clamped to [floor, cap] by the server"""
+        seconds = cap
+        if value:
+            try:
+                seconds = min(cap, max(min(floor, cap), float(value) / 1000))
+            except ValueError:
+                pass
+        return cls(seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def time_left(self, stage: str) -> float:
+        """Seconds until the stage's checkpoint (the overall deadline for unknown stages)"""
+        return max(0.0, self._checkpoints.get(stage, self.expires_at) - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._cancelled.is_set():
+            self._reason = reason
+            self._cancelled.set()
+            self.metrics.inc(f"requests_cancelled_{reason}")
+
+    def check(self, stage: str):
+        """Raise if the request was cancelled or the stage's checkpoint has passed"""
+        if self._cancelled.is_set():
+            self.metrics.inc(f"work_cancelled_{stage}")
+            raise RequestCancelled(self._reason or "cancelled", stage)
+        if self.time_left(stage) <= 0:
+            self.metrics.inc(f"deadline_exceeded_{stage}")
+            raise DeadlineExceeded(stage)
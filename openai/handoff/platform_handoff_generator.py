@@ -4,113 +4,46 @@ Platform Handoff Generator
 
 This module integrates the platform-specific handoff configurations with the 
 VibeMindOpenAI system to generate optimized prompts for V0, Lovable, and Magic Patterns.
+
+Each platform's prompt template is compiled once per config version: the
+scenario-specific text from the handoff JSON is substituted up front, leaving
+only the slots filled from the analysis (component list, color system).
+Configs are frozen into read-only views, custom parameters are layered over
+a scenario without modifying it, and rendered prompts are memoised by
+(platform, scenario, analysis digest), so rendering is cheap and safe to run
+from several threads.
 """
 
 import json
 import os
+import re
+import threading
+import time
+from collections import ChainMap
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 import sys
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
-from vibe_mind import VibeMindOpenAI, DesignHandoff
+from vibe_mind import VibeMindOpenAI, DesignHandoff, _config_signature
 
 
-class PlatformHandoffGenerator:
-    """Generates platform-specific handoffs using predefined configurations"""
-    
-    def __init__(self):
-        """Initialize with handoff configurations"""
-        self.handoff_dir = Path(__file__).parent
-        self.configs = self._load_platform_configs()
-        self.analyzer = VibeMindOpenAI()
-    
-    def _load_platform_configs(self) -> Dict[str, Dict[str, Any]]:
-        """Load platform configuration files"""
-        configs = {}
-        
-        platform_files = {
-            "v0": "v0.json",
-            "lovable": "lovable.json", 
-            "magic-patterns": "magic-patterns.json"
-        }
-        
-        for platform, filename in platform_files.items():
-            config_path = self.handoff_dir / filename
-            if config_path.exists():
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    configs[platform] = json.load(f)
-                print(f"✅ Loaded {platform} config")
-            else:
-                print(f"⚠️  Config not found: {config_path}")
-        
-        return configs
-    
-    def generate_platform_prompt(
-        self,
-        platform: str,
-        scenario: str,
-        analysis_result: Dict[str, Any],
-        custom_params: Optional[Dict[str, Any]] = None
-    ) -> str:
-        """Generate platform-specific prompt based on analysis results"""
-        
-        if platform not in self.configs:
-            raise ValueError(f"Platform '{platform}' not supported")
-        
-        config = self.configs[platform]
-        
-        # Get scenario configuration
-        if scenario in config.get("scenarios", {}):
-            scenario_config = config["scenarios"][scenario]
-        else:
-            # Use first available scenario as fallback
-            scenario_config = list(config["scenarios"].values())[0]
-            print(f"⚠️  Scenario '{scenario}' not found, using default")
-        
-        # Merge custom parameters
-        if custom_params:
-            scenario_config.update(custom_params)
-        
-        # Generate platform-specific prompt
-        if platform == "v0":
-            return self._generate_v0_prompt(analysis_result, scenario_config, config)
-        elif platform == "lovable":
-            return self._generate_lovable_prompt(analysis_result, scenario_config, config)
-        elif platform == "magic-patterns":
-            return self._generate_magic_patterns_prompt(analysis_result, scenario_config, config)
-        
-        return analysis_result.get("implementation_prompt", "")
-    
-    def _generate_v0_prompt(
-        self,
-        analysis: Dict[str, Any],
-        scenario: Dict[str, Any],
-        config: Dict[str, Any]
-    ) -> str:
-        """Generate V0-specific prompt focusing on components"""
-        
-        # Extract component details from analysis
-        layout_analysis = analysis.get("layout_analysis", "")
-        components = analysis.get("components_identified", [])
-        
-        # Build component list
-        component_descriptions = []
-        for comp in components if isinstance(components, list) else []:
-            if isinstance(comp, dict):
-                comp_type = comp.get("type", "Component")
-                comp_desc = comp.get("description", "")
-                component_descriptions.append(f"- {comp_type}: {comp_desc}")
-        
-        # Use scenario prompt as template
-        base_prompt = scenario.get("prompt", config["prompt_templates"]["base_template"])
-        
-        # Enhance with V0-specific details
-        v0_prompt = f"""{base_prompt}
+# Seconds between checks of the handoff directory for edited configs
+CONFIG_CHECK_SECONDS = 5.0
+
+# Rendered prompts kept in memory
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "1024"))
+
+_SLOT = re.compile(r"\$\{(\w+)\}")
+
+V0_TEMPLATE = """${base_prompt}
 
 📋 Component specifications:
-{chr(10).join(component_descriptions) if component_descriptions else "- Auto-detect components based on the design"}
+${components}
 
 🎨 Styling requirements:
 - Use shadcn/ui component library
@@ -128,28 +61,11 @@ class PlatformHandoffGenerator:
 - Mobile-first
 - Tablet and desktop adaptations
 - Sensible breakpoint setup"""
-        
-        return v0_prompt
-    
-    def _generate_lovable_prompt(
-        self,
-        analysis: Dict[str, Any], 
-        scenario: Dict[str, Any],
-        config: Dict[str, Any]
-    ) -> str:
-        """Generate Lovable-specific prompt focusing on user flows"""
-        
-        # Extract functionality from analysis
-        interaction_patterns = analysis.get("interaction_patterns", "")
-        
-        # Use scenario prompt as template
-        base_prompt = scenario.get("prompt", config["prompt_templates"]["base_template"])
-        
-        # Enhance with Lovable-specific user flows
-        lovable_prompt = f"""{base_prompt}
+
+LOVABLE_TEMPLATE = """${base_prompt}
 
 👥 User roles:
-- Primary users: {scenario.get('user_roles', ['users'])}
+- Primary users: ${user_roles}
 - Permission levels: basic, power, admin
 
 🔄 Detailed user flow:
@@ -160,7 +76,7 @@ class PlatformHandoffGenerator:
 5. Follow-up actions
 
 ⚡ Core feature modules:
-{scenario.get('core_features', ['basic features'])}
+${core_features}
 
 🔗 System integrations:
 - Authentication system
@@ -179,41 +95,13 @@ class PlatformHandoffGenerator:
 - Feature usage frequency
 - User satisfaction
 - Business conversion rate"""
-        
-        return lovable_prompt
-    
-    def _generate_magic_patterns_prompt(
-        self,
-        analysis: Dict[str, Any],
-        scenario: Dict[str, Any], 
-        config: Dict[str, Any]
-    ) -> str:
-        """Generate Magic Patterns-specific prompt focusing on design systems"""
-        
-        # Extract visual design details
-        visual_design = analysis.get("visual_design", {})
-        colors = analysis.get("dominant_colors", [])
-        
-        # Build color specifications
-        color_specs = []
-        for i, color in enumerate(colors[:5]):
-            if hasattr(color, 'hex'):
-                color_specs.append(f"- Color {i+1}: {color.hex} ({color.name})")
-            elif isinstance(color, dict):
-                color_specs.append(f"- Color {i+1}: {color.get('hex', '#000000')}")
-        
-        # Use scenario prompt as template  
-        base_prompt = scenario.get("prompt", config["prompt_templates"]["base_template"])
-        
-        # Enhance with Magic Patterns-specific design tokens
-        color_system = chr(10).join(color_specs) if color_specs else "- Primary: #3B82F6\n- Secondary: #64748B"
-        
-        magic_patterns_prompt = f"""{base_prompt}
+
+MAGIC_PATTERNS_TEMPLATE = """${base_prompt}
 
 🎨 Design Tokens:
 
 Color system:
-{color_system}
+${color_system}
 
 Typography:
 - Primary font: Inter, system-ui, sans-serif
@@ -255,8 +143,232 @@ Shadow levels:
 - Default, hover, active
 - Disabled, loading, error
 - Focus (keyboard navigation)"""
+
+PLATFORM_TEMPLATES = {
+    "v0": V0_TEMPLATE,
+    "lovable": LOVABLE_TEMPLATE,
+    "magic-patterns": MAGIC_PATTERNS_TEMPLATE,
+}
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only deep copy of parsed JSON: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Plain dicts and lists again (for formatting values the way the JSON configs read)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """A template split once into literal text and the slots left to fill at render time"""
+
+    parts: Tuple[Tuple[bool, str], ...]
+    slots: Tuple[str, ...]
+
+    @classmethod
+    def compile(cls, source: str, static: Mapping[str, str]) -> "CompiledTemplate":
+        """Substitute the known ${name} values now and keep the others as slots"""
+        parts = []
+        literal = []
+        position = 0
+        for match in _SLOT.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+            name = match.group(1)
+            if name in static:
+                literal.append(static[name])
+                continue
+            parts.append((False, "".join(literal)))
+            parts.append((True, name))
+            literal = []
+        literal.append(source[position:])
+        parts.append((False, "".join(literal)))
+        parts = tuple((is_slot, text) for is_slot, text in parts if is_slot or text)
+        return cls(parts, tuple(text for is_slot, text in parts if is_slot))
+
+    def render(self, values: Mapping[str, str]) -> str:
+        return "".join(values[text] if is_slot else text for is_slot, text in self.parts)
+
+
+@dataclass(frozen=True, slots=True)
+class _TemplateSet:
+    """Configs and compiled templates for one config version"""
+
+    version: tuple
+    configs: Mapping[str, Mapping[str, Any]]
+    templates: Mapping[Tuple[str, str], CompiledTemplate]
+
+
+def _scenario_values(scenario: Mapping[str, Any], config: Mapping[str, Any]) -> Dict[str, str]:
+    """Template values that depend only on the scenario (and so are compiled in)"""
+    return {
+        "base_prompt": scenario.get("prompt", config["prompt_templates"]["base_template"]),
+        "user_roles": str(_thaw(scenario.get("user_roles", ["users"]))),
+        "core_features": str(_thaw(scenario.get("core_features", ["basic features"]))),
+    }
+
+
+def _component_digest(analysis: Mapping[str, Any]) -> tuple:
+    """(type, description) of each identified component"""
+    components = analysis.get("components_identified", [])
+    return tuple(
+        (str(comp.get("type", "Component")), str(comp.get("description", "")))
+        for comp in (components if isinstance(components, (list, tuple)) else [])
+        if isinstance(comp, dict)
+    )
+
+
+def _color_digest(analysis: Mapping[str, Any]) -> tuple:
+    """(hex, name) of the first five colors (name is None for plain dicts)"""
+    digest = []
+    for color in analysis.get("dominant_colors", [])[:5]:
+        if hasattr(color, 'hex'):
+            digest.append((str(color.hex), str(color.name)))
+        elif isinstance(color, dict):
+            digest.append((str(color.get('hex', '#000000')), None))
+    return tuple(digest)
+
+
+def _component_lines(components: tuple) -> str:
+    lines = [f"- {comp_type}: {comp_desc}" for comp_type, comp_desc in components]
+    return "\n".join(lines) if lines else "- Auto-detect components based on the design"
+
+
+def _color_lines(colors: tuple) -> str:
+    lines = [
+        f"- Color {i+1}: {hex_value} ({name})" if name is not None else f"- Color {i+1}: {hex_value}"
+        for i, (hex_value, name) in enumerate(colors)
+    ]
+    return "\n".join(lines) if lines else "- Primary: #3B82F6\n- Secondary: #64748B"
+
+
+# Template slots filled from the analysis: slot -> (digest of the fields it reads, renderer)
+ANALYSIS_SLOTS = {
+    "components": (_component_digest, _component_lines),
+    "color_system": (_color_digest, _color_lines),
+}
+
+
+def analysis_digest(template: CompiledTemplate, analysis: Mapping[str, Any]) -> tuple:
+    """The parts of an analysis a template's slots depend on, as a hashable key"""
+    return tuple(ANALYSIS_SLOTS[name][0](analysis) for name in template.slots)
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render(template: CompiledTemplate, digest: tuple) -> str:
+    """Memoised render; a compiled template stands for (platform, scenario, config version)"""
+    return template.render({
+        name: ANALYSIS_SLOTS[name][1](values) for name, values in zip(template.slots, digest)
+    })
+
+
+class PlatformHandoffGenerator:
+    """Generates platform-specific handoffs using predefined configurations"""
+    
+    def __init__(self):
+        """Initialize with handoff configurations"""
+        self.handoff_dir = Path(__file__).parent
+        self._lock = threading.Lock()
+        self._templates = self._compile(self._load_platform_configs())
+        self._checked_at = time.monotonic()
+        self.analyzer = VibeMindOpenAI()
+    
+    @property
+    def configs(self) -> Mapping[str, Mapping[str, Any]]:
+        """Read-only platform configs of the current config version"""
+        return self._current().configs
+    
+    def _load_platform_configs(self) -> Dict[str, Dict[str, Any]]:
+        """Load platform configuration files"""
+        configs = {}
+        
+        platform_files = {
+            "v0": "v0.json",
+            "lovable": "lovable.json", 
+            "magic-patterns": "magic-patterns.json"
+        }
+        
+        for platform, filename in platform_files.items():
+            config_path = self.handoff_dir / filename
+            if config_path.exists():
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    configs[platform] = json.load(f)
+                print(f"✅ Loaded {platform} config")
+            else:
+                print(f"⚠️  Config not found: {config_path}")
+        
+        return configs
+    
+    def _compile(self, configs: Dict[str, Dict[str, Any]]) -> _TemplateSet:
+        """Freeze the configs and compile every (platform, scenario) template"""
+        version = _config_signature(str(self.handoff_dir))
+        frozen = _freeze(configs)
+        templates = {}
+        for platform, config in frozen.items():
+            source = PLATFORM_TEMPLATES.get(platform)
+            if source is None:
+                continue
+            for scenario_key, scenario in config.get("scenarios", {}).items():
+                templates[(platform, scenario_key)] = CompiledTemplate.compile(
+                    source, _scenario_values(scenario, config)
+                )
+        return _TemplateSet(version, frozen, MappingProxyType(templates))
+    
+    def _current(self) -> _TemplateSet:
+        """Templates for the current config version, recompiled when a config file changes"""
+        now = time.monotonic()
+        if now - self._checked_at < CONFIG_CHECK_SECONDS:
+            return self._templates
+        with self._lock:
+            if now - self._checked_at >= CONFIG_CHECK_SECONDS:
+                if _config_signature(str(self.handoff_dir)) != self._templates.version:
+                    self._templates = self._compile(self._load_platform_configs())
+                self._checked_at = now
+        return self._templates
+    
+    def generate_platform_prompt(
+        self,
+        platform: str,
+        scenario: str,
+        analysis_result: Dict[str, Any],
+        custom_params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Generate platform-specific prompt based on analysis results"""
+        
+        templates = self._current()
+        if platform not in templates.configs:
+            raise ValueError(f"Platform '{platform}' not supported")
+        
+        config = templates.configs[platform]
+        
+        # Get scenario configuration
+        if scenario not in config.get("scenarios", {}):
+            # Use first available scenario as fallback
+            print(f"⚠️  Scenario '{scenario}' not found, using default")
+            scenario = next(iter(config["scenarios"]))
+        
+        if platform not in PLATFORM_TEMPLATES:
+            return analysis_result.get("implementation_prompt", "")
+        
+        if custom_params:
+            # Custom parameters are layered over a read-only scenario view, never merged into it
+            view = MappingProxyType(ChainMap(dict(custom_params), config["scenarios"][scenario]))
+            template = CompiledTemplate.compile(PLATFORM_TEMPLATES[platform], _scenario_values(view, config))
+        else:
+            template = templates.templates[(platform, scenario)]
         
-        return magic_patterns_prompt
+        return _render(template, analysis_digest(template, analysis_result))
     
     def generate_all_platforms(
         self,
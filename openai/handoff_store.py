@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Indexed handoff store
+
+Embedded SQLite store for DesignHandoff records, replacing the loose
+output/design_handoff_*.json files. Records are zlib-compressed JSON blobs
+indexed by image hash, designer profile, platform and creation time, so they
+can be read back through the API.
+
+Token usage and cost (metadata["usage"]) is also written to a narrow usage
+table, one row per handoff, which usage_summary aggregates per hashed API
+key, profile and platform over rolling windows.
+
+Size- and age-based retention runs periodically from the writer thread and
+reclaims freed pages with incremental vacuum, keeping disk use bounded on
+long-running nodes. Usage rows expire by age only: size eviction removes
+handoff records but keeps their (small) usage rows, so usage totals do not
+depend on how large the stored handoffs were.
+
+The store implements the HandoffWriter sink interface (location_for /
+write_batch), so one transaction is committed per writer batch.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS handoffs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    image_hash TEXT,
+    profile TEXT,
+    platform TEXT,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_handoffs_image_hash ON handoffs(image_hash);
+CREATE INDEX IF NOT EXISTS idx_handoffs_profile ON handoffs(profile, created_at);
+CREATE INDEX IF NOT EXISTS idx_handoffs_platform ON handoffs(platform, created_at);
+CREATE INDEX IF NOT EXISTS idx_handoffs_created_at ON handoffs(created_at);
+CREATE TABLE IF NOT EXISTS usage (
+    handoff_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    key_hash TEXT,
+    profile TEXT,
+    platform TEXT,
+    model TEXT,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    saved_cost_usd REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_usage_created_at ON usage(created_at);
+"""
+
+SUMMARY_COLUMNS = "id, created_at, image_hash, profile, platform, size"
+
+# Columns usage_summary may group by
+USAGE_GROUP_COLUMNS = ("key_hash", "profile", "platform", "model")
+
+
+class HandoffStore:
+    """SQLite-backed, compressed, indexed store for handoff records"""
+
+    def __init__(
+        self,
+        db_path: str = "output/handoffs.db",
+        max_bytes: Optional[int] = 500 * 1024 * 1024,
+        max_age_seconds: Optional[float] = 30 * 24 * 3600,
+        retention_interval: float = 300.0,
+        compression_level: int = 6,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.retention_interval = retention_interval
+        self.compression_level = compression_level
+        self.metrics = registry
+        self._local = threading.local()
+        self._last_retention = 0.0
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # Running record count for the metrics gauge: seeded from the table, then kept up to date
+        # by inserts and retention (and re-read at each retention pass, for other workers' writes)
+        self._count_lock = threading.Lock()
+        self._count: Optional[int] = None
+
+        self.metrics.register_gauge("handoff_store_records", self.count)
+        self.metrics.register_gauge("handoff_store_bytes", self.disk_usage)
+
+    @classmethod
+    def from_env(cls) -> "HandoffStore":
+        """Build a store from HANDOFF_DB_PATH / HANDOFF_MAX_MB / HANDOFF_MAX_AGE_DAYS"""
+        max_mb = float(os.getenv("HANDOFF_MAX_MB", "500"))
+        max_age_days = float(os.getenv("HANDOFF_MAX_AGE_DAYS", "30"))
+        return cls(
+            db_path=os.getenv("HANDOFF_DB_PATH", os.path.join("output", "handoffs.db")),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb > 0 else None,
+            max_age_seconds=max_age_days * 24 * 3600 if max_age_days > 0 else None,
+        )
+
+    def _ensure_schema(self):
+        """Create the database on first use rather than at construction (keeps imports side-effect free)"""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                # auto_vacuum must be set before the first table is created
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.executescript(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the writer"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not self._schema_ready:
+                self._ensure_schema()
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # Sink interface
+
+    def location_for(self, handoff_id: str) -> str:
+        return f"/api/handoffs/{handoff_id}"
+
+    def write_batch(self, records: List[Tuple[str, Any, bytes]]):
+        """Insert a batch of (handoff_id, handoff, encoded_json) in one transaction"""
+        rows, usage_rows = [], []
+        for handoff_id, handoff, data in records:
+            created_at = time.time()
+            profile = getattr(handoff, "designer_profile", None)
+            platform = getattr(handoff, "platform_target", None)
+            rows.append((
+                handoff_id,
+                created_at,
+                getattr(handoff, "image_hash", None),
+                profile,
+                platform,
+                len(data),
+                zlib.compress(data, self.compression_level),
+            ))
+            usage = (getattr(handoff, "metadata", None) or {}).get("usage")
+            if usage:
+                usage_rows.append((
+                    handoff_id,
+                    created_at,
+                    usage.get("key_hash"),
+                    profile,
+                    platform,
+                    usage.get("model"),
+                    usage.get("prompt_tokens", 0),
+                    usage.get("completion_tokens", 0),
+                    usage.get("cached_tokens", 0),
+                    usage.get("cost_usd", 0.0),
+                    int(bool(usage.get("cache_hit"))),
+                    usage.get("saved_cost_usd", 0.0),
+                ))
+
+        conn = self._connection()
+        with conn:
+            ids = [row[0] for row in rows]
+            existing = conn.execute(
+                f"SELECT COUNT(*) FROM handoffs WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchone()[0] if ids else 0
+            conn.executemany(
+                "INSERT OR REPLACE INTO handoffs (id, created_at, image_hash, profile, platform, size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if usage_rows:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO usage (handoff_id, created_at, key_hash, profile, platform, model, "
+                    "prompt_tokens, completion_tokens, cached_tokens, cost_usd, cache_hit, saved_cost_usd) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    usage_rows,
+                )
+        self._adjust_count(len(rows) - existing)
+
+        if time.monotonic() - self._last_retention >= self.retention_interval:
+            self.enforce_retention()
+
+    # Reads
+
+    def get_raw(self, handoff_id: str) -> Optional[bytes]:
+        """Return the stored JSON bytes for a handoff, or None"""
+        row = self._connection().execute("SELECT data FROM handoffs WHERE id = ?", (handoff_id,)).fetchone()
+        return zlib.decompress(row["data"]) if row else None
+
+    def query(
+        self,
+        image_hash: Optional[str] = None,
+        profile: Optional[str] = None,
+        platform: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Return record summaries matching the filters, newest first"""
+        clauses, params = [], []
+        if image_hash:
+            clauses.append("image_hash = ?")
+            params.append(image_hash)
+        if profile:
+            clauses.append("profile = ?")
+            params.append(profile)
+        if platform:
+            clauses.append("platform = ?")
+            params.append(platform)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM handoffs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def usage_summary(
+        self,
+        since: float,
+        group_by: Tuple[str, ...] = ("key_hash", "profile", "platform"),
+        key_hash: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Token and cost totals since a time, grouped by USAGE_GROUP_COLUMNS, costliest first"""
+        invalid = [column for column in group_by if column not in USAGE_GROUP_COLUMNS]
+        if invalid:
+            raise ValueError(f"Cannot group usage by {', '.join(invalid)}")
+
+        clauses, params = ["created_at >= ?"], [since]
+        if key_hash:
+            clauses.append("key_hash = ?")
+            params.append(key_hash)
+        columns = ", ".join(group_by)
+        rows = self._connection().execute(
+            f"SELECT {columns + ', ' if columns else ''}"
+            "COUNT(*) AS handoffs, SUM(cache_hit) AS cache_hits, "
+            "SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, "
+            "SUM(cached_tokens) AS cached_tokens, ROUND(SUM(cost_usd), 6) AS cost_usd, "
+            "ROUND(SUM(saved_cost_usd), 6) AS saved_cost_usd "
+            f"FROM usage WHERE {' AND '.join(clauses)} "
+            f"{'GROUP BY ' + columns if columns else ''} ORDER BY cost_usd DESC",
+            params,
+        ).fetchall()
+        return [dict(row) for row in rows if row["handoffs"]]
+
+    def count(self) -> int:
+        """Number of stored handoffs, without a table scan after the first call"""
+        with self._count_lock:
+            if self._count is None:
+                self._count = self._connection().execute("SELECT COUNT(*) FROM handoffs").fetchone()[0]
+            return self._count
+
+    def _adjust_count(self, delta: int):
+        with self._count_lock:
+            if self._count is not None:
+                self._count += delta
+
+    def disk_usage(self) -> int:
+        """Bytes used by the database file and its WAL"""
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                pass
+        return total
+
+    # Retention and compaction
+
+    def enforce_retention(self) -> Dict[str, int]:
+        """Delete records past max age, then oldest records until under max_bytes, then compact
+
+        Usage rows are aged out by the same cutoff but never evicted for size.
+        """
+        self._last_retention = time.monotonic()
+        conn = self._connection()
+        expired = evicted = 0
+
+        with conn:
+            if self.max_age_seconds:
+                cutoff = time.time() - self.max_age_seconds
+                cursor = conn.execute("DELETE FROM handoffs WHERE created_at < ?", (cutoff,))
+                expired = cursor.rowcount
+                conn.execute("DELETE FROM usage WHERE created_at < ?", (cutoff,))
+
+            if self.max_bytes:
+                stored = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM handoffs").fetchone()[0]
+                excess = stored - self.max_bytes
+                if excess > 0:
+                    # Walk oldest-first until enough compressed bytes are freed
+                    cutoff_time, freed = None, 0
+                    for row in conn.execute("SELECT created_at, LENGTH(data) AS n FROM handoffs ORDER BY created_at"):
+                        freed += row["n"]
+                        cutoff_time = row["created_at"]
+                        if freed >= excess:
+                            break
+                    if cutoff_time is not None:
+                        cursor = conn.execute("DELETE FROM handoffs WHERE created_at <= ?", (cutoff_time,))
+                        evicted = cursor.rowcount
+
+            count = conn.execute("SELECT COUNT(*) FROM handoffs").fetchone()[0]
+        with self._count_lock:
+            self._count = count
+
+        if expired or evicted:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.metrics.inc("handoff_store_expired", expired)
+            self.metrics.inc("handoff_store_evicted", evicted)
+
+        return {"expired": expired, "evicted": evicted}
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Background handoff persistence
+
+Moves handoff writes off the request path: handlers enqueue a finished
+DesignHandoff and get its id and destination back immediately, while a
+daemon thread drains the queue in batches and writes compact JSON.
+
+Ids are ULIDs (millisecond timestamp + 80 random bits, Crockford base32), so
+they sort by creation time and never collide the way second-resolution
+timestamps did when two requests finished in the same second.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def new_handoff_id() -> str:
+    """Generate a 26-character ULID"""
+    timestamp_ms = int(time.time() * 1000)
+    randomness = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms << 80) | randomness
+    return "".join(_CROCKFORD[(value >> (5 * i)) & 31] for i in reversed(range(26)))
+
+
+def encode_handoff_compact(handoff: Any) -> bytes:
+    """Serialize a handoff to compact UTF-8 JSON"""
+    if hasattr(handoff, "to_json_bytes"):
+        return handoff.to_json_bytes()
+    return json.dumps(handoff.to_dict(), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FileSink:
+    """Writes each handoff to <output_dir>/design_handoff_<id>.json
+
+    Sinks implement location_for(handoff_id) and write_batch(records), where
+    records are (handoff_id, handoff, encoded_bytes) tuples.
+    """
+
+    def __init__(self, output_dir: str = "output"):
+        self.output_dir = output_dir
+
+    def location_for(self, handoff_id: str) -> str:
+        return os.path.join(self.output_dir, f"design_handoff_{handoff_id}.json")
+
+    def write_batch(self, records: List[Tuple[str, Any, bytes]]):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for handoff_id, _, data in records:
+            path = self.location_for(handoff_id)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+
+class HandoffWriter:
+    """Batched background writer for DesignHandoff records"""
+
+    def __init__(
+        self,
+        sink: Optional[Any] = None,
+        batch_size: int = 32,
+        flush_interval: float = 0.25,
+        max_queue: int = 1000,
+        encoder: Callable[[Any], bytes] = encode_handoff_compact,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.sink = sink or FileSink()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.encoder = encoder
+        self.metrics = registry
+        self._queue: "queue.Queue[Tuple[str, Any, float]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        self.metrics.register_gauge("handoff_writer_queue_depth", self.queue_depth)
+        # Once per writer (stop() is a no-op if the thread never started), not on every restart
+        atexit.register(self.stop)
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="handoff-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, handoff: Any) -> str:
+        """Queue a handoff for persistence and return its destination
+
+        If the queue is full the handoff is written inline so nothing is lost;
+        this is counted as handoff_writer_sync_fallback.
+        """
+        self.start()
+        handoff_id = getattr(handoff, "handoff_id", None) or new_handoff_id()
+        try:
+            self._queue.put_nowait((handoff_id, handoff, time.perf_counter()))
+            self.metrics.inc("handoff_writer_enqueued")
+        except queue.Full:
+            self.metrics.inc("handoff_writer_sync_fallback")
+            self._write_batch([(handoff_id, handoff, time.perf_counter())])
+        return self.sink.location_for(handoff_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been written"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer thread"""
+        if not self._thread:
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple[str, Any, float]]):
+        start = time.perf_counter()
+        try:
+            encoded = [(handoff_id, handoff, self.encoder(handoff)) for handoff_id, handoff, _ in batch]
+            self.sink.write_batch(encoded)
+        except Exception as e:
+            self.metrics.inc("handoff_writer_errors", len(batch))
+            print(f"❌ Failed to persist {len(batch)} handoff(s): {e}")
+            return
+
+        finished = time.perf_counter()
+        self.metrics.observe("handoff_writer_batch_write_ms", (finished - start) * 1000)
+        self.metrics.observe("handoff_writer_batch_size", len(batch))
+        for _, _, enqueued_at in batch:
+            # Enqueue-to-durable latency, including time spent waiting in the queue
+            self.metrics.observe("handoff_writer_latency_ms", (finished - enqueued_at) * 1000)
+        self.metrics.inc("handoff_writer_written", len(batch))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport for OpenAI calls
+
+Every VibeMindOpenAI builds its own OpenAI client (one per API key), but all
+of them send through one process-wide httpx.Client, so a connection (and its
+TLS session) opened for one analyzer is reused by the next instead of each
+client starting cold with a pool of its own. Pool size, keep-alive and the
+connect/read/write/pool timeouts come from the environment; HTTP/2 is used
+when the optional h2 package is installed. prewarm() opens connections to
+the API host before the first analysis needs one.
+
+Each request is traced (httpcore's trace extension) to count new versus
+reused connections and time connection setup (TCP + TLS).
+
+httpx is imported on first use, so importing this module stays cheap. It
+ships with most OpenAI SDK releases but not all; without it the analyzer
+falls back to the SDK's default client and the shared pool is unused.
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class _ConnectionTrace:
+    """httpcore trace callback: whether the request opened a connection, and how long that took"""
+
+    __slots__ = ("connect_started", "connect_ms")
+
+    def __init__(self):
+        self.connect_started: Optional[float] = None
+        self.connect_ms: Optional[float] = None
+
+    def __call__(self, event: str, info: Dict[str, Any]):
+        if event == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self.connect_started is not None:
+                # TLS completes after TCP, so https connections end up timed through the handshake
+                self.connect_ms = (time.perf_counter() - self.connect_started) * 1000
+
+
+class SharedTransport:
+    """One pooled, keep-alive httpx.Client for every OpenAI client in the process"""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        write_timeout: float = 10.0,
+        pool_timeout: float = 5.0,
+        http2: bool = True,
+        prewarm_connections: int = 2,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.pool_timeout = pool_timeout
+        # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.prewarm_connections = prewarm_connections
+        self.metrics = registry
+        self._lock = threading.Lock()
+        self._client = None
+        self._new = 0
+        self._reused = 0
+
+        self.metrics.register_gauge("openai_connection_reuse_rate", self.reuse_rate)
+
+    @classmethod
+    def from_env(cls) -> "SharedTransport":
+        """OPENAI_MAX_CONNECTIONS / OPENAI_MAX_KEEPALIVE / OPENAI_KEEPALIVE_SECONDS /
+        OPENAI_CONNECT_TIMEOUT / OPENAI_READ_TIMEOUT / OPENAI_WRITE_TIMEOUT / OPENAI_POOL_TIMEOUT /
+        OPENAI_HTTP2 / OPENAI_PREWARM_CONNECTIONS"""
+        return cls(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "30")),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("OPENAI_READ_TIMEOUT", "60")),
+            write_timeout=float(os.getenv("OPENAI_WRITE_TIMEOUT", "10")),
+            pool_timeout=float(os.getenv("OPENAI_POOL_TIMEOUT", "5")),
+            http2=os.getenv("OPENAI_HTTP2", "1").lower() not in ("0", "false", "no"),
+            prewarm_connections=int(os.getenv("OPENAI_PREWARM_CONNECTIONS", "2")),
+        )
+
+    def timeout(self, budget: Optional[float] = None):
+        """Per-stage httpx.Timeout, each stage capped at budget seconds (e.g. a request's time left)
+
+        Without httpx this is a single number of seconds (the read timeout,
+        capped at budget), which the SDK accepts as well.
+        """
+        def stage(seconds: float) -> float:
+            return seconds if budget is None else min(seconds, budget)
+
+        try:
+            import httpx
+        except ImportError:
+            return stage(self.read_timeout)
+
+        return httpx.Timeout(
+            connect=stage(self.connect_timeout),
+            read=stage(self.read_timeout),
+            write=stage(self.write_timeout),
+            pool=stage(self.pool_timeout),
+        )
+
+    @property
+    def client(self):
+        """The shared httpx.Client, created on first use
+
+        Raises ImportError when httpx is not installed (SDK releases built on
+        another HTTP stack); callers then use the SDK's own client.
+        """
+        with self._lock:
+            if self._client is None:
+                import httpx
+                self._client = httpx.Client(
+                    http2=self.http2,
+                    timeout=self.timeout(),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    event_hooks={"request": [self._trace_request], "response": [self._record_response]},
+                )
+            return self._client
+
+    def _trace_request(self, request):
+        request.extensions.setdefault("trace", _ConnectionTrace())
+
+    def _record_response(self, response):
+        trace = response.request.extensions.get("trace")
+        if not isinstance(trace, _ConnectionTrace):
+            return
+        with self._lock:
+            if trace.connect_started is None:
+                self._reused += 1
+            else:
+                self._new += 1
+        if trace.connect_started is None:
+            self.metrics.inc("openai_connections_reused")
+        else:
+            self.metrics.inc("openai_connections_new")
+            if trace.connect_ms is not None:
+                self.metrics.observe("openai_connect_ms", trace.connect_ms)
+
+    def reuse_rate(self) -> float:
+        """Share of traced requests sent on an already-open connection"""
+        with self._lock:
+            total = self._new + self._reused
+            return round(self._reused / total, 3) if total else 0.0
+
+    def prewarm(self, base_url: Optional[str] = None) -> int:
+        """Open connections to the API host ahead of traffic; returns how many requests got through
+
+        Any HTTP response (401, 404...) counts: the point is the TCP/TLS
+        setup, which leaves the connection in the keep-alive pool. One
+        connection carries all streams over HTTP/2, so only one is opened.
+        """
+        base_url = base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+        try:
+            client = self.client
+        except ImportError:
+            print("⚠️ httpx not installed; skipping OpenAI connection pre-warm")
+            return 0
+
+        def touch(_):
+            try:
+                client.head(base_url)
+                return True
+            except Exception as e:
+                print(f"⚠️ OpenAI connection pre-warm failed: {e}")
+                return False
+
+        count = 1 if self.http2 else max(0, min(self.prewarm_connections, self.max_keepalive))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, count)) as pool:
+            warmed = sum(pool.map(touch, range(count)))
+        self.metrics.inc("openai_prewarmed_connections", warmed)
+        if warmed:
+            print(f"🔌 Pre-warmed {warmed} OpenAI connection(s) in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return warmed
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def snapshot(self) -> dict:
+        """State for /api/health"""
+        with self._lock:
+            new, reused = self._new, self._reused
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "connections_new": new,
+            "connections_reused": reused,
+            "reuse_rate": self.reuse_rate(),
+        }
+
+
+_shared_transport: Optional[SharedTransport] = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> SharedTransport:
+    """Process-wide transport shared by every analyzer instance"""
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = SharedTransport.from_env()
+        return _shared_transport
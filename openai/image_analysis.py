@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Deterministic local image analysis
+
+Cheap, vectorized measurements on the resized screenshot that fill handoff
+fields directly and are passed to the vision model as compact hints, so the
+model does not have to spend output tokens rediscovering them.
+
+- detect_layout: column grid, gutters, section boundaries and spacing scale
+  from projection profiles and edge maps
+- page_background / palette_contrast: WCAG contrast of likely text colors
+  against the measured page background and large palette surfaces
+- estimate_typography: type scale from text-line bands, within a time budget
+- changed_region: block-wise diff of two revisions of the same screen
+
+Image measurements take a PIL image and a scale (source pixels per analysed
+pixel) and report measurements in source pixels.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+# Candidate base units for the spacing scale, in px
+SPACING_BASES = (4, 8)
+
+# Text-line ink height (ascender to descender) as a share of the font size;
+# lines without descenders read ~20% small, lines with them ~3% large
+INK_TO_FONT_SIZE = 0.92
+
+# WCAG 2.x minimum contrast ratios
+WCAG_AAA = 7.0
+WCAG_AA = 4.5
+WCAG_AA_LARGE = 3.0
+
+# Below this a color on a surface is a tint or border of it, not text
+MIN_TEXT_CONTRAST = 1.5
+# Palette colors covering at least this share of the image are surfaces, not text
+SURFACE_SHARE = 0.3
+
+# Block size (px) and mean absolute gray difference for changed_region
+DIFF_BLOCK = 16
+DIFF_THRESHOLD = 3.0
+
+
+def _content_mask(gray: "np.ndarray", tolerance: int = 10) -> "np.ndarray":
+    """Pixels differing from the border background, plus strong edges"""
+    import numpy as np
+
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    mask = np.abs(gray - int(np.median(border))) > tolerance
+
+    # Edges catch content drawn on non-background fills (cards, buttons)
+    edges = np.zeros_like(mask)
+    edges[:, 1:] |= np.abs(np.diff(gray, axis=1)) > 24
+    edges[1:, :] |= np.abs(np.diff(gray, axis=0)) > 24
+    return mask | edges
+
+
+def _runs(flags: "np.ndarray") -> List[Tuple[int, int]]:
+    """[start, end) runs of True in a 1-D boolean array"""
+    import numpy as np
+
+    padded = np.concatenate([[False], flags, [False]])
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return [(int(start), int(end)) for start, end in zip(changes[::2], changes[1::2])]
+
+
+def _merge_runs(runs: List[Tuple[int, int]], min_gap: int) -> List[Tuple[int, int]]:
+    """Join runs separated by gaps narrower than min_gap"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def spacing_scale(gaps: List[float], max_steps: int = 6) -> Dict[str, Any]:
+    """Snap measured gaps to the base unit (4 or 8px) that fits them best"""
+    gaps = [gap for gap in gaps if gap >= 2]
+    if not gaps:
+        return {}
+
+    def residual(base: int) -> float:
+        return sum(abs(gap - base * max(1, round(gap / base))) / gap for gap in gaps)
+
+    # Every multiple of 8 is a multiple of 4, so prefer 8 unless 4 fits clearly better
+    small, large = SPACING_BASES
+    base = large if residual(large) <= 1.25 * residual(small) else small
+    steps = sorted({base * max(1, round(gap / base)) for gap in gaps})
+    if len(steps) > max_steps:
+        # Keep the most frequent steps
+        counts = {step: sum(1 for gap in gaps if base * max(1, round(gap / base)) == step) for step in steps}
+        steps = sorted(sorted(steps, key=lambda step: counts[step], reverse=True)[:max_steps])
+    return {"base_unit": base, "scale": steps}
+
+
+def detect_layout(image: "Image.Image", scale: float = 1.0) -> Dict[str, Any]:
+    """Estimate column grid, gutters, section boundaries and spacing scale
+
+    Columns are runs of the column occupancy profile separated by vertical
+    gutters; sections are row bands separated by blank rows or full-width
+    rules. Returns an empty dict for images too small to measure.
+    """
+    import numpy as np
+
+    width, height = image.size
+    if width < 64 or height < 64:
+        return {}
+
+    gray = np.asarray(image.convert("L"), dtype=np.int16)
+    mask = _content_mask(gray)
+
+    # Sections: blank row bands or full-width rules split the page vertically
+    row_fill = mask.mean(axis=1)
+    min_section_gap = max(3, height // 100)
+    rule_rows = row_fill > 0.95
+    row_content = (row_fill > 0.005) & ~rule_rows
+    sections = _merge_runs(_runs(row_content), min_section_gap)
+    sections = [(start, end) for start, end in sections if end - start >= height // 50] or [(0, height)]
+
+    # Columns: the grid is taken from the section with the most columns, so
+    # full-width headers and footers don't bridge the gutters
+    min_gutter = max(3, width // 80)
+    columns: List[Tuple[int, int]] = []
+    for start, end in sections:
+        col_profile = mask[start:end].mean(axis=0)
+        runs = _merge_runs(_runs(col_profile > 0.02), min_gutter)
+        runs = [(left, right) for left, right in runs if right - left >= width // 40]
+        if len(runs) > len(columns):
+            columns = runs
+
+    gutters = [next_start - end for (_, end), (next_start, _) in zip(columns, columns[1:])]
+    section_gaps = [next_start - end for (_, end), (next_start, _) in zip(sections, sections[1:])]
+
+    # Gaps between elements inside sections feed the spacing scale too
+    inner_gaps: List[int] = []
+    for start, end in sections:
+        rows = _runs(mask[start:end].mean(axis=1) > 0.005)
+        inner_gaps.extend(next_start - stop for (_, stop), (next_start, _) in zip(rows, rows[1:]))
+
+    def px(value: float) -> int:
+        return int(round(value * scale))
+
+    column_count = len(columns) if 1 <= len(columns) <= 12 else 1
+    gutter_px = px(float(np.median(gutters))) if gutters and column_count > 1 else 0
+    margins = (columns[0][0], width - columns[-1][1]) if columns else (0, 0)
+
+    spacing = spacing_scale([px(gap) for gap in gutters + section_gaps + inner_gaps])
+    if gutter_px:
+        spacing["gutter"] = gutter_px
+    if section_gaps:
+        spacing["section_gap"] = px(float(np.median(section_gaps)))
+    spacing["page_margin"] = px(min(margins))
+
+    if column_count > 1:
+        grid_system = f"{column_count}-column grid, {gutter_px}px gutters"
+    else:
+        grid_system = "single column"
+
+    return {
+        "grid_system": grid_system,
+        "columns": column_count,
+        "column_widths": [px(end - start) for start, end in columns] if column_count > 1 else [],
+        "gutter": gutter_px,
+        "margins": {"left": px(margins[0]), "right": px(margins[1])},
+        "sections": [[px(start), px(end)] for start, end in sections],
+        "spacing": spacing,
+    }
+
+
+def layout_prompt_hint(layout: Optional[Dict[str, Any]]) -> str:
+    """One-line summary of detect_layout output for the vision prompt"""
+    if not layout:
+        return ""
+    spacing = layout.get("spacing", {})
+    parts = [layout["grid_system"], f"{len(layout['sections'])} vertical sections"]
+    if spacing.get("scale"):
+        parts.append(f"spacing scale {'/'.join(str(step) for step in spacing['scale'])}px (base {spacing['base_unit']}px)")
+    if spacing.get("page_margin"):
+        parts.append(f"{spacing['page_margin']}px page margin")
+    return "; ".join(parts)
+
+
+def contrast_matrix(rgb: "np.ndarray") -> "np.ndarray":
+    """Pairwise WCAG contrast ratios for an (n, 3) array of 0-255 RGB colors"""
+    import numpy as np
+
+    channels = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    lighter = np.maximum.outer(luminance, luminance)
+    darker = np.minimum.outer(luminance, luminance)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def _wcag_level(ratio: float) -> str:
+    if ratio >= WCAG_AAA:
+        return "AAA"
+    if ratio >= WCAG_AA:
+        return "AA"
+    if ratio >= WCAG_AA_LARGE:
+        return "AA-large"
+    return "fail"
+
+
+def page_background(image: "Image.Image") -> Tuple[int, int, int]:
+    """Median RGB of the outermost rows and columns: the page color the content mask and auto-crop measure against"""
+    import numpy as np
+
+    rgb = np.asarray(image.convert("RGB"))
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]])
+    return tuple(int(value) for value in np.median(border, axis=0))
+
+
+def _is_blend(color: "np.ndarray", background: "np.ndarray", ink: "np.ndarray", tolerance: float = 16.0) -> bool:
+    """Whether color lies between background and ink (anti-aliased edges of ink drawn on background)"""
+    import numpy as np
+
+    direction = ink - background
+    length = float(direction @ direction)
+    if length == 0:
+        return False
+    t = float((color - background) @ direction) / length
+    return 0 < t < 1 and float(np.linalg.norm(color - (background + t * direction))) <= tolerance
+
+
+def palette_contrast(
+    colors: List[Any],
+    page_backgrounds: Sequence[Tuple[int, int, int]] = (),
+    surface_share: float = SURFACE_SHARE,
+    max_notes: int = 4,
+) -> Dict[str, Any]:
+    """Contrast of the palette colors against the surfaces they can sit on as text
+
+    `colors` are ColorInfo-like objects (hex, rgb, confidence), most
+    dominant first. Backgrounds are the measured page backgrounds (see
+    page_background; the palette omits near-white pixels, so a white page
+    is never in it) plus palette colors covering at least `surface_share`
+    of the palette, or the most dominant color when nothing else qualifies.
+    A pair is only checked when it is plausibly text on that background:
+    tints and borders of the surface (below MIN_TEXT_CONTRAST) and
+    anti-aliasing blends between the surface and a stronger ink are
+    skipped. Returns the checked pairs with their WCAG level and short
+    notes for the pairs below AA.
+    """
+    import numpy as np
+
+    if not colors:
+        return {}
+
+    candidates = [("#{:02x}{:02x}{:02x}".format(*rgb), tuple(rgb)) for rgb in page_backgrounds]
+    candidates += [(color.hex, tuple(color.rgb)) for color in colors if color.confidence >= surface_share]
+    if not candidates:
+        candidates.append((colors[0].hex, tuple(colors[0].rgb)))
+    # A surface indistinguishable from an earlier one (e.g. the palette's copy of the page color) adds nothing
+    backgrounds: List[Tuple[str, Tuple[int, int, int]]] = []
+    for candidate in candidates:
+        if all(contrast_matrix(np.array([candidate[1], rgb]))[0, 1] >= MIN_TEXT_CONTRAST for _, rgb in backgrounds):
+            backgrounds.append(candidate)
+
+    surfaces = np.array([rgb for _, rgb in backgrounds], dtype=np.float64)
+    inks = np.array([color.rgb for color in colors], dtype=np.float64)
+    ratios = contrast_matrix(np.concatenate([surfaces, inks]))[len(surfaces):, :len(surfaces)]
+    pairs = []
+    for bg, (bg_hex, _) in enumerate(backgrounds):
+        for fg, color in enumerate(colors):
+            ratio = round(float(ratios[fg, bg]), 2)
+            if ratio < MIN_TEXT_CONTRAST:
+                continue
+            if any(
+                ratios[other, bg] > ratio and _is_blend(inks[fg], surfaces[bg], inks[other])
+                for other in range(len(colors)) if other != fg
+            ):
+                continue
+            pairs.append({
+                "foreground": color.hex,
+                "background": bg_hex,
+                "ratio": ratio,
+                "level": _wcag_level(ratio),
+            })
+    if not pairs:
+        return {}
+    pairs.sort(key=lambda pair: pair["ratio"])
+
+    failing = [pair for pair in pairs if pair["ratio"] < WCAG_AA]
+    notes = []
+    for pair in failing[:max_notes]:
+        usable = "large text and UI components only" if pair["level"] == "AA-large" else "decoration only"
+        notes.append(
+            f"Contrast {pair['foreground']} on {pair['background']} is {pair['ratio']}:1, "
+            f"below WCAG AA 4.5:1 for body text ({usable})"
+        )
+
+    return {
+        "pairs": pairs,
+        "failing": len(failing),
+        "min_ratio": pairs[0]["ratio"],
+        "notes": notes,
+    }
+
+
+def contrast_prompt_hint(contrast: Optional[Dict[str, Any]]) -> str:
+    """One-line summary of palette_contrast output for the vision prompt"""
+    if not contrast:
+        return ""
+    if not contrast["failing"]:
+        return f"all {len(contrast['pairs'])} palette pairs meet WCAG AA"
+    worst = ", ".join(
+        f"{pair['foreground']} on {pair['background']} {pair['ratio']}:1"
+        for pair in contrast["pairs"][:3] if pair["ratio"] < WCAG_AA
+    )
+    return f"{contrast['failing']} of {len(contrast['pairs'])} palette pairs below WCAG AA ({worst})"
+
+
+def _text_lines(ink: "np.ndarray", left: int, right: int, min_height: int, max_height: int) -> List[int]:
+    """Heights of text-line bands in one column strip of an ink-edge map
+
+    Rows with enough vertical-stroke edges form candidate bands (horizontal
+    projection); a band counts as text only if its rows are broken into many
+    short ink runs, which separates glyphs from solid boxes and rules.
+    """
+    import numpy as np
+
+    strip = ink[:, left:right]
+    strip_width = right - left
+    row_counts = strip.sum(axis=1)
+    heights = []
+    for top, bottom in _runs(row_counts >= max(2, strip_width // 100)):
+        height = bottom - top
+        if not min_height <= height <= max_height:
+            continue
+        band = strip[top:bottom]
+        # Connected runs per row: glyph strokes give many, box edges give two
+        transitions = np.count_nonzero(band[:, 1:] != band[:, :-1], axis=1)
+        if np.median(transitions) >= 6:
+            heights.append(height)
+    return heights
+
+
+def _cluster_sizes(sizes: List[float], tolerance: float = 0.12) -> List[Tuple[float, int]]:
+    """Group sorted sizes whose neighbours are within `tolerance`; returns (median, count)"""
+    clusters: List[List[float]] = []
+    for size in sorted(sizes):
+        if clusters and size <= clusters[-1][-1] * (1 + tolerance):
+            clusters[-1].append(size)
+        else:
+            clusters.append([size])
+    return [(sorted(group)[len(group) // 2], len(group)) for group in clusters]
+
+
+def estimate_typography(image: "Image.Image", scale: float = 1.0, budget_ms: float = 25.0) -> Dict[str, Any]:
+    """Estimate the type scale from text-line heights
+
+    Vertical-stroke edges mark ink; the page is split into column strips so
+    lines of side-by-side columns are not merged, and each strip's text-line
+    bands are measured. Heights are clustered into sizes, the most frequent
+    size is taken as body text, and larger sizes become heading levels.
+
+    Stops after `budget_ms` and returns what was measured so far, with
+    "complete" set to False.
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    width, height = image.size
+    if width < 64 or height < 64:
+        return {}
+
+    gray = np.asarray(image.convert("L"), dtype=np.int16)
+    ink = np.zeros(gray.shape, dtype=bool)
+    ink[:, 1:] = np.abs(np.diff(gray, axis=1)) > 40
+
+    # Column strips from the vertical projection of ink
+    strips = _merge_runs(_runs(ink.mean(axis=0) > 0.002), max(4, width // 60))
+    strips = [(left, right) for left, right in strips if right - left >= width // 20] or [(0, width)]
+
+    heights: List[int] = []
+    complete = True
+    for left, right in strips:
+        if (time.perf_counter() - started) * 1000 > budget_ms:
+            complete = False
+            break
+        heights.extend(_text_lines(ink, left, right, min_height=4, max_height=max(8, height // 8)))
+
+    if not heights:
+        return {} if complete else {"complete": False}
+
+    sizes = [h * scale / INK_TO_FONT_SIZE for h in heights]
+    clusters = _cluster_sizes(sizes)
+    body_size = max(clusters, key=lambda cluster: cluster[1])[0]
+
+    scale_steps = []
+    larger = [c for c in clusters if c[0] > body_size * 1.12]
+    for level, (size, lines) in enumerate(sorted(larger, reverse=True)[:4], 1):
+        scale_steps.append({"role": f"heading-{level}", "size_px": round(size), "lines": lines})
+    scale_steps.sort(key=lambda step: -step["size_px"])
+    body_lines = next(lines for size, lines in clusters if size == body_size)
+    scale_steps.append({"role": "body", "size_px": round(body_size), "lines": body_lines})
+    smaller = [c for c in clusters if c[0] < body_size / 1.12]
+    if smaller:
+        size, lines = max(smaller, key=lambda cluster: cluster[1])
+        scale_steps.append({"role": "caption", "size_px": round(size), "lines": lines})
+
+    # Average step between adjacent sizes, as a modular-scale ratio
+    step_sizes = sorted({step["size_px"] for step in scale_steps})
+    ratio = (step_sizes[-1] / step_sizes[0]) ** (1 / (len(step_sizes) - 1)) if len(step_sizes) > 1 else 1.0
+
+    return {
+        "scale": scale_steps,
+        "base_size": round(body_size),
+        "ratio": round(ratio, 3),
+        "line_count": len(heights),
+        "complete": complete,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def typography_prompt_hint(typography: Optional[Dict[str, Any]]) -> str:
+    """One-line summary of estimate_typography output for the vision prompt"""
+    if not typography or not typography.get("scale"):
+        return ""
+    sizes = ", ".join(f"{step['role']} {step['size_px']}px" for step in typography["scale"])
+    return f"{sizes} (ratio {typography['ratio']})"
+
+
+def changed_region(
+    previous: "np.ndarray",
+    current: "np.ndarray",
+    block: int = DIFF_BLOCK,
+    threshold: float = DIFF_THRESHOLD
+) -> Dict[str, Any]:
+    """Block-wise difference between two same-sized grayscale revisions
+    
+    A block counts as changed when its mean absolute difference exceeds
+    threshold (which absorbs re-encoding noise). Returns the changed share of
+    the screen and the bounding box of the changed blocks, padded by one
+    block, as (left, top, right, bottom) in analysed px, or None if nothing
+    changed.
+    """
+    import numpy as np
+    
+    height, width = current.shape
+    diff = np.abs(current.astype(np.int16) - previous.astype(np.int16)).astype(np.float32)
+    rows, cols = -(-height // block), -(-width // block)
+    padded = np.zeros((rows * block, cols * block), dtype=np.float32)
+    padded[:height, :width] = diff
+    changed = padded.reshape(rows, block, cols, block).mean(axis=(1, 3)) > threshold
+    
+    count = int(changed.sum())
+    if not count:
+        return {"changed_share": 0.0, "box": None, "box_share": 0.0}
+    
+    ys, xs = np.nonzero(changed)
+    left = max(0, (int(xs.min()) - 1) * block)
+    top = max(0, (int(ys.min()) - 1) * block)
+    right = min(width, (int(xs.max()) + 2) * block)
+    bottom = min(height, (int(ys.max()) + 2) * block)
+    return {
+        "changed_share": round(count / changed.size, 4),
+        "box": (left, top, right, bottom),
+        "box_share": round((right - left) * (bottom - top) / (width * height), 4),
+    }
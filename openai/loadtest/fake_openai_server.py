@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI Chat Completions Server
+
+A local stand-in for the OpenAI chat-completions endpoint used for load
+testing api_server.py without spending money or touching the network.
+
+Features:
+- Configurable latency distributions (fixed, uniform, normal, lognormal, exponential)
+- Token streaming over SSE when the client sends "stream": true (with a final
+  usage chunk when "stream_options": {"include_usage": true})
+- 429 / 500 error injection at configurable rates
+- Canned JSON analysis replies shaped like the ones VibeMindOpenAI expects
+
+Point the backend at it through the client base URL:
+    python loadtest/fake_openai_server.py --port 9100 --latency lognormal:1.2,0.4
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn api_server:app --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_ANALYSES: List[Dict[str, Any]] = [
+    {
+        "layout_analysis": "Dashboard with a fixed top navbar, collapsible left sidebar and a 3-column card grid",
+        "visual_design": "Inter typeface, 14px body and 24px headings, blue primary on neutral slate grays",
+        "components_identified": [
+            {"type": "Navbar", "location": "top", "description": "Logo, search field and avatar menu",
+             "properties": {"height": "64px"}, "confidence": 0.9},
+            {"type": "Sidebar", "location": "left", "description": "Six navigation items with icons",
+             "properties": {"width": "240px"}, "confidence": 0.85},
+            {"type": "Card", "location": "main", "description": "KPI card with value, label and trend badge",
+             "properties": {"variant": "outlined"}, "confidence": 0.8},
+        ],
+        "interaction_patterns": "Hover elevation on cards, dropdown on avatar, active state in sidebar",
+        "technical_specifications": "CSS grid with 24px gutters, breakpoints at 768px and 1024px",
+        "accessibility_notes": ["Muted label text may fail WCAG AA", "Add visible focus rings to nav items"],
+        "implementation_prompt": "Create an analytics dashboard page with a top navbar, a left sidebar and a "
+                                 "responsive grid of KPI Cards using shadcn/ui and Tailwind CSS.",
+        "confidence_score": 0.84,
+        "uncertain_elements": ["Chart library"],
+    },
+    {
+        "layout_analysis": "Single-column mobile checkout flow with sticky footer action bar",
+        "visual_design": "System font stack, 16px body, green success accents and rounded inputs",
+        "components_identified": [
+            {"type": "Input", "location": "main", "description": "Card number field with brand icon",
+             "properties": {"size": "lg"}, "confidence": 0.88},
+            {"type": "Button", "location": "bottom", "description": "Full-width primary pay button",
+             "properties": {"variant": "filled"}, "confidence": 0.92},
+        ],
+        "interaction_patterns": "Inline validation, disabled button until form is valid",
+        "technical_specifications": "Flex column layout, 16px padding, sticky bottom bar",
+        "accessibility_notes": ["Associate labels with inputs", "Announce validation errors"],
+        "implementation_prompt": "Build a mobile checkout form with card, expiry and CVC inputs and a sticky "
+                                 "full-width pay Button with inline validation states.",
+        "confidence_score": 0.79,
+        "uncertain_elements": [],
+    },
+]
+
+
+class FakeServerConfig:
+    """Runtime configuration for the fake server"""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0.5",
+        token_interval: float = 0.01,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        retry_after: float = 1.0,
+        fenced: bool = False,
+        replies: Optional[List[Dict[str, Any]]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.fenced = fenced
+        self.replies = replies or CANNED_ANALYSES
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "streamed": 0, "injected_429": 0, "injected_500": 0}
+
+    def sample_latency(self) -> float:
+        """Sample a response latency in seconds from the configured distribution
+
+        Spec format is "<kind>:<param>[,<param>]":
+            fixed:0.5            always 0.5s
+            uniform:0.2,1.5      uniform between 0.2s and 1.5s
+            normal:1.0,0.25      mean 1.0s, stddev 0.25s
+            lognormal:0.8,0.5    median 0.8s, sigma 0.5 (long right tail)
+            exponential:1.0      mean 1.0s
+        """
+        kind, _, raw = self.latency.partition(":")
+        params = [float(p) for p in raw.split(",") if p] if raw else []
+
+        if kind == "fixed":
+            value = params[0] if params else 0.0
+        elif kind == "uniform":
+            value = self.random.uniform(params[0], params[1])
+        elif kind == "normal":
+            value = self.random.gauss(params[0], params[1])
+        elif kind == "lognormal":
+            value = params[0] * self.random.lognormvariate(0.0, params[1])
+        elif kind == "exponential":
+            value = self.random.expovariate(1.0 / params[0])
+        else:
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+
+        return max(0.0, value)
+
+    def pick_reply(self) -> str:
+        """Pick a canned analysis and render it as assistant message content"""
+        content = json.dumps(self.random.choice(self.replies), ensure_ascii=False)
+        if self.fenced:
+            content = f"Here is the analysis:\n```json\n{content}\n```"
+        return content
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def _error_response(status_code: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None):
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+        headers=headers,
+    )
+
+
+def create_app(config: FakeServerConfig) -> FastAPI:
+    """Create the fake OpenAI FastAPI app bound to a configuration"""
+    app = FastAPI(title="Fake OpenAI Chat Completions")
+    app.state.config = config
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        config.stats["requests"] += 1
+
+        roll = config.random.random()
+        if roll < config.rate_429:
+            config.stats["injected_429"] += 1
+            return _error_response(
+                429, "Rate limit reached (injected)", "rate_limit_exceeded",
+                headers={"retry-after": str(config.retry_after)},
+            )
+        if roll < config.rate_429 + config.rate_500:
+            config.stats["injected_500"] += 1
+            await asyncio.sleep(config.sample_latency() / 4)
+            return _error_response(500, "The server had an error (injected)", "server_error")
+
+        model = body.get("model", "gpt-4o")
+        content = config.pick_reply()
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        prompt_tokens = _estimate_tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = _estimate_tokens(content)
+
+        if body.get("stream"):
+            config.stats["streamed"] += 1
+            usage = None
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+            return StreamingResponse(
+                _stream_chunks(config, completion_id, created, model, content, usage),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(config.sample_latency())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "gpt-4o", "object": "model", "owned_by": "fake"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return config.stats
+
+    return app
+
+
+async def _stream_chunks(
+    config: FakeServerConfig,
+    completion_id: str,
+    created: int,
+    model: str,
+    content: str,
+    usage: Optional[Dict[str, int]] = None,
+):
+    """Yield SSE chunks: first token after the sampled latency, then one every token_interval
+
+    With usage (stream_options.include_usage), a final chunk with no choices carries it.
+    """
+    await asyncio.sleep(config.sample_latency())
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for start in range(0, len(content), 4):
+        yield chunk({"content": content[start:start + 4]})
+        if config.token_interval:
+            await asyncio.sleep(config.token_interval)
+    yield chunk({}, finish_reason="stop")
+    if usage is not None:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                   "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(payload)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_OPENAI_PORT", 9100)))
+    parser.add_argument("--latency", default="fixed:0.5",
+                        help="Latency distribution, e.g. fixed:0.5, uniform:0.2,1.5, lognormal:0.8,0.5")
+    parser.add_argument("--token-interval", type=float, default=0.01,
+                        help="Seconds between streamed token chunks")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--fenced", action="store_true", help="Wrap replies in ```json fences")
+    parser.add_argument("--reply-file", help="JSON file with a list of analysis dicts to serve instead")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    replies = None
+    if args.reply_file:
+        with open(args.reply_file, "r", encoding="utf-8") as f:
+            replies = json.load(f)
+
+    config = FakeServerConfig(
+        latency=args.latency,
+        token_interval=args.token_interval,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        retry_after=args.retry_after,
+        fenced=args.fenced,
+        replies=replies,
+        seed=args.seed,
+    )
+    config.sample_latency()  # validate the spec before starting
+
+    import uvicorn
+    print(f"🧪 Fake OpenAI server on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
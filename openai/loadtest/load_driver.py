@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Load Test Driver for api_server.py
+
+Replays a mix of /api/analyze (base64 JSON), /api/analyze-upload
+(multipart) and /api/analyze-binary (raw body) traffic at a target request rate and reports throughput,
+latency percentiles and error rates.
+
+Open-loop: requests are scheduled at the target RPS regardless of how fast
+the server answers, so a saturated server shows up as growing latency and
+errors rather than a silently lower offered load.
+
+Usage:
+    # Start the fake OpenAI server and the API server, then drive them
+    python loadtest/load_driver.py --start-servers --rps 5 --duration 30
+
+    # Drive an already running deployment
+    python loadtest/load_driver.py --target http://127.0.0.1:8000 --rps 10 --mix analyze=0.7,upload=0.3
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+from benchmarks.bench_vibe_mind import make_ui_image, encode_image
+
+OPENAI_DIR = Path(__file__).parent.parent
+
+# Screenshot sizes replayed by the driver, picked uniformly per request
+PAYLOAD_SIZES: List[Tuple[int, int]] = [(390, 844), (1280, 800), (1920, 1080)]
+
+
+class Payloads:
+    """Pre-encoded synthetic screenshots so payload generation stays off the hot path"""
+
+    def __init__(self, sizes: List[Tuple[int, int]], format: str = "PNG"):
+        self.images: List[Tuple[str, bytes]] = []
+        for width, height in sizes:
+            data = encode_image(make_ui_image(width, height), format)
+            self.images.append((f"screen_{width}x{height}.{format.lower()}", data))
+        self.base64 = [(name, base64.b64encode(data).decode()) for name, data in self.images]
+
+    def pick(self, rng: random.Random) -> int:
+        return rng.randrange(len(self.images))
+
+
+def send_analyze(session: requests.Session, target: str, payloads: Payloads, index: int,
+                 api_key: str, timeout: float) -> requests.Response:
+    filename, encoded = payloads.base64[index]
+    return session.post(
+        f"{target}/api/analyze",
+        json={
+            "image_base64": encoded,
+            "image_filename": filename,
+            "message": "Load test: analyze this screen",
+            "profile_key": "product_designer",
+            "platform_target": "v0",
+            "api_key": api_key,
+        },
+        timeout=timeout,
+    )
+
+
+def send_upload(session: requests.Session, target: str, payloads: Payloads, index: int,
+                api_key: str, timeout: float) -> requests.Response:
+    filename, data = payloads.images[index]
+    return session.post(
+        f"{target}/api/analyze-upload",
+        files={"file": (filename, data, "application/octet-stream")},
+        data={
+            "message": "Load test: analyze this upload",
+            "profile_key": "product_designer",
+            "platform_target": "v0",
+            "api_key": api_key,
+        },
+        timeout=timeout,
+    )
+
+
+def send_binary(session: requests.Session, target: str, payloads: Payloads, index: int,
+                api_key: str, timeout: float) -> requests.Response:
+    _, data = payloads.images[index]
+    return session.post(
+        f"{target}/api/analyze-binary",
+        params={
+            "message": "Load test: analyze this binary upload",
+            "profile_key": "product_designer",
+            "platform_target": "v0",
+        },
+        data=data,
+        headers={"Content-Type": "application/octet-stream", "X-API-Key": api_key},
+        timeout=timeout,
+    )
+
+
+SENDERS = {"analyze": send_analyze, "upload": send_upload, "binary": send_binary}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "analyze=0.7,upload=0.3" into normalised weights"""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SENDERS:
+            raise ValueError(f"Unknown traffic kind '{name}' (expected one of {', '.join(SENDERS)})")
+        weights[name] = float(weight or 1.0)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(records: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Aggregate per-request records into throughput, latency and error statistics"""
+
+    def stats_for(subset: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latencies = sorted(r["latency_ms"] for r in subset)
+        ok = [r for r in subset if r["ok"]]
+        outcomes = Counter(str(r["status"]) for r in subset)
+        return {
+            "requests": len(subset),
+            "succeeded": len(ok),
+            "error_rate": round(1 - len(ok) / len(subset), 4) if subset else 0.0,
+            "throughput_rps": round(len(ok) / wall_time, 3) if wall_time else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 1),
+                "p90": round(percentile(latencies, 90), 1),
+                "p95": round(percentile(latencies, 95), 1),
+                "p99": round(percentile(latencies, 99), 1),
+                "max": round(latencies[-1], 1) if latencies else 0.0,
+            },
+            "outcomes": dict(outcomes),
+        }
+
+    by_kind = defaultdict(list)
+    for record in records:
+        by_kind[record["kind"]].append(record)
+
+    return {
+        "wall_time_s": round(wall_time, 2),
+        "overall": stats_for(records),
+        "by_endpoint": {kind: stats_for(subset) for kind, subset in by_kind.items()},
+    }
+
+
+def run_load(target: str, rps: float, duration: float, mix: Dict[str, float], api_key: str,
+             timeout: float = 120.0, max_in_flight: int = 256, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Drive the target at a fixed arrival rate and return the summary"""
+    rng = random.Random(seed)
+    payloads = Payloads(PAYLOAD_SIZES)
+    kinds, weights = zip(*mix.items())
+    records: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one_request(kind: str, index: int, scheduled_at: float):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        status: Any
+        try:
+            response = SENDERS[kind](local.session, target, payloads, index, api_key, timeout)
+            status = response.status_code
+            ok = response.ok
+        except requests.Timeout:
+            status, ok = "timeout", False
+        except requests.RequestException as e:
+            status, ok = type(e).__name__, False
+        end = time.perf_counter()
+        with lock:
+            records.append({
+                "kind": kind,
+                "status": status,
+                "ok": ok,
+                "latency_ms": (end - start) * 1000,
+                "queue_delay_ms": (start - scheduled_at) * 1000,
+            })
+
+    total = int(rps * duration)
+    interval = 1.0 / rps
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for i in range(total):
+            scheduled_at = started + i * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choices(kinds, weights)[0]
+            pool.submit(one_request, kind, payloads.pick(rng), scheduled_at)
+
+    summary = summarize(records, time.perf_counter() - started)
+    summary["offered_rps"] = rps
+    summary["mix"] = mix
+    summary["client_queue_delay_ms_p95"] = round(
+        percentile(sorted(r["queue_delay_ms"] for r in records), 95), 1
+    )
+    return summary
+
+
+def wait_for(url: str, timeout: float = 30.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def start_servers(args) -> List[subprocess.Popen]:
+    """Launch the fake OpenAI server and api_server pointed at it"""
+    fake_cmd = [
+        sys.executable, str(OPENAI_DIR / "loadtest" / "fake_openai_server.py"),
+        "--port", str(args.fake_port), "--latency", args.latency,
+        "--rate-429", str(args.rate_429), "--rate-500", str(args.rate_500),
+        "--token-interval", str(args.token_interval),
+    ]
+    env = dict(os.environ)
+    env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.fake_port}/v1"
+    env["OPENAI_API_KEY"] = args.api_key
+    if not args.result_cache:
+        # The driver replays a handful of fixed payloads, so cached results would soon answer
+        # every request and the OpenAI path would stop being exercised
+        env["RESULT_CACHE_DISABLED"] = "1"
+    api_port = args.target.rsplit(":", 1)[-1]
+    api_cmd = [
+        sys.executable, "-m", "uvicorn", "api_server:app",
+        "--host", "127.0.0.1", "--port", api_port,
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+
+    processes = [subprocess.Popen(fake_cmd, cwd=OPENAI_DIR)]
+    if not wait_for(f"http://127.0.0.1:{args.fake_port}/v1/models"):
+        raise RuntimeError("Fake OpenAI server did not start")
+    processes.append(subprocess.Popen(api_cmd, cwd=OPENAI_DIR, env=env, stdout=subprocess.DEVNULL))
+    if not wait_for(f"{args.target}/api/health", timeout=60):
+        raise RuntimeError("api_server did not start")
+    return processes
+
+
+def print_report(summary: Dict[str, Any]):
+    print(f"\n📊 Load Test Report ({summary['wall_time_s']}s, offered {summary['offered_rps']} rps)")
+    print("=" * 60)
+    rows = [("overall", summary["overall"])] + list(summary["by_endpoint"].items())
+    for name, stats in rows:
+        lat = stats["latency_ms"]
+        print(f"  {name:<10} n={stats['requests']:<5} ok/s={stats['throughput_rps']:<7} "
+              f"err={stats['error_rate']:.1%}  p50={lat['p50']}ms p95={lat['p95']}ms "
+              f"p99={lat['p99']}ms max={lat['max']}ms")
+        print(f"             outcomes: {stats['outcomes']}")
+    print(f"  client scheduling delay p95: {summary['client_queue_delay_ms_p95']}ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test driver for the Vibe Mind API server")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Base URL of api_server")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target arrival rate (requests/second)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic to offer")
+    parser.add_argument("--mix", default="analyze=0.5,upload=0.5", help="Traffic mix weights")
+    parser.add_argument("--api-key", default="sk-loadtest-fake-key-0000000000", help="Key sent in requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write the JSON summary to this path")
+    parser.add_argument("--start-servers", action="store_true",
+                        help="Start the fake OpenAI server and api_server before driving load")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --start-servers")
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Keep the result cache on with --start-servers (off by default)")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="Fake server latency distribution")
+    parser.add_argument("--token-interval", type=float, default=0.0,
+                        help="Fake server seconds between streamed chunks; 0 keeps the whole call within --latency")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    args = parser.parse_args()
+
+    processes = start_servers(args) if args.start_servers else []
+    try:
+        print(f"🚀 Driving {args.target} at {args.rps} rps for {args.duration}s (mix {args.mix})")
+        summary = run_load(
+            args.target, args.rps, args.duration, parse_mix(args.mix), args.api_key,
+            timeout=args.timeout, seed=args.seed,
+        )
+        summary["timestamp"] = datetime.now().isoformat()
+        summary["target"] = args.target
+        print_report(summary)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            print(f"\n💾 Summary saved to: {args.output}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
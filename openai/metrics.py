@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the Vibe Mind backend
+
+A small thread-safe registry of counters, gauges and latency summaries that
+background workers and request handlers can report into. The API server
+exposes a snapshot at /api/metrics.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class LatencySummary:
+    """Running count/sum/max plus percentiles over a window of recent samples"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, pct: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters, gauges and latency summaries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        self.summaries: Dict[str, LatencySummary] = {}
+
+    def inc(self, name: str, value: float = 1):
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to an absolute value"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]):
+        """Register a gauge whose value is read from a callback at snapshot time"""
+        with self._lock:
+            self.gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float):
+        """Record a sample (typically a latency in milliseconds)"""
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                summary = self.summaries[name] = LatencySummary()
+            summary.observe(value)
+
+    def timer(self, name: str) -> "_Timer":
+        """Context manager that observes elapsed milliseconds into a summary"""
+        return _Timer(self, name)
+
+    def get_counter(self, name: str) -> float:
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def get_summary(self, name: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            summary = self.summaries.get(name)
+            return summary.to_dict() if summary else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view of all metrics"""
+        with self._lock:
+            gauges = dict(self.gauges)
+            callbacks = dict(self.gauge_callbacks)
+            result = {
+                "counters": dict(self.counters),
+                "summaries": {name: s.to_dict() for name, s in self.summaries.items()},
+            }
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception:
+                continue
+        result["gauges"] = gauges
+        return result
+
+    def to_prometheus(self, prefix: str = "vibemind_") -> str:
+        """Render a snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = _prometheus_name(prefix + name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            metric = _prometheus_name(prefix + name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        with self._lock:
+            totals = {name: s.total for name, s in self.summaries.items()}
+        for name, summary in sorted(snapshot["summaries"].items()):
+            metric = _prometheus_name(prefix + name)
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'{metric}{{quantile="0.{quantile[1:]}"}} {summary[quantile]}')
+            lines.append(f"{metric}_count {summary['count']}")
+            lines.append(f"{metric}_sum {round(totals.get(name, 0.0), 3)}")
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+class _Timer:
+    def __init__(self, registry: MetricsRegistry, name: str):
+        self.registry = registry
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted prompt building
+
+Local token estimates (no tokenizer download, no network) for prompt text,
+compact serialization of project context, and output budgets derived from
+the response fields a prompt actually asks for.
+
+Budgets come from the designer profile and the platform config, each as
+"token_budget": {"input": <tokens>, "output": <tokens>}; the smaller limit
+wins. The input budget covers the user prompt text (images and the system
+prompt are fixed costs and are not trimmed).
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+DEFAULT_INPUT_BUDGET = 1200
+DEFAULT_OUTPUT_BUDGET = 2000
+
+# Output allowance per response field, in tokens
+FIELD_TOKENS: Dict[str, int] = {
+    "layout_analysis": 300,
+    "visual_design": 250,
+    "components_identified": 350,
+    "interaction_patterns": 150,
+    "technical_specifications": 200,
+    "accessibility_notes": 250,
+    "implementation_prompt": 450,
+    "confidence_score": 10,
+    "uncertain_elements": 40,
+}
+
+# Smaller allowances for fields whose measurable part is computed locally
+MEASURED_FIELD_TOKENS: Dict[str, int] = {
+    "layout_analysis": 100,
+    "visual_design": 150,
+    "accessibility_notes": 60,
+}
+
+# Braces, quotes and separators of the JSON object around the fields
+JSON_OVERHEAD_TOKENS = 20
+
+# Chat format overhead per message, plus the assistant reply priming
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|[^\w\s]+|_")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count for English prose, markdown and JSON
+
+    Common words are one token and long words one per 6 characters, digit
+    runs one per 3 digits, and punctuation runs one per 2 characters (BPE
+    merges pairs such as '{"' and '":'). Typically within 10-15% of
+    cl100k/o200k counts, erring high on JSON.
+    """
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isdigit():
+            count += -(-len(piece) // 3)
+        elif piece[0].isalpha():
+            count += 1 + (len(piece) - 1) // 6
+        else:
+            count += -(-len(piece) // 2)
+    return count
+
+
+def estimate_message_tokens(messages: Iterable[Mapping[str, Any]], image_tokens: int = 0) -> int:
+    """Estimated prompt tokens for a chat request (text parts plus a known image cost)"""
+    total = REPLY_OVERHEAD_TOKENS + image_tokens
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+            continue
+        for part in content or ():
+            if part.get("type") == "text":
+                total += estimate_tokens(part["text"])
+    return total
+
+
+def _prune(value: Any) -> Any:
+    """Drop None and empty values from nested dicts and lists"""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    return value
+
+
+def _shorten(value: Any, limit: int) -> Any:
+    """Truncate every string in a nested value to at most limit characters"""
+    if isinstance(value, str):
+        return value if len(value) <= limit else value[: limit - 1] + "…"
+    if isinstance(value, dict):
+        return {k: _shorten(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shorten(v, limit) for v in value]
+    return value
+
+
+def compact_json(value: Any, max_tokens: Optional[int] = None) -> str:
+    """Minified JSON without empty values, with long strings shortened to fit max_tokens"""
+    value = _prune(value)
+    text = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    limit = 512
+    while max_tokens is not None and estimate_tokens(text) > max_tokens and limit >= 32:
+        text = json.dumps(_shorten(value, limit), separators=(",", ":"), ensure_ascii=False, default=str)
+        limit //= 2
+    return text
+
+
+@dataclass(frozen=True, slots=True)
+class TokenBudget:
+    """Input (user prompt text) and output (max_tokens) limits for one call"""
+
+    input_tokens: int = DEFAULT_INPUT_BUDGET
+    output_tokens: int = DEFAULT_OUTPUT_BUDGET
+
+    @classmethod
+    def resolve(cls, *configs: Optional[Mapping[str, Any]]) -> "TokenBudget":
+        """Combine "token_budget" entries (profile, platform, ...); the smallest limit wins"""
+        input_tokens, output_tokens = DEFAULT_INPUT_BUDGET, DEFAULT_OUTPUT_BUDGET
+        for config in configs:
+            if not config:
+                continue
+            input_tokens = min(input_tokens, int(config.get("input", input_tokens)))
+            output_tokens = min(output_tokens, int(config.get("output", output_tokens)))
+        return cls(input_tokens, output_tokens)
+
+    def max_tokens(self, fields: Iterable[str], measured: Iterable[str] = ()) -> int:
+        """max_tokens for a response with these fields, capped by the output budget"""
+        measured = set(measured)
+        total = JSON_OVERHEAD_TOKENS
+        for name in fields:
+            table = MEASURED_FIELD_TOKENS if name in measured and name in MEASURED_FIELD_TOKENS else FIELD_TOKENS
+            total += table.get(name, 100)
+        return min(self.output_tokens, total)
+
+
+class PromptBuilder:
+    """Assembles prompt sections, dropping optional ones to fit a token budget
+
+    Sections with priority 0 are always kept; when the estimate exceeds the
+    budget, the highest-priority-number sections are dropped first (the
+    latest added among equals).
+    """
+
+    def __init__(self):
+        self._sections: List[Tuple[int, str]] = []
+
+    def add(self, text: str, priority: int = 0) -> "PromptBuilder":
+        if text:
+            self._sections.append((priority, text))
+        return self
+
+    def build(self, budget: Optional[int] = None) -> Tuple[str, int, int]:
+        """Return (prompt, estimated tokens, number of sections dropped)"""
+        sections = list(self._sections)
+        costs = [estimate_tokens(text) for _, text in sections]
+        total = sum(costs)
+        dropped = 0
+        while budget is not None and total > budget:
+            optional = [i for i, (priority, _) in enumerate(sections) if priority > 0]
+            if not optional:
+                break
+            index = max(optional, key=lambda i: (sections[i][0], i))
+            total -= costs.pop(index)
+            sections.pop(index)
+            dropped += 1
+        return "\n".join(text for _, text in sections), total, dropped
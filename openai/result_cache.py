@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Result cache shared across worker processes
+
+Two tiers, both keyed by content hash and holding serialized bytes:
+
+- LRUCache: per-process, in-memory near tier
+- SharedCache: SQLite file on local disk (WAL mode), readable and writable by
+  every uvicorn worker on the node, with an LRU index on last access
+
+TieredCache puts the near tier in front of the shared one, so a screenshot
+analysed by worker 1 is a cache hit for worker 2 as well.
+
+Entries carry an expiry time. Expired entries are not returned by default but
+are kept until LRU eviction, so callers can still opt in to stale results.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from metrics import metrics as default_metrics, MetricsRegistry
+
+# (value, expires_at)
+_Entry = Tuple[bytes, float]
+
+
+class LRUCache:
+    """Thread-safe in-process LRU of bytes values with expiry"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str, allow_stale: bool = False) -> Optional[Tuple[bytes, bool]]:
+        """Return (value, is_stale) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            stale = time.time() >= expires_at
+            if stale and not allow_stale:
+                return None
+            self._entries.move_to_end(key)
+            return value, stale
+
+    def set(self, key: str, value: bytes, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache:
+    """SQLite-backed key/value cache shared by all processes on a node"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access);
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_entries: int = 10000,
+        touch_interval: float = 60.0,
+        evict_every: int = 50,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        # Refresh last_access at most this often per entry, to keep reads mostly write-free
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._sets = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                    setup = sqlite3.connect(self.db_path, timeout=10)
+                    try:
+                        setup.execute("PRAGMA journal_mode=WAL")
+                        setup.executescript(self.SCHEMA)
+                        setup.commit()
+                    finally:
+                        setup.close()
+                    self._schema_ready = True
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, key: str, allow_stale: bool = False) -> Optional[Tuple[bytes, bool]]:
+        """Return (value, is_stale) or None"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, last_access FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at, last_access = row
+        now = time.time()
+        stale = now >= expires_at
+        if stale and not allow_stale:
+            return None
+        if now - last_access >= self.touch_interval:
+            conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        return bytes(value), stale
+
+    def set(self, key: str, value: bytes, expires_at: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, time.time()),
+        )
+        self._sets += 1
+        if self._sets % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries beyond max_entries"""
+        conn = self._connection()
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)", (excess,)
+        )
+        return excess
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class TieredCache:
+    """In-process LRU in front of the node-wide shared cache"""
+
+    def __init__(
+        self,
+        near: LRUCache,
+        far: Optional[SharedCache],
+        ttl: float = 24 * 3600,
+        registry: MetricsRegistry = default_metrics,
+    ):
+        self.near = near
+        self.far = far
+        self.ttl = ttl
+        self.metrics = registry
+
+    def lookup(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Tuple[bytes, bool]]:
+        """Return (value, is_stale) from the nearest tier that has the key"""
+        full_key = f"{namespace}:{key}"
+
+        hit = self.near.lookup(full_key, allow_stale)
+        if hit is not None:
+            self.metrics.inc(f"result_cache_{namespace}_hits_near")
+            return hit
+
+        if self.far is not None:
+            try:
+                hit = self.far.lookup(full_key, allow_stale)
+            except sqlite3.Error as e:
+                self.metrics.inc("result_cache_errors")
+                print(f"⚠️  Shared cache read failed: {e}")
+                hit = None
+            if hit is not None:
+                value, stale = hit
+                # Promote with the remaining (or already elapsed) lifetime
+                self.near.set(full_key, value, time.time() if stale else time.time() + self.ttl)
+                self.metrics.inc(f"result_cache_{namespace}_hits_shared")
+                return hit
+
+        self.metrics.inc(f"result_cache_{namespace}_misses")
+        return None
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        hit = self.lookup(namespace, key)
+        return hit[0] if hit else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None):
+        full_key = f"{namespace}:{key}"
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self.near.set(full_key, value, expires_at)
+        if self.far is not None:
+            try:
+                self.far.set(full_key, value, expires_at)
+            except sqlite3.Error as e:
+                self.metrics.inc("result_cache_errors")
+                print(f"⚠️  Shared cache write failed: {e}")
+        self.metrics.inc(f"result_cache_{namespace}_sets")
+
+
+_default_cache: Optional[TieredCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[TieredCache]:
+    """Process-wide cache configured from the environment, or None if disabled
+
+    RESULT_CACHE_DISABLED=1      turn caching off
+    RESULT_CACHE_PATH            shared SQLite file (default: <tmp>/vibemind_result_cache.db)
+    RESULT_CACHE_TTL             seconds before an entry is stale (default: 86400)
+    RESULT_CACHE_MAX_ENTRIES     shared tier LRU size (default: 10000)
+    RESULT_CACHE_NEAR_ENTRIES    in-process LRU size (default: 256)
+    """
+    global _default_cache
+    if os.getenv("RESULT_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            path = os.getenv(
+                "RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "vibemind_result_cache.db")
+            )
+            far = SharedCache(path, max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))) if path else None
+            _default_cache = TieredCache(
+                near=LRUCache(int(os.getenv("RESULT_CACHE_NEAR_ENTRIES", "256"))),
+                far=far,
+                ttl=float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600))),
+            )
+        return _default_cache
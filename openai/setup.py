@@ -69,7 +69,7 @@ def install_dependencies():
     
     # Core packages needed for the system
     core_packages = [
-        "openai>=1.0.0",
+        "openai>=1.26.0",
         "pillow>=9.0.0",
         "requests>=2.25.0",
         "scikit-learn>=1.0.0",
@@ -280,7 +280,7 @@ def create_requirements_file():
         return True
     
     requirements_content = """# Vibe Mind OpenAI SDK Requirements
-openai>=1.0.0
+openai>=1.26.0
 pillow>=9.0.0
 requests>=2.25.0
 scikit-learn>=1.0.0
@@ -0,0 +1,6 @@
+"""Make the server modules (openai/*.py) importable from the tests directory"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
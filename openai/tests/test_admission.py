@@ -0,0 +1,83 @@
+"""Admission control: FIFO hand-off, shedding and the 429 Retry-After response"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import api_server
+from admission import AdmissionController, Overloaded
+from deadlines import Deadline
+from metrics import MetricsRegistry
+
+
+def controller(**kwargs) -> AdmissionController:
+    return AdmissionController(registry=MetricsRegistry(), **kwargs)
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        admission = controller(max_in_flight=1, max_queue=2, max_wait=5)
+        await admission.acquire()
+        order = []
+
+        async def wait(name):
+            await admission.acquire()
+            order.append(name)
+
+        waiters = [asyncio.ensure_future(wait("first")), asyncio.ensure_future(wait("second"))]
+        await asyncio.sleep(0)
+        assert admission.queue_depth == 2
+
+        admission.release(1.0)
+        await asyncio.sleep(0.01)
+        assert order == ["first"] and admission.in_flight == 1
+        admission.release(1.0)
+        await asyncio.gather(*waiters)
+        admission.release(1.0)
+        assert order == ["first", "second"] and admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_the_queue_is_full():
+    async def scenario():
+        admission = controller(max_in_flight=1, max_queue=0)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as raised:
+            await admission.acquire()
+        assert raised.value.reason == "queue_full"
+        assert admission.metrics.get_counter("admission_shed_queue_full") == 1
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_the_wait_times_out():
+    async def scenario():
+        admission = controller(max_in_flight=1, max_queue=1, max_wait=5)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as raised:
+            await admission.acquire(timeout=0.01)
+        assert raised.value.reason == "queue_timeout"
+        assert admission.queue_depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_follows_observed_service_time():
+    admission = controller(max_in_flight=2, max_wait=10)
+    assert admission.retry_after() == 5
+    admission._in_flight = 1
+    admission.release(3.0)
+    assert admission.retry_after() == 2
+
+
+def test_saturated_server_answers_429_with_retry_after(monkeypatch):
+    admission = controller(max_in_flight=1, max_queue=0)
+    admission._in_flight = 1
+    monkeypatch.setattr(api_server, "admission", admission)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(api_server._run_cancellable(None, Deadline(30), lambda: None))
+    assert raised.value.status_code == 429
+    assert raised.value.headers["Retry-After"] == str(admission.retry_after())
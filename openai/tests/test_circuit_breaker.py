@@ -0,0 +1,143 @@
+"""Circuit breaker state transitions and error classification"""
+
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_upstream_failure
+from metrics import MetricsRegistry
+
+
+class AuthenticationError(Exception):
+    status_code = 401
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class InternalServerError(Exception):
+    status_code = 500
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class APITimeoutError(APIConnectionError):
+    pass
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("reset_timeout", 0.05)
+    return CircuitBreaker(registry=MetricsRegistry(), **kwargs)
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.acquire()
+        breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+def test_success_resets_the_failure_count():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_failure("boom")
+    breaker.record_success(10)
+    breaker.record_failure("boom")
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("boom")
+    time.sleep(0.06)
+    breaker.acquire()  # the probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()  # only one probe at a time
+    breaker.record_success(10)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_reopens_on_failure():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("boom")
+    time.sleep(0.06)
+    breaker.acquire()
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker(latency_threshold_ms=100)
+    for _ in range(3):
+        breaker.record_success(500)
+    assert breaker.state == OPEN
+
+
+def test_ignored_outcome_frees_the_probe():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("boom")
+    time.sleep(0.06)
+    breaker.acquire()
+    breaker.record_ignored()
+    breaker.acquire()  # a new probe is allowed
+
+
+@pytest.mark.parametrize("error, upstream", [
+    (AuthenticationError("bad key"), False),
+    (RateLimitError("slow down"), False),
+    (ValueError("bug"), False),
+    (InternalServerError("oops"), True),
+    (APIConnectionError("refused"), True),
+    (APITimeoutError("timed out"), True),
+    (TimeoutError(), True),
+])
+def test_error_classification(error, upstream):
+    assert is_upstream_failure(error) is upstream
+
+
+def test_bad_keys_do_not_open_the_shared_breaker():
+    from types import SimpleNamespace
+    from result_cache import LRUCache, TieredCache
+    from vibe_mind import VibeMindOpenAI
+
+    def create(**kwargs):
+        raise AuthenticationError("Incorrect API key provided")
+
+    breaker = make_breaker()
+    analyzer = VibeMindOpenAI(api_key="sk-bad", result_cache=TieredCache(LRUCache(), None), breaker=breaker)
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    for _ in range(5):
+        result = analyzer._vision_completion("system", [{"type": "text", "text": "hi"}], max_tokens=10)
+        assert "error" in result
+    assert breaker.state == CLOSED
+
+
+def test_client_build_failure_does_not_take_the_probe(monkeypatch):
+    from result_cache import LRUCache, TieredCache
+    from vibe_mind import VibeMindOpenAI
+
+    def missing_sdk(self):
+        raise ImportError("No module named 'httpx'")
+
+    monkeypatch.setattr(VibeMindOpenAI, "client", property(missing_sdk))
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure("boom")
+    time.sleep(0.06)
+    analyzer = VibeMindOpenAI(api_key="sk-test", result_cache=TieredCache(LRUCache(), None), breaker=breaker)
+
+    result = analyzer._vision_completion("system", [{"type": "text", "text": "hi"}], max_tokens=10)
+    assert "error" in result
+    breaker.acquire()  # the probe slot is still free
+    assert breaker.state == HALF_OPEN
@@ -0,0 +1,85 @@
+"""Accept-Encoding negotiation and the compression middleware"""
+
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+
+BIG = b'{"summarized_report": "' + b"a dashboard with cards " * 200 + b'"}'
+
+
+def document(request):
+    size = int(request.query_params.get("size", len(BIG)))
+    return Response(BIG[:size], media_type="application/json", headers={"ETag": '"v1"'})
+
+
+def image(request):
+    return Response(b"\x89PNG" + bytes(4096), media_type="image/png")
+
+
+def make_client(**kwargs) -> TestClient:
+    app = Starlette(routes=[Route("/doc", document), Route("/image", image)])
+    return TestClient(CompressionMiddleware(app, **kwargs))
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, deflate", None),
+    ("*", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiation_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding(header) == expected
+
+
+def test_brotli_preferred_when_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+
+def test_large_json_is_gzipped_with_a_weak_etag(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = make_client().get("/doc", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.content == BIG  # the client decodes
+
+
+def test_small_and_identity_responses_pass_through():
+    client = make_client()
+    small = client.get("/doc?size=100", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["etag"] == '"v1"'
+    identity = client.get("/doc", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.content == BIG
+
+
+def test_uncompressed_eligible_responses_still_vary_on_accept_encoding():
+    client = make_client()
+    for response in (
+        client.get("/doc?size=100", headers={"Accept-Encoding": "gzip"}),
+        client.get("/doc", headers={"Accept-Encoding": "identity"}),
+    ):
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+    assert "vary" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_threadpool_compression_matches(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = make_client(threadpool_size=0).get("/doc", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BIG
+    assert gzip.decompress(compression.compress(BIG, "gzip")) == BIG
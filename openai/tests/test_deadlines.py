@@ -0,0 +1,174 @@
+"""Deadline clamping, stage checkpoints and cancellation"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from circuit_breaker import CLOSED, CircuitBreaker
+from deadlines import Deadline, DeadlineExceeded, RequestCancelled
+from metrics import MetricsRegistry
+
+
+def test_header_is_clamped_to_the_server_floor_and_cap():
+    assert Deadline.from_header("1", cap=60, floor=5).seconds == 5
+    assert Deadline.from_header("20000", cap=60, floor=5).seconds == 20
+    assert Deadline.from_header("999999", cap=60, floor=5).seconds == 60
+
+
+def test_missing_or_invalid_header_uses_the_cap():
+    assert Deadline.from_header(None, cap=30, floor=5).seconds == 30
+    assert Deadline.from_header("soon", cap=30, floor=5).seconds == 30
+
+
+def test_floor_never_exceeds_the_cap():
+    assert Deadline.from_header("1", cap=2, floor=5).seconds == 2
+
+
+def test_stage_checkpoints_are_cumulative():
+    deadline = Deadline(10, registry=MetricsRegistry())
+    assert deadline.time_left("preprocess") == pytest.approx(2, abs=0.05)
+    assert deadline.time_left("openai") == pytest.approx(9, abs=0.05)
+    assert deadline.time_left("finalize") == pytest.approx(10, abs=0.05)
+
+
+def test_check_raises_once_a_checkpoint_passes():
+    deadline = Deadline(0.05, stages=(("preprocess", 0.5), ("openai", 0.5)), registry=MetricsRegistry())
+    deadline.check("preprocess")
+    time.sleep(0.03)
+    with pytest.raises(DeadlineExceeded):
+        deadline.check("preprocess")
+    deadline.check("openai")
+
+
+def test_cancel_stops_the_next_stage():
+    registry = MetricsRegistry()
+    deadline = Deadline(10, registry=registry)
+    deadline.cancel("client_disconnected")
+    with pytest.raises(RequestCancelled) as info:
+        deadline.check("openai")
+    assert info.value.reason == "client_disconnected"
+    assert registry.get_counter("work_cancelled_openai") == 1
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+def chunk(content=None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(model="gpt-4o", choices=choices, usage=usage)
+
+
+class StubStream:
+    """SDK Stream stand-in: iterates chunks, running a hook after each, and records close()"""
+
+    def __init__(self, chunks, after_chunk=None):
+        self.chunks = chunks
+        self.after_chunk = after_chunk
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for item in self.chunks:
+            self.consumed += 1
+            yield item
+            if self.after_chunk:
+                self.after_chunk(self.consumed)
+
+    def close(self):
+        self.closed = True
+
+
+class StubClient:
+    """Chat Completions stub that times out (or returns `stream`) and records the options it was used with"""
+
+    def __init__(self, stream=None):
+        self.options = []
+        self.requests = []
+        self.stream = stream
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.stream is None:
+            raise APITimeoutError("Request timed out")
+        return self.stream
+
+
+def openai_deadline(seconds: float) -> Deadline:
+    """A deadline whose whole budget belongs to the OpenAI stage"""
+    return Deadline(seconds, stages=(("openai", 1.0),), registry=MetricsRegistry())
+
+
+def _analyzer(breaker, client=None):
+    from http_transport import SharedTransport
+    from result_cache import LRUCache, TieredCache
+    from vibe_mind import VibeMindOpenAI
+
+    transport = SharedTransport(registry=MetricsRegistry())
+    transport.timeout = lambda budget=None: budget  # no httpx needed for the stub
+    analyzer = VibeMindOpenAI(
+        api_key="sk-test", result_cache=TieredCache(LRUCache(), None), breaker=breaker, transport=transport
+    )
+    analyzer.client = client or StubClient()
+    return analyzer
+
+
+def _call(analyzer, deadline):
+    return analyzer._vision_completion("system", [{"type": "text", "text": "hi"}], max_tokens=10, deadline=deadline)
+
+
+def test_short_deadline_timeouts_do_not_open_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, latency_threshold_ms=30000, registry=MetricsRegistry())
+    analyzer = _analyzer(breaker)
+    for _ in range(5):
+        _call(analyzer, openai_deadline(1.0))
+    assert breaker.state == CLOSED
+    assert analyzer.client.options == [{"max_retries": 0}] * 5
+    assert analyzer.client.requests[0]["timeout"] <= 1.0
+
+
+def test_timeouts_within_a_long_budget_still_count():
+    breaker = CircuitBreaker(failure_threshold=3, latency_threshold_ms=30000, registry=MetricsRegistry())
+    analyzer = _analyzer(breaker)
+    for _ in range(3):
+        _call(analyzer, openai_deadline(45.0))
+    assert breaker.state != CLOSED
+
+
+def test_deadline_bound_calls_stream_and_report_usage():
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=8, prompt_tokens_details=None)
+    stream = StubStream([chunk('{"confidence_'), chunk('score": 0.9}'), chunk(usage=usage)])
+    client = StubClient(stream)
+    breaker = CircuitBreaker(registry=MetricsRegistry())
+    calls = []
+    result = _analyzer(breaker, client)._vision_completion(
+        "system", [{"type": "text", "text": "hi"}], max_tokens=10, usage_out=calls, deadline=openai_deadline(30.0)
+    )
+    assert result == {"confidence_score": 0.9}
+    assert client.requests[0]["stream"] and client.requests[0]["stream_options"] == {"include_usage": True}
+    assert stream.closed
+    assert calls[0].prompt_tokens == 100 and calls[0].completion_tokens == 8
+
+
+def test_cancelling_the_deadline_aborts_the_upstream_stream():
+    deadline = openai_deadline(30.0)
+    stream = StubStream(
+        [chunk("{") for _ in range(10)],
+        after_chunk=lambda consumed: consumed == 2 and deadline.cancel("client_disconnected"),
+    )
+    breaker = CircuitBreaker(failure_threshold=1, registry=MetricsRegistry())
+    analyzer = _analyzer(breaker, StubClient(stream))
+
+    result = _call(analyzer, deadline)
+    assert "error" in result
+    assert stream.closed and stream.consumed == 3
+    assert breaker.state == CLOSED
+    with pytest.raises(RequestCancelled):
+        deadline.check("openai")
+    assert deadline.metrics.get_counter("work_cancelled_openai") == 1
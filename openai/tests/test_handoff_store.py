@@ -0,0 +1,70 @@
+"""Handoff store writes, queries, usage aggregation and retention"""
+
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from handoff_store import HandoffStore
+from metrics import MetricsRegistry
+
+
+def handoff(image_hash="img", cost=0.01):
+    usage = {"key_hash": "k1", "model": "gpt-4o", "prompt_tokens": 100, "completion_tokens": 50, "cost_usd": cost}
+    return SimpleNamespace(
+        image_hash=image_hash, designer_profile="product_designer", platform_target="v0", metadata={"usage": usage}
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HandoffStore(db_path=str(tmp_path / "handoffs.db"), max_bytes=None, max_age_seconds=None,
+                        retention_interval=3600, registry=MetricsRegistry())
+
+
+def usage_rows(store) -> int:
+    return store._connection().execute("SELECT COUNT(*) FROM usage").fetchone()[0]
+
+
+def test_round_trip_and_query(store):
+    store.write_batch([("h1", handoff("a"), b'{"n": 1}'), ("h2", handoff("b"), b'{"n": 2}')])
+    assert store.get_raw("h1") == b'{"n": 1}'
+    assert store.get_raw("missing") is None
+    assert [row["id"] for row in store.query(image_hash="b")] == ["h2"]
+    totals = store.usage_summary(since=0, group_by=("key_hash",))
+    assert totals[0]["handoffs"] == 2 and totals[0]["cost_usd"] == pytest.approx(0.02)
+
+
+def test_count_is_kept_without_rescanning(store):
+    assert store.count() == 0
+    store.write_batch([("h1", handoff(), b"{}"), ("h2", handoff(), b"{}")])
+    store.write_batch([("h2", handoff(), b"{}")])  # replaced, not added
+    assert store.count() == 2
+
+
+def test_size_eviction_removes_handoffs_but_keeps_usage(store):
+    payload = os.urandom(4000)  # incompressible, so the stored size is known
+    for index in range(6):
+        store.write_batch([(f"h{index}", handoff(), payload)])
+        time.sleep(0.002)
+    store.max_bytes = len(payload) * 3
+    result = store.enforce_retention()
+    assert result["evicted"] >= 3
+    assert store.count() == 6 - result["evicted"]
+    assert usage_rows(store) == 6
+    assert store.usage_summary(since=0, group_by=("key_hash",))[0]["handoffs"] == 6
+    assert store.get_raw("h5") is not None
+    assert store.get_raw("h0") is None
+
+
+def test_age_retention_removes_handoffs_and_their_usage(store):
+    store.write_batch([("old", handoff(), b"{}")])
+    store._connection().execute("UPDATE handoffs SET created_at = created_at - 7200")
+    store._connection().execute("UPDATE usage SET created_at = created_at - 7200")
+    store._connection().commit()
+    store.write_batch([("new", handoff(), b"{}")])
+    store.max_age_seconds = 3600
+    assert store.enforce_retention()["expired"] == 1
+    assert store.count() == 1
+    assert usage_rows(store) == 1
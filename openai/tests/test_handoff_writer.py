@@ -0,0 +1,81 @@
+"""Background handoff writer, ULID ids and the metrics registry"""
+
+import threading
+from types import SimpleNamespace
+
+import handoff_writer
+from handoff_writer import HandoffWriter, new_handoff_id
+from metrics import MetricsRegistry
+
+
+class MemorySink:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def location_for(self, handoff_id):
+        return f"memory://{handoff_id}"
+
+    def write_batch(self, records):
+        with self.lock:
+            self.batches.append(records)
+
+
+def make_writer(sink, **kwargs) -> HandoffWriter:
+    return HandoffWriter(sink=sink, encoder=lambda handoff: b"{}", registry=MetricsRegistry(), **kwargs)
+
+
+def test_ulids_are_unique_and_time_ordered():
+    ids = [new_handoff_id() for _ in range(1000)]
+    assert len(set(ids)) == 1000
+    assert all(len(handoff_id) == 26 for handoff_id in ids)
+    assert ids[0][:10] <= ids[-1][:10]  # the timestamp prefix never goes backwards
+
+
+def test_submitted_handoffs_are_written_in_batches():
+    sink = MemorySink()
+    writer = make_writer(sink, batch_size=8)
+    locations = [writer.submit(SimpleNamespace(handoff_id=f"h{index}")) for index in range(20)]
+    assert writer.flush(timeout=5)
+    writer.stop()
+    written = [handoff_id for batch in sink.batches for handoff_id, _, _ in batch]
+    assert sorted(written) == sorted(f"h{index}" for index in range(20))
+    assert all(len(batch) <= 8 for batch in sink.batches)
+    assert locations[0] == "memory://h0"
+    assert writer.metrics.get_counter("handoff_writer_written") == 20
+
+
+def test_full_queue_writes_inline():
+    sink = MemorySink()
+    writer = make_writer(sink, max_queue=1)
+    writer.start = lambda: None  # no consumer, so the queue stays full
+    writer.submit(SimpleNamespace(handoff_id="queued"))
+    writer.submit(SimpleNamespace(handoff_id="inline"))
+    assert [batch[0][0] for batch in sink.batches] == ["inline"]
+    assert writer.metrics.get_counter("handoff_writer_sync_fallback") == 1
+
+
+def test_exit_hook_is_registered_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(handoff_writer.atexit, "register", registered.append)
+    writer = make_writer(MemorySink())
+    for _ in range(3):
+        writer.start()
+        writer.stop()
+    assert registered == [writer.stop]
+
+
+def test_metrics_registry_snapshot_and_prometheus():
+    registry = MetricsRegistry()
+    registry.inc("requests", 2)
+    registry.observe("latency_ms", 10)
+    registry.observe("latency_ms", 30)
+    registry.register_gauge("queue-depth", lambda: 3)
+    snapshot = registry.snapshot()
+    assert snapshot["counters"]["requests"] == 2
+    assert snapshot["summaries"]["latency_ms"]["count"] == 2
+    assert snapshot["gauges"]["queue-depth"] == 3
+    text = registry.to_prometheus()
+    assert "vibemind_requests_total 2" in text
+    assert "vibemind_queue_depth 3" in text
+    assert "vibemind_latency_ms_sum 40" in text
@@ -0,0 +1,97 @@
+"""Shared transport: client construction, connection reuse accounting and environment config"""
+
+import importlib.util
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from http_transport import SharedTransport, _ConnectionTrace
+from metrics import MetricsRegistry
+
+
+def traced_response(new_connection: bool):
+    trace = _ConnectionTrace()
+    if new_connection:
+        trace("connection.connect_tcp.started", {})
+        trace("connection.start_tls.complete", {})
+    return SimpleNamespace(request=SimpleNamespace(extensions={"trace": trace}))
+
+
+def test_counts_new_and_reused_connections():
+    registry = MetricsRegistry()
+    transport = SharedTransport(registry=registry)
+    transport._record_response(traced_response(new_connection=True))
+    for _ in range(3):
+        transport._record_response(traced_response(new_connection=False))
+
+    assert transport.reuse_rate() == 0.75
+    assert registry.get_counter("openai_connections_new") == 1
+    assert registry.get_counter("openai_connections_reused") == 3
+    assert registry.get_summary("openai_connect_ms")["count"] == 1
+    assert registry.snapshot()["gauges"]["openai_connection_reuse_rate"] == 0.75
+    assert transport.snapshot()["connections_new"] == 1
+
+
+def test_untraced_responses_are_ignored():
+    transport = SharedTransport(registry=MetricsRegistry())
+    transport._record_response(SimpleNamespace(request=SimpleNamespace(extensions={})))
+    assert transport.reuse_rate() == 0.0
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_MAX_CONNECTIONS", "4")
+    monkeypatch.setenv("OPENAI_READ_TIMEOUT", "12.5")
+    monkeypatch.setenv("OPENAI_HTTP2", "0")
+    transport = SharedTransport.from_env()
+    assert (transport.max_connections, transport.read_timeout, transport.http2) == (4, 12.5, False)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("httpx") is None, reason="httpx not installed")
+def test_builds_one_pooled_client():
+    import httpx
+
+    transport = SharedTransport(max_connections=4, read_timeout=12.0, registry=MetricsRegistry())
+    try:
+        client = transport.client
+        assert isinstance(client, httpx.Client)
+        assert transport.client is client
+        assert transport.timeout(3.0).read == 3.0
+    finally:
+        transport.close()
+
+
+def test_without_httpx_timeouts_are_plain_seconds(monkeypatch):
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    transport = SharedTransport(read_timeout=12.0, registry=MetricsRegistry())
+    with pytest.raises(ImportError):
+        transport.client
+    assert transport.timeout() == 12.0
+    assert transport.timeout(3.0) == 3.0
+
+
+def analyzer():
+    pytest.importorskip("openai")
+    from vibe_mind import VibeMindOpenAI
+
+    transport = SharedTransport(registry=MetricsRegistry())
+    return VibeMindOpenAI(api_key="sk-test", transport=transport), transport
+
+
+def test_analyzer_client_uses_the_shared_transport_when_available():
+    vibe, transport = analyzer()
+    try:
+        client = vibe.client
+        assert vibe.client is client
+        if importlib.util.find_spec("httpx") is not None:
+            assert client._client is transport.client
+    finally:
+        transport.close()
+
+
+def test_analyzer_client_falls_back_to_the_sdk_default_without_httpx(monkeypatch):
+    vibe, transport = analyzer()
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    client = vibe.client
+    assert client.api_key == "sk-test"
+    assert transport._client is None
@@ -0,0 +1,148 @@
+"""Local image measurements: layout, contrast, typography and revision diffs"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from image_analysis import (
+    changed_region,
+    contrast_matrix,
+    detect_layout,
+    estimate_typography,
+    layout_prompt_hint,
+    page_background,
+    palette_contrast,
+    spacing_scale,
+    typography_prompt_hint,
+)
+
+
+def color(rgb, confidence):
+    return SimpleNamespace(hex="#{:02x}{:02x}{:02x}".format(*rgb), rgb=rgb, confidence=confidence)
+
+
+def test_contrast_of_a_known_pair():
+    ratios = contrast_matrix([(0, 0, 0), (255, 255, 255), (118, 118, 118)])
+    assert ratios[0, 1] == pytest.approx(21.0)
+    assert ratios[1, 2] == pytest.approx(4.54, abs=0.01)  # #767676, the lightest gray passing AA on white
+
+
+def test_page_background_is_the_border_color():
+    image = Image.new("RGB", (200, 120), (250, 250, 250))
+    ImageDraw.Draw(image).rectangle((40, 30, 160, 90), fill=(30, 30, 30))
+    assert page_background(image) == (250, 250, 250)
+
+
+def test_black_on_white_screenshot_has_no_contrast_failures():
+    from vibe_mind import ImagePreprocessor
+
+    image = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(image)
+    for top in range(40, 260, 30):
+        draw.rectangle((40, top, 360, top + 10), fill="black")
+
+    colors = ImagePreprocessor().extract_dominant_colors(image)
+    contrast = palette_contrast(colors, [page_background(image)])
+    assert contrast["failing"] == 0
+    assert contrast["notes"] == []
+    assert {"foreground": "#000000", "background": "#ffffff", "ratio": 21.0, "level": "AAA"} in contrast["pairs"]
+
+
+def test_light_gray_text_on_white_is_flagged():
+    contrast = palette_contrast([color((170, 170, 170), 0.2)], [(255, 255, 255)])
+    assert contrast["failing"] == 1
+    assert "#aaaaaa on #ffffff" in contrast["notes"][0]
+
+
+def test_tints_and_anti_aliasing_blends_are_not_text():
+    palette = [
+        color((17, 24, 39), 0.25),     # text
+        color((243, 244, 246), 0.4),   # card surface (a tint of the white page)
+        color((136, 140, 147), 0.05),  # anti-aliased edge between the text and the page
+    ]
+    contrast = palette_contrast(palette, [(255, 255, 255)])
+    assert contrast["failing"] == 0
+    assert {(pair["foreground"], pair["background"]) for pair in contrast["pairs"]} == {("#111827", "#ffffff")}
+
+
+def test_surface_without_plausible_text_reports_nothing():
+    assert palette_contrast([color((243, 244, 246), 1.0)], [(255, 255, 255)]) == {}
+
+
+def three_column_page() -> Image.Image:
+    image = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(3):
+        left = 40 + i * 248
+        draw.rectangle([left, 120, left + 223, 400], fill="#dddddd")
+    draw.rectangle([40, 480, 759, 560], fill="#dddddd")
+    return image
+
+
+def test_layout_finds_columns_gutters_and_sections():
+    layout = detect_layout(three_column_page())
+    assert layout["columns"] == 3
+    assert 20 <= layout["gutter"] <= 26
+    assert layout["margins"]["left"] == 40
+    assert len(layout["sections"]) == 2
+    assert layout["grid_system"].startswith("3-column grid")
+    assert layout_prompt_hint(layout).startswith("3-column grid")
+
+
+def test_layout_scales_back_to_source_pixels():
+    assert detect_layout(three_column_page(), scale=2.0)["gutter"] == 2 * detect_layout(three_column_page())["gutter"]
+
+
+def test_layout_of_tiny_images_is_empty():
+    assert detect_layout(Image.new("RGB", (32, 32), "white")) == {}
+    assert layout_prompt_hint({}) == ""
+
+
+def test_spacing_scale_snaps_to_the_best_base_unit():
+    assert spacing_scale([8, 16, 24, 31]) == {"base_unit": 8, "scale": [8, 16, 24, 32]}
+    assert spacing_scale([4, 12, 20]) == {"base_unit": 4, "scale": [4, 12, 20]}
+    assert spacing_scale([1]) == {}
+
+
+def test_typography_separates_heading_from_body_text():
+    image = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(image)
+    heading, body = ImageFont.load_default(size=40), ImageFont.load_default(size=16)
+    draw.text((40, 30), "Heading Text Here Example", font=heading, fill="black")
+    for i in range(8):
+        draw.text((40, 120 + i * 32), "The quick brown fox jumps over the lazy dog", font=body, fill="black")
+
+    typography = estimate_typography(image, budget_ms=1000)
+    roles = {step["role"]: step for step in typography["scale"]}
+    assert set(roles) == {"heading-1", "body"}
+    assert roles["body"]["lines"] == 8
+    assert 14 <= typography["base_size"] <= 18
+    assert roles["heading-1"]["size_px"] > 2 * typography["base_size"]
+    assert typography["complete"]
+    assert typography_prompt_hint(typography).startswith("heading-1")
+
+
+def test_typography_of_blank_or_tiny_images_is_empty():
+    assert estimate_typography(Image.new("RGB", (800, 600), "white")) == {}
+    assert estimate_typography(Image.new("RGB", (32, 32), "white")) == {}
+    assert typography_prompt_hint({}) == ""
+
+
+def test_changed_region_boxes_the_edit_with_one_block_of_padding():
+    previous = np.full((256, 320), 255, dtype=np.uint8)
+    current = previous.copy()
+    current[100:120, 200:230] = 0
+
+    region = changed_region(previous, current, block=16)
+    # Blocks 6-7 (rows) and 12-14 (columns) changed, padded by one block each side
+    assert region["box"] == (11 * 16, 5 * 16, 16 * 16, 9 * 16)
+    assert region["changed_share"] == round(6 / (16 * 20), 4)
+    assert 0 < region["box_share"] < 0.2
+
+
+def test_encoding_noise_is_not_a_change():
+    previous = np.full((100, 100), 128, dtype=np.uint8)
+    current = previous + np.random.default_rng(0).integers(0, 3, previous.shape, dtype=np.uint8)
+    assert changed_region(previous, current) == {"changed_share": 0.0, "box": None, "box_share": 0.0}
@@ -0,0 +1,44 @@
+"""Pre-serialized metadata documents: ETags, 304s and the throttled config version"""
+
+import os
+
+from fastapi.testclient import TestClient
+
+import api_server
+import vibe_mind
+
+client = TestClient(api_server.app)
+
+
+def test_profiles_revalidate_with_304():
+    first = client.get("/api/profiles")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == api_server.METADATA_CACHE_CONTROL
+
+    again = client.get("/api/profiles", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert client.get("/api/profiles", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/api/profiles", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_documents_have_distinct_etags():
+    etags = {client.get(path).headers["etag"] for path in ("/api/profiles", "/api/platforms", "/api/preprocessing")}
+    assert len(etags) == 3
+
+
+def test_config_version_is_throttled(monkeypatch):
+    calls = []
+    listdir = os.listdir
+    monkeypatch.setattr(vibe_mind.os, "listdir", lambda path: calls.append(path) or listdir(path))
+    monkeypatch.setattr(vibe_mind, "_config_version", (float("-inf"), ()))
+
+    version = vibe_mind.config_version(max_age=60)
+    listed = len(calls)
+    assert listed == 2  # profiles and handoff directories
+    for _ in range(10):
+        assert vibe_mind.config_version(max_age=60) == version
+    assert len(calls) == listed
+    vibe_mind.config_version(max_age=0)
+    assert len(calls) == 2 * listed
@@ -0,0 +1,44 @@
+"""Auto-crop and the crop-aware reduced JPEG decode"""
+
+import io
+
+from PIL import Image, ImageDraw
+
+from vibe_mind import ImagePreprocessor
+
+
+def screenshot(size=(4000, 3000), content=(1200, 900, 2800, 2100), fmt="JPEG") -> bytes:
+    """White page with a text-like block of content"""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = content
+    draw.rectangle(content, fill=(240, 240, 245))
+    for y in range(top + 50, bottom - 50, 40):
+        draw.rectangle((left + 50, y, right - 100, y + 14), fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_auto_crop_removes_blank_margins():
+    preprocessor = ImagePreprocessor(max_dimension=512, auto_crop=True)
+    image = preprocessor.load_image(screenshot(size=(1600, 1200), content=(400, 300, 1200, 900), fmt="PNG"))
+    cropped, crop = preprocessor.auto_crop(image)
+    assert crop["box"] == [392, 292, 1209, 909]
+    assert cropped.size == (817, 617)
+    assert crop["pixel_savings"] > 0.6
+
+
+def test_reduced_jpeg_decode_keeps_the_cropped_content_at_target_size():
+    preprocessor = ImagePreprocessor(max_dimension=512, auto_crop=True)
+    image = preprocessor.load_image(screenshot())
+    # 1/2 scale, not the 1/4 a whole-image target would allow
+    assert image.size == (2000, 1500)
+    cropped, crop = preprocessor.auto_crop(image)
+    assert max(cropped.size) >= 512
+    assert crop["box"][0] < 1200 < crop["box"][2] and crop["source_size"] == [4000, 3000]
+
+
+def test_reduced_jpeg_decode_without_auto_crop_targets_the_whole_image():
+    preprocessor = ImagePreprocessor(max_dimension=512, auto_crop=False)
+    assert preprocessor.load_image(screenshot()).size == (1000, 750)
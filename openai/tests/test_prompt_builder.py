@@ -0,0 +1,69 @@
+"""Local token estimates, budget resolution and prompt section dropping"""
+
+import json
+
+from prompt_builder import (
+    DEFAULT_OUTPUT_BUDGET,
+    FIELD_TOKENS,
+    JSON_OVERHEAD_TOKENS,
+    MEASURED_FIELD_TOKENS,
+    PromptBuilder,
+    TokenBudget,
+    compact_json,
+    estimate_message_tokens,
+    estimate_tokens,
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello world") == 2
+    assert estimate_tokens("12345") == 2
+    assert estimate_tokens('{"a":1}') == 5
+    assert estimate_tokens("internationalization") == 4
+
+
+def test_estimate_message_tokens_counts_text_parts_and_image_cost():
+    messages = [
+        {"role": "system", "content": "hello world"},
+        {"role": "user", "content": [{"type": "text", "text": "hello"}, {"type": "image_url", "image_url": {}}]},
+    ]
+    assert estimate_message_tokens(messages, image_tokens=85) == 3 + 85 + 4 + 2 + 4 + 1
+
+
+def test_compact_json_prunes_empties_and_fits_budget():
+    assert compact_json({"a": None, "b": [], "c": {"d": ""}, "e": 1}) == '{"e":1}'
+
+    value = {"notes": "word " * 400}
+    text = compact_json(value, max_tokens=100)
+    assert estimate_tokens(text) <= 100
+    assert json.loads(text)["notes"].endswith("…")
+
+
+def test_token_budget_smallest_limit_wins():
+    budget = TokenBudget.resolve({"input": 800}, None, {"input": 1000, "output": 500})
+    assert budget == TokenBudget(800, 500)
+    assert TokenBudget.resolve().output_tokens == DEFAULT_OUTPUT_BUDGET
+
+
+def test_max_tokens_uses_measured_allowances():
+    budget = TokenBudget()
+    assert budget.max_tokens(["layout_analysis"]) == JSON_OVERHEAD_TOKENS + FIELD_TOKENS["layout_analysis"]
+    assert budget.max_tokens(["layout_analysis"], measured=["layout_analysis"]) == (
+        JSON_OVERHEAD_TOKENS + MEASURED_FIELD_TOKENS["layout_analysis"]
+    )
+    assert TokenBudget(output_tokens=50).max_tokens(FIELD_TOKENS) == 50
+
+
+def test_builder_drops_highest_priority_numbers_first():
+    builder = PromptBuilder().add("core " * 10).add("notes " * 10, priority=1).add("extra " * 10, priority=2)
+
+    prompt, tokens, dropped = builder.build(budget=25)
+    assert (tokens, dropped) == (20, 1)
+    assert "extra" not in prompt and "notes" in prompt
+
+    prompt, tokens, dropped = builder.build(budget=5)
+    assert (tokens, dropped) == (10, 2)
+    assert prompt == "core " * 10
+
+    assert builder.build()[1:] == (30, 0)
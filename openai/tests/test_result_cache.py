@@ -0,0 +1,69 @@
+"""Two-tier result cache: LRU order, expiry and fallthrough to the shared tier"""
+
+import time
+
+from metrics import MetricsRegistry
+from result_cache import LRUCache, SharedCache, TieredCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    later = time.time() + 60
+    cache.set("a", b"1", later)
+    cache.set("b", b"2", later)
+    assert cache.lookup("a") == (b"1", False)
+    cache.set("c", b"3", later)
+
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") == (b"1", False)
+    assert len(cache) == 2
+
+
+def test_expired_entries_only_served_when_stale_allowed():
+    cache = LRUCache()
+    cache.set("a", b"1", time.time() - 1)
+
+    assert cache.lookup("a") is None
+    assert cache.lookup("a", allow_stale=True) == (b"1", True)
+
+
+def test_shared_cache_evicts_beyond_max_entries(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.db"), max_entries=3, evict_every=1)
+    later = time.time() + 60
+    for i in range(5):
+        cache.set(f"k{i}", b"v", later)
+
+    assert len(cache) == 3
+    assert cache.lookup("k4") == (b"v", False)
+
+
+def test_tiered_lookup_falls_through_to_shared_tier(tmp_path):
+    db = str(tmp_path / "cache.db")
+    registry = MetricsRegistry()
+    writer = TieredCache(LRUCache(), SharedCache(db), registry=registry)
+    reader = TieredCache(LRUCache(), SharedCache(db), registry=registry)
+
+    writer.set("analysis", "abc", b"result")
+    assert reader.get("analysis", "abc") == b"result"
+    assert registry.get_counter("result_cache_analysis_hits_shared") == 1
+
+    # Promoted into the reader's near tier
+    assert reader.get("analysis", "abc") == b"result"
+    assert registry.get_counter("result_cache_analysis_hits_near") == 1
+
+    assert reader.get("analysis", "missing") is None
+    assert registry.get_counter("result_cache_analysis_misses") == 1
+
+
+def test_tiered_ttl_marks_entries_stale(tmp_path):
+    cache = TieredCache(LRUCache(), SharedCache(str(tmp_path / "cache.db")), registry=MetricsRegistry())
+    cache.set("analysis", "abc", b"result", ttl=-1)
+
+    assert cache.get("analysis", "abc") is None
+    assert cache.lookup("analysis", "abc", allow_stale=True) == (b"result", True)
+
+
+def test_tiered_cache_without_shared_tier():
+    cache = TieredCache(LRUCache(), None, registry=MetricsRegistry())
+    cache.set("analysis", "abc", b"result")
+    assert cache.get("analysis", "abc") == b"result"
@@ -0,0 +1,24 @@
+"""Cold imports stay within benchmarks/startup_budget.json and keep heavy deps lazy"""
+
+import pytest
+
+from benchmarks.startup_time import load_budget, measure_import
+
+BUDGET = load_budget()
+
+
+@pytest.mark.parametrize("module", sorted(BUDGET))
+def test_heavy_dependencies_stay_lazy(module):
+    loaded = {name.split(".")[0] for name in measure_import(module, runs=1)["loaded_modules"]}
+    eager = sorted(loaded & set(BUDGET[module].get("forbidden_modules", [])))
+    assert not eager, f"{module} imports {', '.join(eager)} eagerly (must be lazy)"
+
+
+@pytest.mark.parametrize("module", sorted(BUDGET))
+def test_cold_import_within_budget(module):
+    measurement = measure_import(module, runs=3)
+    top = ", ".join(f"{name} {ms}ms" for name, ms in measurement["breakdown_ms"][:5])
+    assert measurement["import_ms"] <= BUDGET[module]["max_import_ms"], (
+        f"{module}: import took {measurement['import_ms']}ms "
+        f"(budget {BUDGET[module]['max_import_ms']}ms; top: {top})"
+    )
@@ -0,0 +1,91 @@
+"""Token usage records, cost from a completion's usage block, and the /api/usage report"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from usage_accounting import TokenUsage, hash_api_key, model_pricing
+
+
+def response(prompt_tokens, completion_tokens, cached_tokens=0, model="gpt-4o-2024-08-06"):
+    return SimpleNamespace(
+        model=model,
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        ),
+    )
+
+
+def test_dated_snapshots_priced_by_longest_prefix():
+    assert model_pricing("gpt-4o-2024-08-06") == model_pricing("gpt-4o")
+    assert model_pricing("gpt-4o-mini-2024-07-18") == model_pricing("gpt-4o-mini")
+    assert model_pricing("unknown-model") is None
+
+
+def test_from_response_costs_cached_tokens_at_the_cached_rate():
+    usage = TokenUsage.from_response(response(1_000_000, 100_000, cached_tokens=400_000), model="fallback")
+    assert usage.model == "gpt-4o-2024-08-06"
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens) == (1_000_000, 100_000, 400_000)
+    # 600k input at 2.50 + 400k cached at 1.25 + 100k output at 10.00
+    assert usage.cost_usd == 1.5 + 0.5 + 1.0
+
+
+def test_from_response_without_usage():
+    assert TokenUsage.from_response(SimpleNamespace(), model="gpt-4o") is None
+    assert TokenUsage.cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_shares_add_up_to_the_whole():
+    usage = TokenUsage("gpt-4o", prompt_tokens=10, completion_tokens=7, cached_tokens=2, cost_usd=0.03)
+    shares = [usage.share(i, 3) for i in range(3)]
+    assert [s.prompt_tokens for s in shares] == [4, 3, 3]
+    assert sum(s.completion_tokens for s in shares) == 7
+    assert sum(s.cached_tokens for s in shares) == 2
+    assert all(s.cost_usd == 0.01 for s in shares)
+
+
+def test_api_keys_are_hashed():
+    assert hash_api_key(None) == "anonymous"
+    assert hash_api_key("sk-test") == hash_api_key("sk-test") != "sk-test"
+    assert len(hash_api_key("sk-test")) == 16
+
+
+@pytest.fixture
+def usage_client(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import api_server
+    from handoff_store import HandoffStore
+    from metrics import MetricsRegistry
+
+    store = HandoffStore(db_path=str(tmp_path / "handoffs.db"), max_bytes=None, max_age_seconds=None,
+                         retention_interval=3600, registry=MetricsRegistry())
+    for index, key in enumerate(["sk-alice", "sk-alice", "sk-bob"]):
+        usage = {"key_hash": hash_api_key(key), "model": "gpt-4o", "prompt_tokens": 100, "cost_usd": 0.01}
+        record = SimpleNamespace(
+            image_hash="img", designer_profile="product_designer", platform_target="v0", metadata={"usage": usage}
+        )
+        store.write_batch([(f"h{index}", record, b"{}")])
+    monkeypatch.setattr(api_server, "handoff_store", store)
+    monkeypatch.setattr(api_server, "USAGE_ADMIN_TOKEN", "admin-secret")
+    return TestClient(api_server.app)
+
+
+def handoffs(response):
+    return response.json()["windows"]["1h"]["totals"]["handoffs"]
+
+
+def test_usage_report_is_scoped_to_the_callers_key(usage_client):
+    assert usage_client.get("/api/usage?windows=1h").status_code == 401
+    assert handoffs(usage_client.get("/api/usage?windows=1h", headers={"X-API-Key": "sk-alice"})) == 2
+    other = usage_client.get(f"/api/usage?windows=1h&key_hash={hash_api_key('sk-bob')}", headers={"X-API-Key": "sk-alice"})
+    assert other.status_code == 403
+
+
+def test_cross_key_usage_needs_the_admin_token(usage_client):
+    assert usage_client.get("/api/usage?windows=1h", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    admin = {"X-Admin-Token": "admin-secret"}
+    assert handoffs(usage_client.get("/api/usage?windows=1h", headers=admin)) == 3
+    assert handoffs(usage_client.get(f"/api/usage?windows=1h&key_hash={hash_api_key('sk-bob')}", headers=admin)) == 1
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Token and cost accounting
+
+Turns the `usage` block of a chat completion into a TokenUsage record
+(prompt, completion and cached prompt tokens, model, derived cost). Records
+travel with the handoff in metadata["usage"]; the handoff store keeps one
+row per handoff so /api/usage can aggregate per hashed API key, profile and
+platform over rolling windows.
+
+Prices are USD per million tokens. MODEL_PRICING (JSON, same shape as
+PRICING) overrides or extends the table; unknown models are costed at 0.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# (input, cached input, output) USD per 1M tokens
+PRICING: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+
+def _pricing_table() -> Dict[str, Tuple[float, float, float]]:
+    table = dict(PRICING)
+    override = os.getenv("MODEL_PRICING")
+    if override:
+        try:
+            table.update({model: tuple(prices) for model, prices in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            print(f"⚠️  Ignoring invalid MODEL_PRICING: {e}")
+    return table
+
+
+_PRICING = _pricing_table()
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float, float]]:
+    """Prices for a model, matching dated snapshots (gpt-4o-2024-08-06) by longest prefix"""
+    if model in _PRICING:
+        return _PRICING[model]
+    matches = [name for name in _PRICING if model.startswith(name + "-")]
+    return _PRICING[max(matches, key=len)] if matches else None
+
+
+def hash_api_key(api_key: Optional[str]) -> str:
+    """Stable, non-reversible identifier for an API key (or "anonymous")"""
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True, slots=True)
+class TokenUsage:
+    """Tokens and cost of one model call (or a share of one)"""
+
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @classmethod
+    def from_response(cls, response: Any, model: str) -> Optional["TokenUsage"]:
+        """Read response.usage (including prompt_tokens_details.cached_tokens), or None if absent"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        model = getattr(response, "model", None) or model
+        return cls(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            cost_usd=cls.cost(model, prompt_tokens, completion_tokens, cached_tokens),
+        )
+
+    @staticmethod
+    def cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        prices = model_pricing(model)
+        if prices is None:
+            return 0.0
+        input_price, cached_price, output_price = prices
+        return round(
+            ((prompt_tokens - cached_tokens) * input_price
+             + cached_tokens * cached_price
+             + completion_tokens * output_price) / 1_000_000,
+            8,
+        )
+
+    def share(self, index: int, parts: int) -> "TokenUsage":
+        """The index-th of `parts` even shares (remainders go to the first shares)"""
+        def part(total: int) -> int:
+            base, extra = divmod(total, parts)
+            return base + (1 if index < extra else 0)
+        return TokenUsage(
+            model=self.model,
+            prompt_tokens=part(self.prompt_tokens),
+            completion_tokens=part(self.completion_tokens),
+            cached_tokens=part(self.cached_tokens),
+            cost_usd=round(self.cost_usd / parts, 8),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -13,30 +13,46 @@ Architecture follows the specifications in vibe_mind.mdx:
 - Includes preprocessing and validation
 """
 
+from __future__ import annotations
+
 import json
 import os
 import base64
+import binascii
+import hashlib
 import io
+import math
 import re
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Union
-from dataclasses import dataclass, asdict
-from PIL import Image, ImageDraw
-import requests
+from typing import Callable, Dict, Any, Optional, List, Tuple, Union, TYPE_CHECKING
+from dataclasses import dataclass, field, fields, replace
 from urllib.parse import urlparse
 import colorsys
-from sklearn.cluster import KMeans
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    import openai
-    from openai import OpenAI
-except ImportError:
-    print("❌ OpenAI SDK not installed. Please run: pip install openai")
-    raise
+from handoff_writer import new_handoff_id
+from metrics import metrics
+from result_cache import TieredCache, get_result_cache
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_vision_breaker, is_timeout, is_upstream_failure
+from http_transport import SharedTransport, get_shared_transport
+from deadlines import Deadline, RequestCancelled
+from usage_accounting import TokenUsage, hash_api_key
+from prompt_builder import (
+    TokenBudget, PromptBuilder, compact_json, estimate_tokens, estimate_message_tokens
+)
+from image_analysis import (
+    detect_layout, layout_prompt_hint, page_background, palette_contrast, contrast_prompt_hint,
+    estimate_typography, typography_prompt_hint, changed_region
+)
 
-from pydantic import BaseModel, validator
-import tempfile
+# Heavy dependencies (Pillow, NumPy, scikit-learn, requests, the OpenAI SDK)
+# are imported on first use rather than at module import, so importing
+# vibe_mind stays cheap for api_server cold starts and setup checks.
+# See benchmarks/startup_time.py and STARTUP_BUDGET in README.
+if TYPE_CHECKING:
+    from PIL import Image
+    from openai import OpenAI
 
 def load_env_file():
     """Load environment variables from .env file if it exists"""
@@ -61,19 +77,27 @@ def load_env_file():
     except Exception as e:
         print(f"⚠️  Warning: Could not load .env file: {e}")
 
-# Load .env file at module import
-load_env_file()
+_env_loaded = False
+
+def ensure_env_loaded():
+    """Load the .env file once per process (on first analyzer construction)"""
+    global _env_loaded
+    if not _env_loaded:
+        _env_loaded = True
+        load_env_file()
 
 
 # JSON Schema Models for Handoff
-@dataclass
+# Slotted and frozen: handoffs are built once per analysis and then only read
+# and serialized, often thousands of times in batch/streaming workloads.
+@dataclass(frozen=True, slots=True)
 class ColorInfo:
     hex: str
     rgb: tuple
     name: str
     confidence: float
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ComponentInfo:
     type: str
     location: str
@@ -81,14 +105,14 @@ class ComponentInfo:
     properties: Dict[str, Any]
     confidence: float
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LayoutInfo:
     structure: str
     grid_system: Optional[str]
     spacing: Dict[str, Any]
     responsive_behavior: Optional[str]
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DesignHandoff:
     """Structured design handoff JSON schema"""
     timestamp: str
@@ -113,37 +137,353 @@ class DesignHandoff:
     confidence_score: float
     uncertain_flags: List[str]
     
+    # Unique, time-sortable id (ULID) used for persistence
+    handoff_id: str = field(default_factory=new_handoff_id)
+    # Content hash of the preprocessed image
+    image_hash: Optional[str] = None
+    # Local preprocessing results (crop box, savings, ...)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization
+        
+        Unlike dataclasses.asdict this does not deep-copy leaf dicts such as
+        component properties or style tokens; they are shared with the handoff.
+        """
+        return _to_primitive(self)
+    
+    def to_json_bytes(self) -> bytes:
+        """Encode directly to compact UTF-8 JSON"""
+        return encode_json(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DesignHandoff":
+        """Rebuild a handoff from to_dict()/to_json_bytes() output"""
+        values = {name: data[name] for name in _MODEL_FIELDS[cls] if name in data}
+        values["dominant_colors"] = [_color_from_dict(c) for c in data.get("dominant_colors", [])]
+        values["layout"] = LayoutInfo(**data["layout"])
+        values["components"] = [ComponentInfo(**c) for c in data.get("components", [])]
+        return cls(**values)
+
+
+@dataclass(frozen=True, slots=True)
+class FlowHandoff:
+    """Handoff for a multi-screen user flow analysed in one vision call"""
+    timestamp: str
+    designer_profile: str
+    platform_target: str
+    
+    # One handoff per screen, in flow order
+    screens: List[DesignHandoff]
+    
+    # Design tokens shared across the flow (deduplicated palette, shared design system)
+    flow_tokens: Dict[str, Any]
+    flow_summary: str
+    prompt_for_platform: str
+    confidence_score: float
+    uncertain_flags: List[str]
+    
+    flow_id: str = field(default_factory=new_handoff_id)
+    # Token usage and cost of the flow's vision call (screens carry even shares)
+    usage: Dict[str, Any] = field(default_factory=dict)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
-        return asdict(self)
+        return _to_primitive(self)
+    
+    def to_json_bytes(self) -> bytes:
+        """Encode directly to compact UTF-8 JSON"""
+        return encode_json(self)
+
+
+_MODEL_FIELDS: Dict[type, Tuple[str, ...]] = {
+    cls: tuple(f.name for f in fields(cls))
+    for cls in (ColorInfo, ComponentInfo, LayoutInfo, DesignHandoff, FlowHandoff)
+}
+
+
+def _to_primitive(value: Any) -> Any:
+    """Convert handoff models to plain dicts/lists, sharing leaf containers"""
+    names = _MODEL_FIELDS.get(type(value))
+    if names is not None:
+        return {name: _to_primitive(getattr(value, name)) for name in names}
+    if isinstance(value, list):
+        return [_to_primitive(item) for item in value]
+    return value
+
+
+def _json_default(obj: Any) -> Any:
+    """json encoder hook: emit handoff models field-by-field without copying"""
+    names = _MODEL_FIELDS.get(type(obj))
+    if names is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return {name: getattr(obj, name) for name in names}
+
+
+_compact_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+def encode_json(obj: Any) -> bytes:
+    """Single-pass encode of handoff models (and plain containers holding them) to compact JSON bytes"""
+    return _compact_encoder.encode(obj).encode("utf-8")
+
+
+def _color_from_dict(data: Dict[str, Any]) -> ColorInfo:
+    return ColorInfo(hex=data["hex"], rgb=tuple(data["rgb"]), name=data["name"], confidence=data["confidence"])
+
+
+def merge_palettes(palettes: List[List[ColorInfo]], tolerance: float = 24.0, limit: int = 8) -> List[ColorInfo]:
+    """Deduplicate per-screen palettes into one shared palette
+    
+    Colors within `tolerance` (RGB distance) of an already kept color are
+    folded into it. Confidence becomes the color's average share across
+    screens, so colors present on every screen rank first.
+    """
+    if not palettes:
+        return []
+    
+    kept: List[List[Any]] = []  # [representative ColorInfo, summed confidence]
+    all_colors = sorted((c for palette in palettes for c in palette), key=lambda c: c.confidence, reverse=True)
+    for color in all_colors:
+        for entry in kept:
+            if sum((a - b) ** 2 for a, b in zip(entry[0].rgb, color.rgb)) <= tolerance ** 2:
+                entry[1] += color.confidence
+                break
+        else:
+            kept.append([color, color.confidence])
+    
+    kept.sort(key=lambda entry: entry[1], reverse=True)
+    return [replace(color, confidence=total / len(palettes)) for color, total in kept[:limit]]
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Decode base64 image data (optionally a data: URL) to bytes
+    
+    binascii reads an ASCII str in place, avoiding the str -> bytes copy that
+    base64.b64decode makes; the resulting bytes are shared by io.BytesIO, so
+    Pillow reads the decoded buffer directly.
+    """
+    if data.startswith("data:"):
+        data = data[data.index(",") + 1:]
+    return binascii.a2b_base64(data)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = "high") -> int:
+    """Vision input tokens for an image, using OpenAI's published 512px tile formula"""
+    if detail == "low":
+        return 85
+    # Fit within 2048x2048, then scale the shortest side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return 85 + 170 * tiles
+
+
+def _detect_chrome_band(gray: Any) -> int:
+    """Height of a browser-chrome band at the top of a screenshot, or 0
+    
+    Looks in the top 18% for the lowest full-width horizontal edge (the
+    separator under the tab strip / address bar) above which the band is
+    mostly flat.
+    """
+    import numpy as np
+    
+    height = gray.shape[0]
+    limit = int(height * 0.18)
+    if limit < 24:
+        return 0
+    
+    # Share of columns that change between consecutive rows
+    edges = (np.abs(np.diff(gray[:limit + 1], axis=0)) > 24).mean(axis=1)
+    candidates = np.flatnonzero(edges[16:] > 0.9) + 16
+    for row in candidates[::-1]:
+        band = gray[:row + 1]
+        # Chrome is mostly flat fills: low median per-row variation
+        if np.median(band.std(axis=1)) < 40:
+            return int(row) + 1
+    return 0
+
+
+class ImageRejected(ValueError):
+    """Input image refused by the header probe, before any pixel decode"""
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass(frozen=True, slots=True)
+class ImageLimits:
+    """Limits checked against the image header before decoding"""
+    max_pixels: int = 40_000_000
+    max_side: int = 16_384
+    max_frames: int = 200
+    allowed_formats: Tuple[str, ...] = ("PNG", "JPEG", "WEBP", "GIF", "BMP")
+    
+    @classmethod
+    def from_env(cls) -> "ImageLimits":
+        """IMAGE_MAX_MEGAPIXELS / IMAGE_MAX_SIDE / IMAGE_MAX_FRAMES / IMAGE_ALLOWED_FORMATS"""
+        defaults = cls()
+        formats = os.getenv("IMAGE_ALLOWED_FORMATS")
+        return cls(
+            max_pixels=int(float(os.getenv("IMAGE_MAX_MEGAPIXELS", defaults.max_pixels / 1_000_000)) * 1_000_000),
+            max_side=int(os.getenv("IMAGE_MAX_SIDE", defaults.max_side)),
+            max_frames=int(os.getenv("IMAGE_MAX_FRAMES", defaults.max_frames)),
+            allowed_formats=tuple(f.strip().upper() for f in formats.split(",")) if formats else defaults.allowed_formats,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ImageProbe:
+    """Header facts read without decoding pixels"""
+    format: Optional[str]
+    width: int
+    height: int
+    frames: int
+    reduced: bool = False
+
+
+# Encoding of the image sent to the model (and advertised to clients that pre-resize)
+UPLOAD_FORMAT = "JPEG"
+UPLOAD_QUALITY = 85
 
 
 class ImagePreprocessor:
     """Handles image preprocessing as specified in the architecture"""
     
-    def __init__(self, max_dimension: int = 512):
+    def __init__(
+        self,
+        max_dimension: int = 512,
+        limits: Optional[ImageLimits] = None,
+        auto_crop: Optional[bool] = None,
+        detect_chrome: Optional[bool] = None
+    ):
         self.max_dimension = max_dimension
+        self.limits = limits or ImageLimits.from_env()
+        self.auto_crop_enabled = _env_flag("AUTO_CROP", True) if auto_crop is None else auto_crop
+        self.detect_chrome = _env_flag("AUTO_CROP_CHROME", False) if detect_chrome is None else detect_chrome
     
     def load_image(self, image_input: Union[str, bytes]) -> Image.Image:
-        """Load image from URL, path, or base64 data"""
+        """Load image from URL, path, or base64 data
+        
+        Only the header is read here; the returned image has passed probe()
+        and has not decoded any pixels yet.
+        """
+        from PIL import Image
+        
+        source = self._read(image_input)
+        
+        def open_source() -> Image.Image:
+            return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        
+        try:
+            image = open_source()
+        except Image.DecompressionBombError as e:
+            metrics.inc("image_rejected_pixels")
+            raise ImageRejected("pixels", str(e)) from e
+        
+        self.probe(image, reopen=open_source)
+        return image
+    
+    def _read(self, image_input: Union[str, bytes]) -> Union[bytes, str]:
+        """Encoded bytes of the input, or its local file path"""
         if isinstance(image_input, bytes):
-            return Image.open(io.BytesIO(image_input))
+            return image_input
         
         if isinstance(image_input, str):
             # Check if it's a URL
             parsed = urlparse(image_input)
             if parsed.scheme in ("http", "https"):
+                import requests
                 response = requests.get(image_input, timeout=30)
                 response.raise_for_status()
-                return Image.open(io.BytesIO(response.content))
+                return response.content
             
             # Check if it's base64
             if image_input.startswith('data:image'):
-                header, data = image_input.split(',', 1)
-                return Image.open(io.BytesIO(base64.b64decode(data)))
+                return decode_base64_image(image_input)
             
             # Local file path
-            return Image.open(image_input)
+            return image_input
+        
+        raise TypeError(f"Unsupported image input: {type(image_input).__name__}")
+    
+    def probe(self, image: Image.Image, reopen: Optional[Callable[[], Image.Image]] = None) -> ImageProbe:
+        """Check format, dimensions and frame count from the header, before decoding
+        
+        Oversized JPEGs are routed to a reduced-resolution decode (libjpeg DCT
+        scaling via draft()) instead of being rejected; other oversized
+        inputs raise ImageRejected. Every rejection is counted in metrics.
+        
+        With auto-crop on, the draft scale is chosen for the content that
+        will remain after the crop, not the whole image: `reopen` gives a
+        second handle on the source, decoded at 1/8 scale to find the crop
+        box, so cropping still recovers resolution for the content.
+        """
+        limits = self.limits
+        width, height = image.size
+        frames = getattr(image, "n_frames", 1)
+        
+        def reject(reason: str, message: str):
+            metrics.inc(f"image_rejected_{reason}")
+            raise ImageRejected(reason, message)
+        
+        if image.format not in limits.allowed_formats:
+            reject("format", f"Unsupported image format: {image.format}")
+        if frames > limits.max_frames:
+            reject("frames", f"Too many frames: {frames} (limit {limits.max_frames})")
+        
+        reduced = False
+        if image.format == "JPEG" and max(width, height) > self.max_dimension:
+            content = max(width, height)
+            if self.auto_crop_enabled and reopen is not None:
+                box = self._scout_crop_box(reopen(), width, height)
+                if box is not None:
+                    content = max(box[2] - box[0], box[3] - box[1])
+            # Decode at the smallest 1/2, 1/4 or 1/8 scale that keeps the content >= the target size
+            factor = min(1.0, self.max_dimension / content)
+            image.draft(image.mode, (math.ceil(width * factor), math.ceil(height * factor)))
+            reduced = image.size != (width, height)
+            if reduced:
+                metrics.inc("image_probe_reduced")
+        
+        decoded_width, decoded_height = image.size
+        if max(decoded_width, decoded_height) > limits.max_side:
+            reject("dimensions", f"Image too large: {width}x{height} (max side {limits.max_side})")
+        if decoded_width * decoded_height > limits.max_pixels:
+            reject("pixels", f"Image too large: {width}x{height} (max {limits.max_pixels} pixels)")
+        
+        # Offsets computed on a draft-reduced image are mapped back to source pixels with this
+        image.info["source_size"] = (width, height)
+        return ImageProbe(format=image.format, width=width, height=height, frames=frames, reduced=reduced)
+    
+    def client_params(self) -> Dict[str, Any]:
+        """Preprocessing a client can do before upload so the server has nothing left to resize or re-encode
+        
+        Target sizes truncate like _target_size; a JPEG at most max_dimension
+        on its longest side that needs no crop is sent to the model as uploaded.
+        """
+        return {
+            "max_dimension": self.max_dimension,
+            "format": f"image/{UPLOAD_FORMAT.lower()}",
+            "quality": UPLOAD_QUALITY / 100,
+            "rounding": "floor",
+            "source_size_header": "X-Source-Size"
+        }
+    
+    def _target_size(self, width: int, height: int) -> Tuple[int, int]:
+        if width > height:
+            return self.max_dimension, int(height * (self.max_dimension / width))
+        return int(width * (self.max_dimension / height)), self.max_dimension
     
     def resize_image(self, image: Image.Image) -> Image.Image:
         """Resize image to max dimension while maintaining aspect ratio"""
@@ -152,17 +492,15 @@ class ImagePreprocessor:
         if max(width, height) <= self.max_dimension:
             return image
         
-        if width > height:
-            new_width = self.max_dimension
-            new_height = int(height * (self.max_dimension / width))
-        else:
-            new_height = self.max_dimension
-            new_width = int(width * (self.max_dimension / height))
-        
-        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        from PIL import Image
+        # reducing_gap box-reduces by an integer factor first, then LANCZOS for the rest
+        return image.resize(self._target_size(width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
     
     def extract_dominant_colors(self, image: Image.Image, n_colors: int = 5) -> List[ColorInfo]:
         """Extract dominant colors using clustering"""
+        import numpy as np
+        from sklearn.cluster import KMeans
+        
         # Convert to RGB if necessary
         if image.mode != 'RGB':
             image = image.convert('RGB')
@@ -245,18 +583,129 @@ class ImagePreprocessor:
         else:
             return "pink"
     
-    def image_to_base64(self, image: Image.Image, format: str = "JPEG") -> str:
+    def _crop_box(
+        self,
+        image: Image.Image,
+        tolerance: int = 10,
+        padding: int = 8,
+        min_savings: float = 0.05
+    ) -> Optional[Tuple[int, int, int, int, int]]:
+        """(left, top, right, bottom, chrome_height) of the content, or None when cropping is not worth it"""
+        import numpy as np
+        
+        width, height = image.size
+        if width < 32 or height < 32:
+            return None
+        
+        gray = np.asarray(image.convert("L"), dtype=np.int16)
+        chrome_height = _detect_chrome_band(gray) if self.detect_chrome else 0
+        body = gray[chrome_height:]
+        
+        border = np.concatenate([body[0], body[-1], body[:, 0], body[:, -1]])
+        content = np.abs(body - int(np.median(border))) > tolerance
+        rows = np.flatnonzero(content.sum(axis=1) >= max(2, width // 500))
+        cols = np.flatnonzero(content.sum(axis=0) >= max(2, body.shape[0] // 500))
+        if rows.size == 0 or cols.size == 0:
+            return None
+        
+        left = max(0, int(cols[0]) - padding)
+        right = min(width, int(cols[-1]) + 1 + padding)
+        top = chrome_height + max(0, int(rows[0]) - padding)
+        bottom = min(height, chrome_height + int(rows[-1]) + 1 + padding)
+        
+        if 1 - (right - left) * (bottom - top) / (width * height) < min_savings:
+            return None
+        return left, top, right, bottom, chrome_height
+    
+    def _scout_crop_box(self, scout: Image.Image, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Crop box in source pixels, found on a 1/8-scale decode of the source"""
+        scout.draft(scout.mode, (max(1, width // 8), max(1, height // 8)))
+        found = self._crop_box(scout, padding=1)
+        if found is None:
+            return None
+        scale_x, scale_y = width / scout.size[0], height / scout.size[1]
+        left, top, right, bottom, _ = found
+        return (
+            math.floor(left * scale_x), math.floor(top * scale_y),
+            math.ceil(right * scale_x), math.ceil(bottom * scale_y)
+        )
+    
+    def auto_crop(
+        self,
+        image: Image.Image,
+        tolerance: int = 10,
+        padding: int = 8,
+        min_savings: float = 0.05
+    ) -> Tuple[Image.Image, Optional[Dict[str, Any]]]:
+        """Crop blank margins (and optionally the browser chrome band) before resizing
+        
+        Rows and columns are projected onto a content mask (pixels differing
+        from the border background by more than `tolerance` gray levels); the
+        first and last rows/columns holding content bound the crop box.
+        Returns the image unchanged and None when less than `min_savings` of
+        the area would be removed.
+        """
+        width, height = image.size
+        found = self._crop_box(image, tolerance, padding, min_savings)
+        if found is None:
+            return image, None
+        left, top, right, bottom, chrome_height = found
+        kept = (right - left) * (bottom - top)
+        
+        # Report offsets in source pixels even if the decode was draft-reduced
+        source_width, source_height = image.info.get("source_size", (width, height))
+        scale_x, scale_y = source_width / width, source_height / height
+        before = self._target_size(width, height) if max(width, height) > self.max_dimension else (width, height)
+        cropped_width, cropped_height = right - left, bottom - top
+        after = (
+            self._target_size(cropped_width, cropped_height)
+            if max(cropped_width, cropped_height) > self.max_dimension else (cropped_width, cropped_height)
+        )
+        
+        crop = {
+            "box": [round(left * scale_x), round(top * scale_y), round(right * scale_x), round(bottom * scale_y)],
+            "source_size": [source_width, source_height],
+            "chrome_height": round(chrome_height * scale_y),
+            "pixels_removed": round((width * height - kept) * scale_x * scale_y),
+            "pixel_savings": round(1 - kept / (width * height), 4),
+            "estimated_image_tokens": {
+                "uncropped": estimate_image_tokens(*before),
+                "cropped": estimate_image_tokens(*after)
+            },
+            # Resolution the content keeps after resizing, relative to resizing uncropped
+            "content_scale_gain": round(
+                (max(after) / max(cropped_width, cropped_height)) / (max(before) / max(width, height)), 3
+            )
+        }
+        metrics.inc("auto_crop_applied")
+        metrics.inc("auto_crop_pixels_removed", crop["pixels_removed"])
+        return image.crop((left, top, right, bottom)), crop
+    
+    def image_digest(self, image: Image.Image) -> str:
+        """Content hash of the decoded pixels (independent of the input encoding)"""
+        digest = hashlib.sha256(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+    
+    def image_to_base64(self, image: Image.Image, format: str = UPLOAD_FORMAT) -> str:
         """Convert PIL Image to base64 string for API"""
+        # Client-resized uploads already in the target encoding are passed through as-is
+        encoded = image.info.get("upload_bytes")
+        if encoded is not None and format.upper() == UPLOAD_FORMAT == image.format and image.mode == "RGB":
+            metrics.inc("image_encode_skipped")
+            return f"data:image/{format.lower()};base64,{base64.b64encode(encoded).decode()}"
+        
         buffer = io.BytesIO()
         
         # Convert RGBA to RGB for JPEG
         if format.upper() == "JPEG" and image.mode == "RGBA":
+            from PIL import Image
             # Create white background
             background = Image.new("RGB", image.size, (255, 255, 255))
             background.paste(image, mask=image.split()[-1])
             image = background
         
-        image.save(buffer, format=format, quality=85, optimize=True)
+        image.save(buffer, format=format, quality=UPLOAD_QUALITY, optimize=True)
         buffer.seek(0)
         
         image_data = base64.b64encode(buffer.getvalue()).decode()
@@ -273,6 +722,8 @@ class DesignerProfile:
         self.platform_targets = profile_data.get('platform_targets', ['v0', 'magic-pattern', 'lovable'])
         self.output_format = profile_data.get('output_format', 'structured_json')
         self.specializations = profile_data.get('specializations', [])
+        # Optional {"input": tokens, "output": tokens} limits (prompt_builder.TokenBudget)
+        self.token_budget = profile_data.get('token_budget', {})
         
         # Vibe coding specific prompts
         self.system_prompt = self._build_system_prompt()
@@ -314,12 +765,98 @@ Focus on generating precise, implementable prompts for vibe coding tools.
 """
 
 
+# Parsed config directories keyed by path -> (signature, loaded configs).
+# Analyzers are constructed per request in api_server; the JSON files are only
+# re-read (and the load banners re-printed) when a file in the directory changes.
+_CONFIG_CACHE: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+
+
+def _config_signature(directory: str) -> tuple:
+    """(filename, mtime, size) of every JSON file in a config directory"""
+    entries = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.json'):
+            stat = os.stat(os.path.join(directory, filename))
+            entries.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+# config_version() lists the config directories at most this often
+CONFIG_CHECK_SECONDS = float(os.getenv("CONFIG_CHECK_SECONDS", "5"))
+
+# (monotonic time of the last directory listing, version it produced)
+_config_version: Tuple[float, tuple] = (float("-inf"), ())
+
+
+def config_version(max_age: float = CONFIG_CHECK_SECONDS) -> tuple:
+    """Signatures of the profiles and handoff config directories; changes whenever a config file does
+    
+    The directories are listed and stat'ed at most once per max_age seconds,
+    so callers on hot paths (the metadata endpoints) see edits within that
+    window without paying for the filesystem walk on every request.
+    """
+    global _config_version
+    checked_at, version = _config_version
+    now = time.monotonic()
+    if now - checked_at < max_age:
+        return version
+    base = os.path.dirname(__file__)
+    version = tuple(
+        _config_signature(path) if os.path.isdir(path) else ()
+        for path in (os.path.join(base, 'profiles'), os.path.join(base, 'handoff'))
+    )
+    # A single tuple assignment: concurrent callers at worst both list the directories
+    _config_version = (now, version)
+    return version
+
+
+# Screens accepted by VibeMindOpenAI.analyze_flow in one request
+MAX_FLOW_SCREENS = 8
+
+
+# Longest side of the image used for typography measurement, and its time budget
+TYPOGRAPHY_MAX_SIDE = 1280
+TYPOGRAPHY_BUDGET_MS = float(os.getenv("TYPOGRAPHY_BUDGET_MS", "25"))
+
+# Revisions are re-analysed from the changed region alone when its bounding
+# box covers at most this share of the screen
+DELTA_MAX_REGION = float(os.getenv("DELTA_MAX_REGION", "0.4"))
+DELTA_MAX_TOKENS = 800
+
+# Response keys of a single-image analysis, with format notes for the prompt
+ANALYSIS_FIELDS = {
+    "layout_analysis": "",
+    "visual_design": "",
+    "components_identified": "",
+    "interaction_patterns": "",
+    "technical_specifications": "",
+    "accessibility_notes": "",
+    "implementation_prompt": "",
+    "confidence_score": " (0-1)",
+    "uncertain_elements": " (array of strings)",
+}
+
+
 class VibeMindOpenAI:
     """Main class for OpenAI SDK-based image analysis"""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = None,
+        base_url: Optional[str] = None,
+        result_cache: Optional[TieredCache] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[SharedTransport] = None
+    ):
         """Initialize with OpenAI client"""
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+        ensure_env_loaded()
+        self._api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.key_hash = hash_api_key(self._api_key)
+        # base_url / OPENAI_BASE_URL lets the client target a compatible stand-in
+        # (e.g. loadtest/fake_openai_server.py)
+        self._base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self._client = None
         # Prefer explicit arg, else env var, else default to gpt-4o (vision capable)
         self.model = (
             model
@@ -327,11 +864,38 @@ class VibeMindOpenAI:
             or "gpt-4o"
         )
         self.preprocessor = ImagePreprocessor()
+        # Content-hash keyed results, shared with other workers on this node
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
+        # Shared by all instances, so every API key sees the same OpenAI health
+        self.breaker = breaker if breaker is not None else get_vision_breaker()
+        # One connection pool for every instance, so a new API key's client starts warm
+        self.transport = transport if transport is not None else get_shared_transport()
         
         # Load designer profiles and platform handoffs
         self.profiles = self._load_designer_profiles()
         self.platform_handoffs = self._load_platform_handoffs()
     
+    @property
+    def client(self) -> OpenAI:
+        """OpenAI client, created (and the SDK imported) on first API call"""
+        if self._client is None:
+            try:
+                from openai import OpenAI
+            except ImportError:
+                print("❌ OpenAI SDK not installed. Please run: pip install openai")
+                raise
+            try:
+                shared = {"http_client": self.transport.client, "timeout": self.transport.timeout()}
+            except ImportError:
+                # No httpx (the SDK runs on its own HTTP stack): its default client and timeouts
+                shared = {}
+            self._client = OpenAI(api_key=self._api_key, base_url=self._base_url, **shared)
+        return self._client
+    
+    @client.setter
+    def client(self, value: OpenAI):
+        self._client = value
+    
     def _load_designer_profiles(self) -> Dict[str, DesignerProfile]:
         """Load designer profiles from the local profiles directory"""
         profiles = {}
@@ -341,6 +905,11 @@ class VibeMindOpenAI:
             print(f"⚠️  Profiles directory not found: {profiles_dir}")
             return profiles
         
+        signature = _config_signature(profiles_dir)
+        cached = _CONFIG_CACHE.get(profiles_dir)
+        if cached and cached[0] == signature:
+            return dict(cached[1])
+        
         for filename in os.listdir(profiles_dir):
             if filename.endswith('.json'):
                 try:
@@ -355,7 +924,8 @@ class VibeMindOpenAI:
                 except Exception as e:
                     print(f"❌ Error loading profile {filename}: {e}")
         
-        return profiles
+        _CONFIG_CACHE[profiles_dir] = (signature, profiles)
+        return dict(profiles)
     
     def _load_platform_handoffs(self) -> Dict[str, Any]:
         """Load platform-specific handoff configurations"""
@@ -366,6 +936,11 @@ class VibeMindOpenAI:
             print(f"⚠️  Handoff directory not found: {handoff_dir}")
             return handoffs
         
+        signature = _config_signature(handoff_dir)
+        cached = _CONFIG_CACHE.get(handoff_dir)
+        if cached and cached[0] == signature:
+            return dict(cached[1])
+        
         for filename in os.listdir(handoff_dir):
             if filename.endswith('.json'):
                 try:
@@ -380,7 +955,8 @@ class VibeMindOpenAI:
                 except Exception as e:
                     print(f"❌ Error loading handoff config {filename}: {e}")
         
-        return handoffs
+        _CONFIG_CACHE[handoff_dir] = (signature, handoffs)
+        return dict(handoffs)
     
     def analyze_image(
         self,
@@ -388,7 +964,10 @@ class VibeMindOpenAI:
         designer_profile_key: str,
         platform_target: str = "v0",
         project_context: Optional[Dict[str, Any]] = None,
-        output_mode: str = "json"
+        output_mode: str = "json",
+        previous_analysis_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        source_size: Optional[Tuple[int, int]] = None
     ) -> Union[DesignHandoff, str]:
         """
         Main analysis method following the architecture specification
@@ -399,6 +978,15 @@ class VibeMindOpenAI:
             platform_target: Target platform (v0, magic-patterns, lovable)
             project_context: Optional project context
             output_mode: "json" for structured output, "prompt" for direct prompt text
+            previous_analysis_id: handoff_id of an earlier analysis of this
+                screen; when the revision changes only a small region, only
+                that region is re-analysed and merged into the prior analysis
+            deadline: Optional request deadline; checked between stages
+                (raising RequestCancelled / DeadlineExceeded), bounding the
+                OpenAI call's timeout and aborting the call once cancelled
+            source_size: (width, height) of the original screenshot when the
+                client already downscaled it (ImagePreprocessor.client_params),
+                so local measurements are still reported in source pixels
             
         Returns:
             Structured DesignHandoff object or formatted prompt string
@@ -411,23 +999,72 @@ class VibeMindOpenAI:
         
         # Step 1: Preprocess image
         print("🔄 Preprocessing image...")
-        original_image = self.preprocessor.load_image(image_input)
-        resized_image = self.preprocessor.resize_image(original_image)
+        if deadline is not None:
+            deadline.check("preprocess")
+        resized_image, detail_image, metadata = self._prepare_image(image_input, source_size)
+        
+        image_hash = self.preprocessor.image_digest(resized_image)
+        image_url = image_input if isinstance(image_input, str) else "uploaded_image"
+        
+        cache_key = None
+        if output_mode != "prompt" and self.result_cache is not None:
+            cache_key = self._handoff_cache_key(image_hash, designer_profile_key, platform_target, project_context)
+            cached = self.result_cache.get("handoff", cache_key)
+            if cached is not None:
+                print("⚡ Using cached analysis")
+                return self._cached_handoff(cached, cache_key, designer_profile_key, image_url, resized_image)
+        
+        # While the API circuit is open, serve a stale result (or fail fast) before any local work
+        if self.breaker.rejecting():
+            return self._stale_or_raise(
+                CircuitOpenError(self.breaker.name, self.breaker.retry_after()),
+                cache_key, designer_profile_key, image_url, resized_image
+            )
         
         # Step 2: Extract visual features
         print("🎨 Extracting visual features...")
-        dominant_colors = self.preprocessor.extract_dominant_colors(resized_image)
-        
-        # Step 3: Convert to base64 for API
-        image_b64 = self.preprocessor.image_to_base64(resized_image)
+        if deadline is not None:
+            deadline.check("preprocess")
+        dominant_colors = self._extract_features(resized_image, detail_image, image_hash, metadata)
         
-        # Step 4: LLM Analysis with platform-specific context
-        print("🤖 Performing AI analysis...")
         platform_config = self.platform_handoffs.get(platform_target, {})
+        if deadline is not None:
+            deadline.check("openai")
         
-        analysis_result = self._analyze_with_openai(
-            image_b64, profile, platform_target, project_context, platform_config
-        )
+        # Step 3: Revision delta, when only a small region changed since a previous analysis
+        calls: List[TokenUsage] = []
+        analysis_result = None
+        try:
+            if previous_analysis_id and output_mode != "prompt":
+                print("🔁 Diffing against previous analysis...")
+                analysis_result = self._analyze_delta(
+                    previous_analysis_id, designer_profile_key, profile, platform_target,
+                    platform_config, resized_image, detail_image, metadata, usage_out=calls, deadline=deadline
+                )
+            
+            # Step 4: LLM Analysis with platform-specific context
+            if analysis_result is None:
+                image_b64 = self.preprocessor.image_to_base64(resized_image)
+                print("🤖 Performing AI analysis...")
+                analysis_result = self._analyze_with_openai(
+                    image_b64, profile, platform_target, project_context, platform_config,
+                    hints=self._prompt_hints(metadata),
+                    image_tokens=metadata["image_tokens"],
+                    usage_out=calls,
+                    deadline=deadline
+                )
+        except CircuitOpenError as e:
+            return self._stale_or_raise(e, cache_key, designer_profile_key, image_url, resized_image)
+        metadata["usage"] = self._usage_record(self._total_usage(calls))
+        
+        # Stale-while-error: a past result beats a zero-confidence fallback
+        if "error" in analysis_result and cache_key is not None:
+            stale = self._stale_handoff(cache_key, designer_profile_key, image_url, resized_image)
+            if stale is not None:
+                return stale
+        # A call that ran out the request's time is a deadline error, not a zero-confidence result
+        if "error" in analysis_result and deadline is not None:
+            deadline.check("openai")
         
         # Step 5: Return based on output mode
         if output_mode == "prompt":
@@ -440,90 +1077,696 @@ class VibeMindOpenAI:
                 dominant_colors, 
                 profile, 
                 platform_target,
-                image_input if isinstance(image_input, str) else "uploaded_image"
+                image_url,
+                image_hash=image_hash,
+                metadata=metadata
             )
+            # Failed analyses are not cached so the next request retries the API
+            if cache_key is not None and "error" not in analysis_result:
+                self.result_cache.set("handoff", cache_key, handoff.to_json_bytes())
+                self._remember_revision(handoff, cache_key, designer_profile_key, resized_image, analysis_result)
             return handoff
     
-    def _analyze_with_openai(
+    def analyze_flow(
         self,
-        image_b64: str,
+        image_inputs: List[Union[str, bytes]],
+        designer_profile_key: str,
+        platform_target: str = "v0",
+        project_context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> FlowHandoff:
+        """
+        Analyze the screens of a user flow together in a single vision call
+        
+        Screens are preprocessed in parallel, their palettes are merged into
+        one shared palette, and the model sees every screen with one system
+        prompt and shared context instead of rediscovering the design system
+        per screen.
+        
+        Args:
+            image_inputs: Screens in flow order (URL, path, data URL or bytes each)
+            designer_profile_key: Key for designer profile to use
+            platform_target: Target platform (v0, magic-patterns, lovable)
+            project_context: Optional project context
+            deadline: Optional request deadline, checked before each screen
+                and before the vision call
+            
+        Returns:
+            FlowHandoff with one DesignHandoff per screen plus flow-level tokens
+        """
+        if not image_inputs:
+            raise ValueError("At least one screen is required")
+        if len(image_inputs) > MAX_FLOW_SCREENS:
+            raise ValueError(f"A flow can have at most {MAX_FLOW_SCREENS} screens")
+        if designer_profile_key not in self.profiles:
+            raise ValueError(f"Designer profile '{designer_profile_key}' not found")
+        
+        profile = self.profiles[designer_profile_key]
+        
+        # Flows are not cached as a whole, so an open circuit fails fast before preprocessing
+        if self.breaker.rejecting():
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+        
+        # Step 1: Preprocess and extract features for all screens in parallel
+        print(f"🔄 Preprocessing {len(image_inputs)} screens...")
+        workers = min(len(image_inputs), os.cpu_count() or 1)
+        
+        def preprocess(image_input: Union[str, bytes]):
+            # Screens still queued when the request is cancelled are skipped
+            if deadline is not None:
+                deadline.check("preprocess")
+            return self._preprocess_screen(image_input)
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            screens = list(pool.map(preprocess, image_inputs))
+        
+        shared_palette = merge_palettes([colors for _, colors, _, _ in screens])
+        shared_contrast = palette_contrast(
+            shared_palette, list(dict.fromkeys(tuple(metadata["page_background"]) for _, _, _, metadata in screens))
+        )
+        
+        # Step 2: One LLM call covering every screen
+        print("🤖 Performing AI flow analysis...")
+        platform_config = self.platform_handoffs.get(platform_target, {})
+        calls: List[TokenUsage] = []
+        if deadline is not None:
+            deadline.check("openai")
+        analysis = self._analyze_flow_with_openai(
+            [image_b64 for _, _, image_b64, _ in screens],
+            [self._prompt_hints(metadata) for _, _, _, metadata in screens],
+            shared_palette, contrast_prompt_hint(shared_contrast), profile, platform_target, project_context, platform_config,
+            image_tokens=sum(metadata["image_tokens"] for _, _, _, metadata in screens),
+            usage_out=calls,
+            deadline=deadline
+        )
+        if "error" in analysis and deadline is not None:
+            deadline.check("openai")
+        
+        # Step 3: Split into per-screen handoffs, each carrying an even share of the call's usage
+        print("📋 Generating flow handoff JSON...")
+        flow_usage = self._total_usage(calls)
+        for index, (_, _, _, metadata) in enumerate(screens):
+            metadata["usage"] = self._usage_record(flow_usage.share(index, len(screens)))
+        screen_analyses = analysis.get("screens") if "error" not in analysis else None
+        if not isinstance(screen_analyses, list):
+            screen_analyses = []
+        
+        handoffs = []
+        for index, (image_input, (image_hash, colors, _, metadata)) in enumerate(zip(image_inputs, screens)):
+            screen_analysis = screen_analyses[index] if index < len(screen_analyses) else None
+            if not isinstance(screen_analysis, dict):
+                screen_analysis = self._create_fallback_analysis(
+                    analysis.get("error") or f"No analysis returned for screen {index + 1}"
+                )
+            handoffs.append(self._create_handoff_json(
+                screen_analysis,
+                colors,
+                profile,
+                platform_target,
+                image_input if isinstance(image_input, str) else f"uploaded_screen_{index + 1}",
+                image_hash=image_hash,
+                metadata=metadata
+            ))
+        
+        flow_tokens = {
+            "colors": {
+                "primary": shared_palette[0].hex if shared_palette else "#000000",
+                "secondary": shared_palette[1].hex if len(shared_palette) > 1 else "#666666",
+                "palette": [color.hex for color in shared_palette]
+            },
+            "contrast": {key: shared_contrast[key] for key in ("pairs", "failing", "min_ratio")} if shared_contrast else {},
+            "design_system": analysis.get("shared_design_system", {})
+        }
+        
+        return FlowHandoff(
+            timestamp=datetime.now().isoformat(),
+            designer_profile=profile.name,
+            platform_target=platform_target,
+            screens=handoffs,
+            flow_tokens=flow_tokens,
+            flow_summary=analysis.get("flow_summary", analysis.get("layout_analysis", "")),
+            prompt_for_platform=analysis.get("flow_implementation_prompt", analysis.get("implementation_prompt", "")),
+            confidence_score=analysis.get("confidence_score", 0.5),
+            uncertain_flags=analysis.get("uncertain_elements", []),
+            usage=self._usage_record(flow_usage)
+        )
+    
+    def _prepare_image(
+        self,
+        image_input: Union[str, bytes],
+        source_size: Optional[Tuple[int, int]] = None
+    ) -> Tuple[Image.Image, Image.Image, Dict[str, Any]]:
+        """Load, auto-crop and resize an input
+        
+        Returns the resized image sent to the model, a higher-resolution
+        detail image (at most TYPOGRAPHY_MAX_SIDE) for measurements that
+        need legible text, and preprocessing metadata. Inputs the client
+        already brought to the target size skip the resize, and uploaded
+        JPEGs that also need no crop skip re-encoding.
+        """
+        image = self.preprocessor.load_image(image_input)
+        # Already at the target size as decoded (not via a reduced JPEG draft of a larger image)
+        client_resized = (
+            max(image.size) <= self.preprocessor.max_dimension
+            and image.info.get("source_size", image.size) == image.size
+        )
+        if client_resized and source_size and max(source_size) > max(image.size):
+            image.info["source_size"] = tuple(source_size)
+        source_width = image.info.get("source_size", image.size)[0]
+        draft_scale = source_width / image.size[0]
+        metadata: Dict[str, Any] = {}
+        if self.preprocessor.auto_crop_enabled:
+            image, crop = self.preprocessor.auto_crop(image)
+            if crop:
+                print(f"✂️  Cropped {crop['pixel_savings']:.0%} blank/chrome area")
+                metadata["crop"] = crop
+        if client_resized:
+            resized_image = image
+            metrics.inc("image_resize_skipped")
+            if isinstance(image_input, bytes) and "crop" not in metadata:
+                # image_to_base64 sends these bytes unless the image was transformed (format is then None)
+                resized_image.info["upload_bytes"] = image_input
+        else:
+            resized_image = self.preprocessor.resize_image(image)
+        # Integer box reduction is cheap and keeps text strokes crisp
+        factor = -(-max(image.size) // TYPOGRAPHY_MAX_SIDE)
+        detail_image = image.reduce(factor) if factor > 1 else image
+        # Source pixels per analysed pixel, for reporting local measurements in source px
+        metadata["scale"] = round(draft_scale * image.size[0] / resized_image.size[0], 4)
+        metadata["detail_scale"] = round(draft_scale * image.size[0] / detail_image.size[0], 4)
+        metadata["image_tokens"] = estimate_image_tokens(*resized_image.size)
+        return resized_image, detail_image, metadata
+    
+    def _extract_features(
+        self,
+        resized_image: Image.Image,
+        detail_image: Image.Image,
+        image_hash: str,
+        metadata: Dict[str, Any]
+    ) -> List[ColorInfo]:
+        """Palette plus local layout, contrast and typography measurements
+        
+        Runs in the same worker as palette extraction; measurements are stored
+        in metadata and the palette is returned.
+        """
+        colors = self._dominant_colors(resized_image, image_hash)
+        metadata["layout"] = detect_layout(resized_image, metadata["scale"])
+        # The palette drops near-white pixels, so the page color is measured separately
+        metadata["page_background"] = list(page_background(resized_image))
+        metadata["contrast"] = palette_contrast(colors, [metadata["page_background"]])
+        metadata["typography"] = estimate_typography(
+            detail_image, metadata["detail_scale"], budget_ms=TYPOGRAPHY_BUDGET_MS
+        )
+        return colors
+    
+    def _prompt_hints(self, metadata: Dict[str, Any]) -> Dict[str, str]:
+        """One-line prompt hints for each local measurement"""
+        return {
+            "layout": layout_prompt_hint(metadata.get("layout")),
+            "contrast": contrast_prompt_hint(metadata.get("contrast")),
+            "typography": typography_prompt_hint(metadata.get("typography"))
+        }
+    
+    def _preprocess_screen(self, image_input: Union[str, bytes]) -> Tuple[str, List[ColorInfo], str, Dict[str, Any]]:
+        """Load, crop, resize, hash, extract palette and encode one flow screen"""
+        resized_image, detail_image, metadata = self._prepare_image(image_input)
+        image_hash = self.preprocessor.image_digest(resized_image)
+        colors = self._extract_features(resized_image, detail_image, image_hash, metadata)
+        return image_hash, colors, self.preprocessor.image_to_base64(resized_image), metadata
+    
+    def _analyze_flow_with_openai(
+        self,
+        images_b64: List[str],
+        screen_hints: List[Dict[str, str]],
+        shared_palette: List[ColorInfo],
+        contrast_hint: str,
         profile: DesignerProfile,
         platform_target: str,
         project_context: Optional[Dict[str, Any]],
-        platform_config: Dict[str, Any]
+        platform_config: Dict[str, Any],
+        image_tokens: int = 0,
+        usage_out: Optional[List[TokenUsage]] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
-        """Perform analysis using OpenAI vision model"""
+        """Analyze all screens of a flow in one vision call"""
+        budget = TokenBudget.resolve(profile.token_budget, platform_config.get('token_budget'))
         
         context_str = ""
         if project_context:
-            context_str = f"\nProject Context: {json.dumps(project_context, indent=2)}"
+            context_str = f"\nProject Context: {compact_json(project_context, budget.input_tokens // 4)}"
         
-        # Get platform-specific context
         platform_name = platform_config.get('platform_name', platform_target)
         platform_strategy = platform_config.get('strategy', {})
         platform_keywords = platform_strategy.get('keywords', [])
         platform_approach = platform_strategy.get('approach', '')
+        palette = ', '.join(f"{color.hex} ({color.name})" for color in shared_palette)
         
-        # Create platform-enhanced prompt
         user_prompt = f"""
-Analyze this UI/UX design image as a {profile.name} for {platform_name} platform.
-
+Analyze these {len(images_b64)} screens of one user flow, in order, as a {profile.name} for {platform_name} platform.
 {context_str}
 
 Platform-Specific Focus: {platform_approach}
 Key Terms to Use: {', '.join(platform_keywords[:10])}
+Shared Palette (measured from the screens): {palette}
+Palette Contrast (measured): {contrast_hint or "not measured"}
+
+Describe the shared design system once, then only what is specific to each screen.
+Refer to shared palette colors and design-system tokens by name instead of re-describing them per screen.
+Grid, gutters, spacing and type sizes are measured per screen below; do not re-derive them, describe component hierarchy instead.
+Palette contrast is measured; keep accessibility_notes to non-color issues (at most 3 short items per screen).
+
+Format your response as a structured JSON with these keys:
+- flow_summary (the user journey across the screens)
+- shared_design_system (typography, spacing, shared components and patterns)
+- screens (array with one object per screen, in order, each with: layout_analysis, visual_design, components_identified, interaction_patterns, accessibility_notes, implementation_prompt, confidence_score, uncertain_elements)
+- flow_implementation_prompt (one prompt building the whole flow with {platform_name}-specific terminology)
+- confidence_score (0-1)
+- uncertain_elements (array of strings)
+"""
+        
+        content: List[Dict[str, Any]] = [{"type": "text", "text": user_prompt}]
+        for index, (image_b64, hints) in enumerate(zip(images_b64, screen_hints), 1):
+            measured = "; ".join(
+                f"{name}: {hints[name]}" for name in ("layout", "typography") if hints.get(name)
+            )
+            label = f"Screen {index} (measured {measured}):" if measured else f"Screen {index}:"
+            content.append({"type": "text", "text": label})
+            content.append({"type": "image_url", "image_url": {"url": image_b64}})
+        
+        return self._vision_completion(
+            profile.system_prompt,
+            content,
+            max_tokens=min(4096, 1000 + (500 if any(h.get("layout") for h in screen_hints) else 600) * len(images_b64)),
+            image_tokens=image_tokens,
+            usage_out=usage_out,
+            deadline=deadline
+        )
+    
+    def _handoff_cache_key(
+        self,
+        image_hash: str,
+        designer_profile_key: str,
+        platform_target: str,
+        project_context: Optional[Dict[str, Any]]
+    ) -> str:
+        """Content hash of everything that determines the analysis result"""
+        key_material = json.dumps(
+            [image_hash, designer_profile_key, platform_target, project_context, self.model],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+    
+    def _cached_handoff(
+        self,
+        cached: bytes,
+        cache_key: str,
+        designer_profile_key: str,
+        image_url: str,
+        resized_image: Image.Image,
+        stale: bool = False
+    ) -> DesignHandoff:
+        """Rebuild a cached handoff as a new handoff for this request"""
+        handoff = DesignHandoff.from_dict(json.loads(cached))
+        original_usage = handoff.metadata.get("usage", {})
+        # Delta and staleness reports describe the request that computed the entry
+        metadata = {k: v for k, v in handoff.metadata.items() if k not in ("delta", "stale")}
+        metadata["usage"] = self._usage_record(
+            TokenUsage(original_usage.get("model", self.model)), cache_hit=True,
+            saved_cost_usd=original_usage.get("cost_usd", 0.0)
+        )
+        if stale:
+            metadata["stale"] = True
+        handoff = replace(
+            handoff,
+            timestamp=datetime.now().isoformat(),
+            image_url=image_url,
+            handoff_id=new_handoff_id(),
+            metadata=metadata
+        )
+        self._remember_revision(handoff, cache_key, designer_profile_key, resized_image)
+        return handoff
+    
+    def _stale_handoff(
+        self,
+        cache_key: str,
+        designer_profile_key: str,
+        image_url: str,
+        resized_image: Image.Image
+    ) -> Optional[DesignHandoff]:
+        """A cached handoff for this key even past its TTL, flagged as stale, or None"""
+        hit = self.result_cache.lookup("handoff", cache_key, allow_stale=True)
+        if hit is None:
+            return None
+        value, is_stale = hit
+        print("🕰️  OpenAI unavailable, serving cached analysis" + (" (stale)" if is_stale else ""))
+        metrics.inc("handoff_served_stale")
+        return self._cached_handoff(value, cache_key, designer_profile_key, image_url, resized_image, stale=is_stale)
+    
+    def _stale_or_raise(
+        self,
+        error: CircuitOpenError,
+        cache_key: Optional[str],
+        designer_profile_key: str,
+        image_url: str,
+        resized_image: Image.Image
+    ) -> DesignHandoff:
+        """Serve a stale handoff while the circuit is open, or fail fast with the breaker error"""
+        stale = self._stale_handoff(cache_key, designer_profile_key, image_url, resized_image) if cache_key else None
+        if stale is None:
+            raise error
+        return stale
+    
+    def _remember_revision(
+        self,
+        handoff: DesignHandoff,
+        cache_key: str,
+        designer_profile_key: str,
+        image: Image.Image,
+        analysis: Optional[Dict[str, Any]] = None
+    ):
+        """Record what a later revision of this screen needs for a delta analysis
+        
+        The handoff id maps to the analysis cache key; the grayscale pixels and
+        the model's analysis are stored once, when the analysis is computed.
+        """
+        import zlib
+        
+        if analysis is not None:
+            self.result_cache.set(
+                "revision_pixels", handoff.image_hash, zlib.compress(image.convert("L").tobytes(), 1)
+            )
+            self.result_cache.set("revision_analysis", cache_key, encode_json(analysis))
+        self.result_cache.set("revision", handoff.handoff_id, encode_json({
+            "key": cache_key,
+            "image_hash": handoff.image_hash,
+            "size": list(image.size),
+            "profile": designer_profile_key,
+            "platform": handoff.platform_target
+        }))
+    
+    def _analyze_delta(
+        self,
+        previous_analysis_id: str,
+        designer_profile_key: str,
+        profile: DesignerProfile,
+        platform_target: str,
+        platform_config: Dict[str, Any],
+        resized_image: Image.Image,
+        detail_image: Image.Image,
+        metadata: Dict[str, Any],
+        usage_out: Optional[List[TokenUsage]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Re-analyse only the region that changed since a previous analysis
+        
+        Diffs the revision block-wise against the stored prior image. If the
+        change is localised, sends the changed region (low detail) with the
+        prior structured analysis and merges the keys the model returns.
+        Returns the merged analysis, or None when a full analysis is needed;
+        either way metadata["delta"] reports the outcome.
+        """
+        import zlib
+        import numpy as np
+        
+        delta: Dict[str, Any] = {"previous_id": previous_analysis_id, "applied": False}
+        metadata["delta"] = delta
+        
+        def fall_back(reason: str) -> None:
+            delta["reason"] = reason
+            metrics.inc(f"delta_analysis_fallback_{reason}")
+            return None
+        
+        revision = self.result_cache.get("revision", previous_analysis_id) if self.result_cache else None
+        if revision is None:
+            return fall_back("not_found")
+        revision = json.loads(revision)
+        if (revision["profile"], revision["platform"]) != (designer_profile_key, platform_target):
+            return fall_back("target_changed")
+        if tuple(revision["size"]) != resized_image.size:
+            return fall_back("size_changed")
+        
+        pixels = self.result_cache.get("revision_pixels", revision["image_hash"])
+        prior = self.result_cache.get("revision_analysis", revision["key"])
+        if pixels is None or prior is None:
+            return fall_back("not_found")
+        
+        width, height = resized_image.size
+        previous = np.frombuffer(zlib.decompress(pixels), dtype=np.uint8).reshape(height, width)
+        region = changed_region(previous, np.asarray(resized_image.convert("L")))
+        delta["changed_share"] = region["changed_share"]
+        
+        prior_analysis = json.loads(prior)
+        full_image_tokens = estimate_image_tokens(width, height)
+        # The prior analysis approximates what a full re-analysis would generate
+        prior_tokens = estimate_tokens(prior.decode("utf-8"))
+        
+        if region["box"] is None:
+            delta.update(applied=True, tokens_saved={"input": full_image_tokens, "output": prior_tokens})
+            metrics.inc("delta_analysis_unchanged")
+            return prior_analysis
+        if region["box_share"] > DELTA_MAX_REGION:
+            return fall_back("not_localized")
+        
+        # Crop the detail image for legible text; the crop fits one low-detail tile
+        ratio = detail_image.size[0] / width
+        crop = self.preprocessor.resize_image(
+            detail_image.crop(tuple(round(v * ratio) for v in region["box"]))
+        )
+        scale = metadata["scale"]
+        left, top, right, bottom = (round(v * scale) for v in region["box"])
+        platform_name = platform_config.get('platform_name', platform_target)
+        
+        user_prompt = f"""
+This is a revision of a design you analysed before as a {profile.name} for {platform_name}.
+Only the region shown changed: x {left}-{right}px, y {top}-{bottom}px of a {round(width * scale)}x{round(height * scale)}px screen.
+
+Prior analysis (JSON): {prior.decode("utf-8")}
 
+Return a JSON object with only the keys of the prior analysis whose content changes because of this region, each with its full updated value (for components_identified, the full updated list).
+Update implementation_prompt if the change affects it, and include confidence_score.
+"""
+        print(f"✂️  Re-analysing changed region ({region['changed_share']:.0%} of the screen)")
+        result = self._vision_completion(
+            profile.system_prompt,
+            [
+                {"type": "text", "text": user_prompt},
+                {"type": "image_url", "image_url": {"url": self.preprocessor.image_to_base64(crop), "detail": "low"}}
+            ],
+            max_tokens=DELTA_MAX_TOKENS,
+            image_tokens=estimate_image_tokens(*crop.size, detail="low"),
+            usage_out=usage_out,
+            deadline=deadline
+        )
+        if "error" in result:
+            return fall_back("failed")
+        
+        changes = {key: value for key, value in result.items() if key in prior_analysis}
+        sent_image_tokens = estimate_image_tokens(*crop.size, detail="low")
+        tokens_saved = {
+            "input": full_image_tokens - sent_image_tokens - prior_tokens,
+            "output": prior_tokens - estimate_tokens(json.dumps(result))
+        }
+        delta.update(
+            applied=True,
+            region=[left, top, right, bottom],
+            changed_keys=sorted(changes),
+            image_tokens={"full": full_image_tokens, "sent": sent_image_tokens},
+            tokens_saved=tokens_saved
+        )
+        metrics.inc("delta_analysis_applied")
+        metrics.inc("delta_output_tokens_saved", max(0, tokens_saved["output"]))
+        return {**prior_analysis, **changes}
+    
+    def _dominant_colors(self, image: Image.Image, image_hash: str, n_colors: int = 5) -> List[ColorInfo]:
+        """Palette extraction through the result cache (KMeans is the costliest local step)"""
+        if self.result_cache is None:
+            return self.preprocessor.extract_dominant_colors(image, n_colors)
+        
+        cache_key = f"{image_hash}:{n_colors}"
+        cached = self.result_cache.get("palette", cache_key)
+        if cached is not None:
+            return [_color_from_dict(c) for c in json.loads(cached)]
+        
+        colors = self.preprocessor.extract_dominant_colors(image, n_colors)
+        self.result_cache.set("palette", cache_key, encode_json(colors))
+        return colors
+    
+    def _analyze_with_openai(
+        self,
+        image_b64: str,
+        profile: DesignerProfile,
+        platform_target: str,
+        project_context: Optional[Dict[str, Any]],
+        platform_config: Dict[str, Any],
+        hints: Optional[Dict[str, str]] = None,
+        image_tokens: int = 0,
+        usage_out: Optional[List[TokenUsage]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """Perform analysis using OpenAI vision model
+        
+        `hints` carries one-line local measurements (image_analysis) keyed by
+        "layout", "contrast" and "typography"; each one present replaces a part of the
+        analysis the model would otherwise have to produce, and lowers
+        max_tokens accordingly.
+        
+        The prompt is built within the profile/platform input budget and
+        max_tokens is the sum of the requested fields' output allowances,
+        capped by the output budget (prompt_builder).
+        """
+        hints = hints or {}
+        platform_name = platform_config.get('platform_name', platform_target)
+        platform_strategy = platform_config.get('strategy', {})
+        platform_keywords = platform_strategy.get('keywords', [])
+        platform_approach = platform_strategy.get('approach', '')
+        budget = TokenBudget.resolve(profile.token_budget, platform_config.get('token_budget'))
+        measured = []
+        
+        # Locally measured grid/spacing replaces the model's own layout measurement
+        if hints.get("layout"):
+            layout_item = "Component hierarchy and section roles only; grid and spacing are already measured"
+            measured.append("layout_analysis")
+        else:
+            layout_item = "Describe the overall layout, grid system, component hierarchy"
+        
+        # Palette contrast is computed locally (WCAG), so ask only for non-color a11y issues
+        if hints.get("contrast"):
+            accessibility_item = "Non-color issues only, at most 3 short items; palette contrast is already measured"
+            measured.append("accessibility_notes")
+        else:
+            accessibility_item = "A11y considerations and improvements"
+        
+        # Measured type scale: the model only names font families and weights
+        if hints.get("typography"):
+            visual_item = "Colors, font families and weights, visual hierarchy; type sizes are already measured"
+            measured.append("visual_design")
+        else:
+            visual_item = "Colors, typography, spacing, visual hierarchy"
+        
+        # Create platform-enhanced prompt; optional sections are dropped first if over budget
+        prompt = PromptBuilder()
+        prompt.add(f"Analyze this UI/UX design image as a {profile.name} for {platform_name} platform.\n")
+        if project_context:
+            prompt.add(f"Project Context: {compact_json(project_context, budget.input_tokens // 4)}", priority=1)
+        for label, key in (("Measured Layout", "layout"), ("Measured Contrast", "contrast"), ("Measured Type Scale", "typography")):
+            if hints.get(key):
+                prompt.add(f"{label}: {hints[key]}")
+        if platform_approach:
+            prompt.add(f"Platform-Specific Focus: {platform_approach}", priority=2)
+        if platform_keywords:
+            prompt.add(f"Key Terms to Use: {', '.join(platform_keywords[:10])}", priority=3)
+        response_keys = "\n".join(f"- {key}{note}" for key, note in ANALYSIS_FIELDS.items())
+        prompt.add(f"""
 Please provide a comprehensive analysis covering:
 
-1. **Layout Structure**: Describe the overall layout, grid system, component hierarchy
-2. **Visual Design**: Colors, typography, spacing, visual hierarchy  
+1. **Layout Structure**: {layout_item}
+2. **Visual Design**: {visual_item}
 3. **Components**: Identify UI components and their properties
 4. **Interactions**: User flows and interactive elements
 5. **Technical Specs**: CSS/styling requirements, responsive behavior
-6. **Accessibility**: A11y considerations and improvements
+6. **Accessibility**: {accessibility_item}
 7. **Platform Implementation Prompt**: Detailed prompt optimized for {platform_name} using their specific terminology and best practices
 
 Format your response as a structured JSON with these keys:
-- layout_analysis
-- visual_design
-- components_identified
-- interaction_patterns
-- technical_specifications
-- accessibility_notes
-- implementation_prompt
-- confidence_score (0-1)
-- uncertain_elements (array of strings)
+{response_keys}
 
 Be specific and actionable. Focus on details that developers need for accurate implementation.
 For the implementation_prompt, use {platform_name}-specific terminology and follow their recommended patterns.
-"""
+""")
+        user_prompt, _, dropped = prompt.build(budget.input_tokens)
+        if dropped:
+            metrics.inc("prompt_sections_dropped", dropped)
 
+        return self._vision_completion(
+            profile.system_prompt,
+            [
+                {"type": "text", "text": user_prompt},
+                {"type": "image_url", "image_url": {"url": image_b64}}
+            ],
+            max_tokens=budget.max_tokens(ANALYSIS_FIELDS, measured),
+            image_tokens=image_tokens,
+            usage_out=usage_out,
+            deadline=deadline
+        )
+    
+    def _vision_completion(
+        self,
+        system_prompt: str,
+        user_content: List[Dict[str, Any]],
+        max_tokens: int,
+        image_tokens: int = 0,
+        usage_out: Optional[List[TokenUsage]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """Run one Chat Completions vision call and parse the JSON object it returns
+        
+        image_tokens is the estimated cost of the attached images, for
+        comparing the local prompt estimate with the reported usage. The
+        call's TokenUsage is appended to usage_out when given.
+        
+        With a deadline, each stage of the transport's connect/read/write
+        timeouts is capped at the time left to the "openai" checkpoint, the
+        call is not retried, and the completion is streamed so it can be
+        aborted: once the deadline is cancelled (client disconnect) or runs
+        out, the stream is closed at the next chunk, which drops the upstream
+        connection and stops generation. A timeout within a budget shorter
+        than the breaker's slow-call threshold is not held against the breaker.
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": user_content
+            }
+        ]
+        estimated_tokens = estimate_message_tokens(messages, image_tokens)
+        timeout = deadline.time_left("openai") if deadline is not None else None
         try:
-            # Use standard Chat Completions API for vision models
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": profile.system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {"type": "image_url", "image_url": {"url": image_b64}}
-                        ]
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.1
-            )
+            # Built before taking a breaker slot: a client that can't be built (no SDK, no key) says nothing
+            # about OpenAI, and failing here must not leave a half-open probe unresolved
+            client = self.client
+            if timeout is not None:
+                # SDK retries would run the stage past its budget
+                client = client.with_options(max_retries=0)
+        except Exception as e:
+            print(f"❌ OpenAI client error: {e}")
+            return self._create_fallback_analysis(str(e))
+        # Raises CircuitOpenError while the breaker is open; callers serve stale results or fail fast
+        self.breaker.acquire()
+        # A budget under the breaker's slow-call threshold: timing out only means the caller asked for less time
+        deadline_bound = timeout is not None and timeout * 1000 < self.breaker.latency_threshold_ms
+        try:
+            started = time.perf_counter()
+            request = dict(model=self.model, messages=messages, max_tokens=max_tokens, temperature=0.1)
+            try:
+                # Use standard Chat Completions API for vision models
+                if deadline is None:
+                    response = client.chat.completions.create(**request)
+                    content = ""
+                    if hasattr(response, "choices") and len(response.choices) > 0:
+                        content = response.choices[0].message.content or ""
+                else:
+                    response, content = self._stream_completion(
+                        client, deadline, timeout=self.transport.timeout(timeout), **request
+                    )
+            except Exception as e:
+                if is_upstream_failure(e) and not (deadline_bound and is_timeout(e)):
+                    self.breaker.record_failure(str(e))
+                else:
+                    # A bad key, rate limit, rejected request, cancellation or the caller's own short
+                    # deadline says nothing about OpenAI
+                    self.breaker.record_ignored()
+                raise
+            self.breaker.record_success((time.perf_counter() - started) * 1000)
+            usage = TokenUsage.from_response(response, self.model)
+            if usage is not None:
+                self._log_token_usage(usage, estimated_tokens, max_tokens)
+                if usage_out is not None:
+                    usage_out.append(usage)
 
-            # Extract text output from Chat Completions API
-            content = ""
-            if hasattr(response, "choices") and len(response.choices) > 0:
-                content = response.choices[0].message.content or ""
-            
             # Try to extract JSON from the response
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
             if json_match:
@@ -539,6 +1782,59 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
             print(f"❌ OpenAI API error: {e}")
             return self._create_fallback_analysis(str(e))
     
+    def _stream_completion(self, client: OpenAI, deadline: Deadline, **request) -> Tuple[Any, str]:
+        """Stream a completion, checking the deadline at every chunk
+        
+        Returns the last chunk (which carries usage) and the joined content.
+        A cancelled or expired deadline raises at the next chunk, and the
+        stream is closed on the way out, so the upstream request is abandoned
+        rather than run to completion.
+        """
+        stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+        parts: List[str] = []
+        last = None
+        try:
+            for chunk in stream:
+                if deadline.cancelled or deadline.time_left("openai") <= 0:
+                    # The caller's deadline check reports (and counts) why
+                    raise RequestCancelled(deadline.reason or "deadline_exceeded", "openai")
+                last = chunk
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+        return last, "".join(parts)
+    
+    def _log_token_usage(self, usage: TokenUsage, estimated_tokens: int, max_tokens: int):
+        """Record reported usage and compare it with the local prompt estimate and output budget"""
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        print(
+            f"🧮 Tokens: prompt {prompt_tokens} (estimated {estimated_tokens}, cached {usage.cached_tokens}), "
+            f"completion {completion_tokens} of {max_tokens}, ${usage.cost_usd:.4f}"
+        )
+        metrics.inc("openai_prompt_tokens", prompt_tokens)
+        metrics.inc("openai_completion_tokens", completion_tokens)
+        metrics.inc("openai_cached_tokens", usage.cached_tokens)
+        metrics.inc("openai_cost_usd", usage.cost_usd)
+        if prompt_tokens:
+            metrics.observe("prompt_tokens_estimate_error_pct", 100 * (estimated_tokens - prompt_tokens) / prompt_tokens)
+        metrics.observe("completion_tokens_budget_pct", 100 * completion_tokens / max_tokens)
+        if completion_tokens >= max_tokens:
+            metrics.inc("completion_tokens_truncated")
+    
+    def _total_usage(self, calls: List[TokenUsage]) -> TokenUsage:
+        return TokenUsage(
+            model=calls[0].model if calls else self.model,
+            prompt_tokens=sum(call.prompt_tokens for call in calls),
+            completion_tokens=sum(call.completion_tokens for call in calls),
+            cached_tokens=sum(call.cached_tokens for call in calls),
+            cost_usd=round(sum(call.cost_usd for call in calls), 8)
+        )
+    
+    def _usage_record(self, usage: TokenUsage, **extra: Any) -> Dict[str, Any]:
+        """metadata["usage"] for a handoff: token usage and cost plus the hashed API key"""
+        return {"key_hash": self.key_hash, **usage.to_dict(), **extra}
+    
     def _parse_text_response(self, content: str) -> Dict[str, Any]:
         """Parse text response when JSON extraction fails"""
         return {
@@ -564,7 +1860,8 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
             "accessibility_notes": ["Manual review required"],
             "implementation_prompt": f"Analysis failed due to: {error}. Please analyze manually.",
             "confidence_score": 0.0,
-            "uncertain_elements": [f"API Error: {error}"]
+            "uncertain_elements": [f"API Error: {error}"],
+            "error": error
         }
     
     def _create_handoff_json(
@@ -573,7 +1870,9 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
         colors: List[ColorInfo],
         profile: DesignerProfile,
         platform_target: str,
-        image_url: str
+        image_url: str,
+        image_hash: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
     ) -> DesignHandoff:
         """Create structured handoff JSON"""
         
@@ -590,11 +1889,24 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
                         confidence=comp.get('confidence', 0.5)
                     ))
         
-        # Create layout info
+        # Create layout info (grid and spacing measured locally, see image_analysis.detect_layout)
+        measured_layout = (metadata or {}).get('layout') or {}
+        contrast = (metadata or {}).get('contrast') or {}
+        measured_type = (metadata or {}).get('typography') or {}
+        
+        # Measured type scale, with the model's visual-design description alongside
+        typography = analysis.get('visual_design', {})
+        if measured_type.get('scale'):
+            typography = {
+                "scale": measured_type['scale'],
+                "base_size": measured_type['base_size'],
+                "ratio": measured_type['ratio'],
+                "description": typography
+            }
         layout = LayoutInfo(
             structure=analysis.get('layout_analysis', 'Unknown layout'),
-            grid_system=None,
-            spacing={},
+            grid_system=measured_layout.get('grid_system'),
+            spacing=measured_layout.get('spacing', {}),
             responsive_behavior=None
         )
         
@@ -605,12 +1917,26 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
                 "secondary": colors[1].hex if len(colors) > 1 else "#666666",
                 "palette": [color.hex for color in colors[:5]]
             },
-            "typography": analysis.get('visual_design', {}),
-            "spacing": {},
+            "typography": (
+                {
+                    "sizes": {step['role']: step['size_px'] for step in measured_type['scale']},
+                    "base_size": measured_type['base_size'],
+                    "ratio": measured_type['ratio']
+                }
+                if measured_type.get('scale') else analysis.get('visual_design', {})
+            ),
+            "spacing": measured_layout.get('spacing', {}),
+            "contrast": {key: contrast[key] for key in ("pairs", "failing", "min_ratio")} if contrast else {},
             "borders": {},
             "shadows": {}
         }
         
+        # Measured contrast failures first, then the model's (non-color) notes
+        model_notes = analysis.get('accessibility_notes', [])
+        if not isinstance(model_notes, list):
+            model_notes = [str(model_notes)] if model_notes else []
+        accessibility_notes = contrast.get('notes', []) + model_notes
+        
         # Create handoff object
         handoff = DesignHandoff(
             timestamp=datetime.now().isoformat(),
@@ -618,16 +1944,18 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
             designer_profile=profile.name,
             platform_target=platform_target,
             dominant_colors=colors,
-            typography=analysis.get('visual_design', {}),
+            typography=typography,
             layout=layout,
             components=components,
             style_tokens=style_tokens,
             responsive_specs={},
-            accessibility_notes=analysis.get('accessibility_notes', []),
+            accessibility_notes=accessibility_notes,
             prompt_for_platform=analysis.get('implementation_prompt', ''),
             code_suggestions=[],
             confidence_score=analysis.get('confidence_score', 0.5),
-            uncertain_flags=analysis.get('uncertain_elements', [])
+            uncertain_flags=analysis.get('uncertain_elements', []),
+            image_hash=image_hash,
+            metadata=metadata or {}
         )
         
         return handoff
@@ -693,13 +2021,13 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
     def save_handoff(self, handoff: Union[DesignHandoff, str], filepath: Optional[str] = None, output_mode: str = "json") -> str:
         """Save handoff JSON or prompt text to file"""
         if not filepath:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             if output_mode == "prompt":
-                filepath = f"design_prompt_{timestamp}.md"
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                filepath = f"design_prompt_{timestamp}_{new_handoff_id()[-6:]}.md"
             else:
-                # Save JSON files in output folder
+                # Save JSON files in output folder, named by the collision-free handoff id
                 output_dir = "output"
-                filepath = os.path.join(output_dir, f"design_handoff_{timestamp}.json")
+                filepath = os.path.join(output_dir, f"design_handoff_{handoff.handoff_id}.json")
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
@@ -708,13 +2036,18 @@ For the implementation_prompt, use {platform_name}-specific terminology and foll
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(handoff)
         elif isinstance(handoff, DesignHandoff):
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(handoff.to_dict(), f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(handoff.to_json_bytes())
         else:
             raise ValueError("Invalid handoff type for specified output mode")
         
         return filepath
     
+    def refresh_configs(self):
+        """Pick up edited profile and handoff configs (cheap when nothing changed)"""
+        self.profiles = self._load_designer_profiles()
+        self.platform_handoffs = self._load_platform_handoffs()
+    
     def get_available_platforms(self) -> List[str]:
         """Get list of available platform targets"""
         return list(self.platform_handoffs.keys())